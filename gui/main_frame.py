@@ -3,6 +3,7 @@ from utils.image_loader import ImageLoader
 from tkinter import messagebox
 from utils.trade_status_task import TradeStatusTask
 from utils.trade_filter import TradeFilter
+from utils.account_pool import AccountPool
 from gui.settings_window import SettingsWindow
 from datetime import datetime
 import os
@@ -201,6 +202,12 @@ class MainFrame(ctk.CTkFrame):
             except Exception:
                 pass
             self.trade_status_task = None
+        
+        # Stop the additional account workers
+        try:
+            AccountPool().stop()
+        except Exception:
+            pass
             
         # Destroy the frame
         super().destroy()
@@ -2,6 +2,7 @@ import customtkinter as ctk
 import os
 import tkinter as tk
 import argparse
+import multiprocessing
 from gui.login_frame import LoginFrame
 from gui.main_frame import MainFrame
 from utils.config_manager import ConfigManager
@@ -85,6 +86,9 @@ class App(ctk.CTk):
         self.main_frame.grid(row=0, column=0, sticky="nsew")
 
 if __name__ == "__main__":
+    # Account workers are spawned processes, which re-run this module when frozen
+    multiprocessing.freeze_support()
+    
     parser = argparse.ArgumentParser(description='TradevLink Connector')
     parser.add_argument('--dev', action='store_true', help='Run in development mode')
     args = parser.parse_args()
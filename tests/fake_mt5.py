@@ -0,0 +1,66 @@
+"""
+Stand-in for the MetaTrader5 module in AccountPool workers.
+
+Workers import it by name, so its behaviour is keyed on the login:
+login 2 can't log in and login 3 answers every order after SLOW_SECONDS.
+Every symbol has one open position, ticket 5, whose close is rejected
+when the rule's magic is REJECT_CLOSE_MAGIC.
+"""
+import time
+from types import SimpleNamespace
+
+TRADE_ACTION_DEAL = 1
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+POSITION_TYPE_BUY = 0
+ORDER_TIME_GTC = 0
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_REJECT = 10006
+
+FAILING_LOGIN = 2
+SLOW_LOGIN = 3
+SLOW_SECONDS = 2.0
+REJECT_CLOSE_MAGIC = 43
+
+_login = None
+sent = []
+
+def initialize(**kwargs):
+    global _login
+    _login = kwargs.get("login")
+    return _login != FAILING_LOGIN
+
+def last_error():
+    return (-6, "Terminal: Authorization failed")
+
+def shutdown():
+    pass
+
+def symbols_get():
+    # Broker symbols carry a suffix the alerts don't
+    return [SimpleNamespace(name="XAUUSD.m", visible=True)]
+
+def symbol_select(symbol, enable=True):
+    return True
+
+def symbol_info(symbol):
+    return SimpleNamespace(filling_mode=2, volume_step=0.01, volume_min=0.01, volume_max=10.0)
+
+def symbol_info_tick(symbol):
+    return SimpleNamespace(bid=2000.0, ask=2000.5)
+
+def positions_get(symbol=None):
+    return [SimpleNamespace(ticket=5, symbol=symbol, type=POSITION_TYPE_BUY, volume=0.1)]
+
+def order_send(request):
+    if _login == SLOW_LOGIN:
+        time.sleep(SLOW_SECONDS)
+    sent.append(request)
+    if request.get("position") == 5 and request.get("magic") == REJECT_CLOSE_MAGIC:
+        return SimpleNamespace(retcode=TRADE_RETCODE_REJECT)
+    # The order ticket counts the requests, so a result shows what was sent before it
+    return SimpleNamespace(retcode=TRADE_RETCODE_DONE, order=len(sent), price=request["price"],
+                           volume=request["volume"])
@@ -0,0 +1,65 @@
+import pytest
+
+from utils.account_pool import AccountPool
+
+MT5_MODULE = "fake_mt5"
+
+def alert(volume=0.1, **rule):
+    return {"ticker": "XAUUSD", "action": "buy", "volume": volume, "sl": None, "tp": None,
+            "rules": [dict({"symbol": "XAUUSD"}, **rule)]}
+
+@pytest.fixture
+def pool():
+    pool = AccountPool()
+    yield pool
+    pool.stop()
+
+def test_login_failure_is_reported(pool):
+    failures = pool.configure([{"name": "ok", "login": 1}, {"name": "bad", "login": 2}], MT5_MODULE)
+
+    assert [failure["account"] for failure in failures] == ["bad"]
+    assert "Authorization failed" in failures[0]["error"]
+
+def test_alert_resolves_the_workers_broker_symbol(pool):
+    assert pool.configure([{"name": "ok", "login": 1}], MT5_MODULE) == []
+
+    [result] = pool.broadcast(alert())
+
+    assert result["success"], result
+    assert result["account"] == "ok"
+    assert result["symbol"] == "XAUUSD.m"
+    assert result["volume"] == 0.1
+
+def test_volume_multiplier_rounds_down_and_rejects_below_minimum(pool):
+    pool.configure([{"name": "small", "login": 1, "volume_multiplier": 0.05}], MT5_MODULE)
+
+    [result] = pool.broadcast(alert(volume=0.1))
+
+    assert not result["success"]
+    assert "below the minimum" in result["error"]
+
+def test_slow_account_times_out_without_holding_up_the_others(pool):
+    pool.configure([{"name": "fast", "login": 1}, {"name": "slow", "login": 3}], MT5_MODULE)
+
+    results = {result["account"]: result for result in pool.broadcast(alert(), timeout=0.5)}
+
+    assert results["fast"]["success"]
+    assert not results["slow"]["success"]
+    assert results["slow"]["error"] == "Timed out"
+
+def test_close_on_entry_closes_before_opening(pool):
+    pool.configure([{"name": "ok", "login": 1}], MT5_MODULE)
+
+    [result] = pool.broadcast(alert(close_positions_on_entry=True, magic=44))
+
+    # The close of position 5 was the first request, the open the second
+    assert result["success"], result
+    assert result["order"] == 2
+
+def test_failed_close_blocks_the_open(pool):
+    pool.configure([{"name": "ok", "login": 1}], MT5_MODULE)
+
+    [result] = pool.broadcast(alert(close_positions_on_entry=True, magic=43))
+
+    assert not result["success"]
+    assert result["error"] == "Could not close #5: Error Code: 10006"
@@ -0,0 +1,19 @@
+import importlib.util
+import os
+
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
+@pytest.fixture(scope="module")
+def order_request_overhead():
+    spec = importlib.util.spec_from_file_location(
+        "order_request_overhead", os.path.join(BENCHMARKS, "order_request_overhead.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.mark.parametrize("order_type", ["buy", "sell"])
+def test_order_request_overhead_compares_equal_requests(order_request_overhead, order_type):
+    # The benchmark only means something if both paths build the same request
+    assert order_request_overhead.rebuild_request(order_type) == order_request_overhead.template_request(order_type)
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+from utils.order_templates import DEFAULT_CLOSE_COMMENT, DEFAULT_COMMENT, DEFAULT_MAGIC, OrderTemplates
+from utils.symbol_resolver import SymbolResolver
+
+mt5 = SimpleNamespace(
+    TRADE_ACTION_DEAL=1, TRADE_ACTION_CLOSE_BY=10, ORDER_TYPE_BUY=0, ORDER_TYPE_SELL=1, POSITION_TYPE_BUY=0,
+    ORDER_TIME_GTC=0, ORDER_FILLING_FOK=0, ORDER_FILLING_IOC=1, ORDER_FILLING_RETURN=2,
+)
+
+class Config:
+    def __init__(self, rules):
+        self.rules = rules
+        self.version = 1
+
+    def get(self, key, default=None):
+        return self.rules if key == "alert_rules" else default
+
+def templates(rules, filling_mode=3):
+    config = Config(rules)
+    symbols = [SimpleNamespace(name=rule["symbol"], visible=True) for rule in rules]
+    resolver = SymbolResolver(lambda: symbols, config)
+    resolver.load_symbols()
+    terminal = SimpleNamespace(**vars(mt5), symbol_info=lambda symbol: SimpleNamespace(filling_mode=filling_mode))
+    return OrderTemplates(terminal, resolver), config
+
+def position(ticket, is_buy, symbol="XAUUSD", volume=0.1):
+    return SimpleNamespace(ticket=ticket, symbol=symbol, type=0 if is_buy else 1, volume=volume)
+
+def test_open_request_uses_the_defaults():
+    orders, _ = templates([{"symbol": "XAUUSD"}])
+
+    assert orders.open_request("XAUUSD", True, 0.1, 2000.5) == {
+        "action": 1, "symbol": "XAUUSD", "deviation": 20, "magic": DEFAULT_MAGIC, "type_time": 0,
+        "type_filling": 1, "type": 0, "comment": DEFAULT_COMMENT, "volume": 0.1, "price": 2000.5,
+    }
+
+def test_rule_overrides():
+    orders, _ = templates([{"symbol": "XAUUSD", "magic": 7, "deviation": 5, "comment": "gold",
+                            "close_comment": "gold out"}])
+
+    opening = orders.open_request("XAUUSD", False, 0.2, 1999.5, comment="alert 12")
+    closing = orders.close_request(position(3, is_buy=True), 1999.5)
+
+    assert (opening["type"], opening["magic"], opening["deviation"], opening["comment"]) == (1, 7, 5, "alert 12")
+    assert closing["comment"] == "gold out"
+    assert orders.magic_numbers() == {DEFAULT_MAGIC, 7}
+    assert orders.comments() == {DEFAULT_COMMENT, "gold"}
+
+def test_requests_are_copies():
+    orders, _ = templates([{"symbol": "XAUUSD"}])
+
+    orders.open_request("XAUUSD", True, 0.1, 2000.5)["magic"] = 1
+
+    assert orders.open_request("XAUUSD", True, 0.1, 2000.5)["magic"] == DEFAULT_MAGIC
+
+def test_close_request_is_the_opposite_deal():
+    orders, _ = templates([{"symbol": "XAUUSD"}])
+
+    closing = orders.close_request(position(3, is_buy=True, volume=0.3), 1999.5)
+
+    assert (closing["type"], closing["position"], closing["volume"], closing["price"]) == (1, 3, 0.3, 1999.5)
+    assert closing["comment"] == DEFAULT_CLOSE_COMMENT
+
+def test_close_by_request():
+    orders, _ = templates([{"symbol": "XAUUSD", "magic": 7}])
+
+    assert orders.close_by_request(3, position(4, is_buy=False)) == {
+        "action": 10, "position": 3, "position_by": 4, "magic": 7, "comment": DEFAULT_CLOSE_COMMENT,
+    }
+
+def test_filling_mode_follows_the_symbol():
+    assert templates([{"symbol": "XAUUSD"}], filling_mode=1)[0].open_request("XAUUSD", True, 0.1, 1)["type_filling"] == 0
+    assert templates([{"symbol": "XAUUSD"}], filling_mode=0)[0].open_request("XAUUSD", True, 0.1, 1)["type_filling"] == 1
+
+def test_templates_are_rebuilt_when_the_rules_change():
+    orders, config = templates([{"symbol": "XAUUSD", "magic": 7}])
+    assert orders.compile_all() == 1
+    assert orders.compile_all() == 0
+
+    config.rules = [{"symbol": "XAUUSD", "magic": 8}]
+    config.version += 1
+
+    assert orders.open_request("XAUUSD", True, 0.1, 2000.5)["magic"] == 8
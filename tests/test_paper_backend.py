@@ -0,0 +1,78 @@
+import pytest
+
+from utils import paper_backend as paper
+from utils.paper_backend import PaperBackend
+
+def backend():
+    config = {"paper": {"balance": 10000.0, "live_quotes": False,
+                        "symbols": {"XAUUSD": {"price": 2000.0, "spread": 0.5, "digits": 2,
+                                               "contract_size": 100, "volatility": 0.0}}}}
+    terminal = PaperBackend(config)
+    terminal.initialize()
+    return terminal
+
+def deal(terminal, is_buy, volume, **fields):
+    request = {"action": paper.TRADE_ACTION_DEAL, "symbol": "XAUUSD", "volume": volume,
+               "type": paper.ORDER_TYPE_BUY if is_buy else paper.ORDER_TYPE_SELL, "magic": 7}
+    request.update(fields)
+    return terminal.order_send(request)
+
+def test_market_orders_fill_at_the_quote():
+    terminal = backend()
+
+    buy = deal(terminal, True, 0.1)
+    sell = deal(terminal, False, 0.2)
+
+    assert (buy.retcode, buy.price, buy.volume) == (paper.TRADE_RETCODE_DONE, 2000.5, 0.1)
+    assert sell.price == 2000.0
+    assert terminal.owns(buy.order)
+    assert {p.ticket: p.volume for p in terminal.positions_get(symbol="XAUUSD")} == {buy.order: 0.1, sell.order: 0.2}
+
+def test_closing_deal_books_the_profit():
+    terminal = backend()
+    buy = deal(terminal, True, 0.1)
+
+    close = deal(terminal, False, 0.1, position=buy.order)
+
+    assert close.retcode == paper.TRADE_RETCODE_DONE
+    assert terminal.positions_get() == ()
+    # Bought at the ask, sold at the bid: the 0.5 spread on 10 ounces
+    assert terminal.account_info().balance == pytest.approx(9995.0)
+    assert deal(terminal, False, 0.1, position=buy.order).retcode == paper.TRADE_RETCODE_POSITION_CLOSED
+
+def test_close_by_closes_both_at_the_opposite_open_price():
+    terminal = backend()
+    buy = deal(terminal, True, 0.3)
+    sell = deal(terminal, False, 0.1)
+
+    result = terminal.order_send({"action": paper.TRADE_ACTION_CLOSE_BY, "position": buy.order,
+                                  "position_by": sell.order})
+
+    assert (result.retcode, result.volume, result.price) == (paper.TRADE_RETCODE_DONE, 0.1, 2000.0)
+    [left] = terminal.positions_get()
+    assert (left.ticket, left.volume) == (buy.order, 0.2)
+
+def test_close_by_needs_opposite_positions():
+    terminal = backend()
+    first = deal(terminal, True, 0.1)
+    second = deal(terminal, True, 0.1)
+
+    result = terminal.order_send({"action": paper.TRADE_ACTION_CLOSE_BY, "position": first.order,
+                                  "position_by": second.order})
+
+    assert result.retcode == paper.TRADE_RETCODE_INVALID
+    assert len(terminal.positions_get()) == 2
+
+def test_stop_loss_closes_when_positions_are_read():
+    terminal = backend()
+    buy = deal(terminal, True, 0.1, sl=2001.0)
+
+    assert terminal.positions_get() == ()
+    assert terminal.history_deals_get(0, 2 ** 40)[-1].reason == paper.DEAL_REASON_SL
+    assert buy.retcode == paper.TRADE_RETCODE_DONE
+
+def test_rejects_orders_before_initialize():
+    terminal = PaperBackend({"paper": {"live_quotes": False}})
+
+    assert deal(terminal, True, 0.1) is None
+    assert terminal.positions_get() is None
@@ -0,0 +1,58 @@
+import threading
+
+from utils.periodic_task import CATCH_UP, FIXED_DELAY, SKIP, Job, Scheduler
+
+def job(**kwargs):
+    job = Job(lambda: None, 1.0, **kwargs)
+    job.due = 100.0
+    return job
+
+def test_fixed_rate_stays_on_the_grid():
+    fixed = job()
+
+    assert fixed._next_due(100.0, 100.4) == 101.0
+    assert fixed.overruns == 0
+
+def test_skip_drops_missed_runs():
+    skip = job(overrun_policy=SKIP)
+
+    # Finishing at 103.5 missed the runs due at 101, 102 and 103
+    assert skip._next_due(100.0, 103.5) == 104.0
+    assert skip.overruns == 1
+    assert skip.skipped == 3
+
+def test_catch_up_runs_right_away():
+    catch_up = job(overrun_policy=CATCH_UP)
+
+    assert catch_up._next_due(100.0, 103.5) == 103.5
+    assert catch_up.overruns == 1
+    assert catch_up.skipped == 0
+
+def test_fixed_delay_waits_after_each_run():
+    delayed = job(mode=FIXED_DELAY)
+
+    assert delayed._next_due(100.0, 103.5) == 104.5
+    assert delayed.overruns == 0
+
+def test_interval_is_reread():
+    intervals = iter([1.0, 2.0])
+    dynamic = Job(lambda: None, lambda: next(intervals))
+
+    assert dynamic.interval == 1.0
+    assert dynamic.interval == 2.0
+
+def test_schedule_once_runs_once():
+    ran = threading.Event()
+    once = Scheduler().schedule_once(ran.set, 0.01, name="test once")
+
+    assert ran.wait(2)
+    assert once.wait(2)
+    assert once.runs == 1
+
+def test_cancelled_job_doesnt_run():
+    ran = threading.Event()
+    cancelled = Scheduler().schedule_once(ran.set, 0.2, name="test cancelled")
+    cancelled.cancel()
+
+    assert not ran.wait(0.4)
+    assert cancelled.runs == 0
@@ -0,0 +1,52 @@
+from utils.rule_matcher import RuleMatcher, is_pattern
+
+def matcher(*patterns):
+    rules = RuleMatcher()
+    for pattern in patterns:
+        rules.add(pattern, {"symbol": pattern})
+    return rules
+
+def matched(rules, symbol):
+    rule = rules.match(symbol)
+    return rule and rule["symbol"]
+
+def test_is_pattern():
+    assert is_pattern("US30*")
+    assert is_pattern("EUR???")
+    assert is_pattern("[AB]UD*")
+    assert not is_pattern("XAUUSD")
+
+def test_longest_prefix_wins():
+    rules = matcher("US*", "US30*")
+
+    assert matched(rules, "US30.cash") == "US30*"
+    assert matched(rules, "US500") == "US*"
+
+def test_prefix_rules_win_over_globs():
+    rules = matcher("*JPY", "USD*")
+
+    assert matched(rules, "USDJPY") == "USD*"
+    assert matched(rules, "EURJPY") == "*JPY"
+
+def test_globs_match_in_config_order():
+    rules = matcher("EUR???", "*USD")
+
+    assert matched(rules, "EURUSD") == "EUR???"
+    assert matched(rules, "GBPUSD") == "*USD"
+
+def test_matching_is_case_insensitive():
+    assert matched(matcher("xau*"), "XAUUSD.m") == "xau*"
+
+def test_earlier_rule_wins_for_the_same_pattern():
+    rules = RuleMatcher()
+    rules.add("GER*", {"symbol": "first"})
+    rules.add("GER*", {"symbol": "second"})
+
+    assert matched(rules, "GER40") == "first"
+
+def test_no_match():
+    rules = matcher("US30*", "*JPY")
+
+    assert rules
+    assert rules.match("XAUUSD") is None
+    assert not RuleMatcher()
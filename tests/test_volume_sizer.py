@@ -0,0 +1,61 @@
+import time
+from types import SimpleNamespace
+
+from utils.volume_sizer import VolumeSizer
+
+XAUUSD = SimpleNamespace(volume_step=0.01, volume_min=0.01, volume_max=5.0,
+                         trade_tick_size=0.01, trade_tick_value=1.0)
+US30 = SimpleNamespace(volume_step=0.1, volume_min=0.1, volume_max=50.0,
+                       trade_tick_size=1.0, trade_tick_value=0.1)
+
+class Resolver:
+    version = 1
+
+    def symbols(self):
+        return ["XAUUSD", "US30"]
+
+def sizer():
+    infos = {"XAUUSD": XAUUSD, "US30": US30}
+    sizer = VolumeSizer(infos.get, Resolver())
+    sizer.refresh()
+    return sizer
+
+def test_snaps_to_step():
+    assert sizer().normalize("XAUUSD", 0.123) == (0.12, "step 0.01")
+    assert sizer().normalize("US30", 0.26) == (0.3, "step 0.1")
+
+def test_unchanged_volume_has_no_notes():
+    assert sizer().normalize("XAUUSD", 0.5) == (0.5, "")
+
+def test_clamps_to_limits():
+    assert sizer().normalize("XAUUSD", 0.001) == (0.01, "step 0.01, min 0.01")
+    assert sizer().normalize("XAUUSD", 12.0) == (5.0, "max 5")
+
+def test_round_down_never_raises_the_volume():
+    assert sizer().normalize("US30", 0.29, round_down=True) == (0.2, "step 0.1")
+    volume, notes = sizer().normalize("US30", 0.05, round_down=True)
+    assert volume is None
+    assert notes == "volume 0.05 is below the minimum 0.1"
+
+def test_rejects_non_positive_volume():
+    assert sizer().normalize("XAUUSD", 0)[0] is None
+    assert sizer().normalize("XAUUSD", None)[0] is None
+
+def test_miss_passes_the_volume_through_and_loads_in_the_background():
+    fetched = []
+    def fetch(symbol):
+        fetched.append(symbol)
+        return XAUUSD
+    sizer = VolumeSizer(fetch, Resolver())
+
+    assert sizer.normalize("XAUUSD.m", 0.123) == (0.123, "symbol limits not loaded yet")
+    deadline = time.time() + 2
+    while sizer.cached("XAUUSD.m") is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert sizer.normalize("XAUUSD.m", 0.123) == (0.12, "step 0.01")
+    assert fetched == ["XAUUSD.m"]
+
+def test_risk_volume():
+    # 2% of 10000 over a 5.00 stop, at 1.0 per 0.01 tick and lot
+    assert sizer().risk_volume("XAUUSD", 10000, 2, 5.0) == 0.4
+    assert sizer().risk_volume("XAUUSD", 10000, 2, 0) is None
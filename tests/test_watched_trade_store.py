@@ -0,0 +1,44 @@
+from utils.watched_trade_store import WatchedTradeStore
+
+def trade(pts=1.0, runup=2000.0):
+    return {"symbol": "XAUUSD", "pts": pts, "runup": runup, "drawdown": 1999.0}
+
+def test_flush_writes_only_changes(tmp_path):
+    store = WatchedTradeStore(str(tmp_path / "watched.db"))
+    watched = {1: trade(), 2: trade()}
+
+    assert store.flush(watched) == 2
+    assert store.flush(watched) == 0
+
+    watched[1]["runup"] = 2001.5
+    assert store.flush(watched) == 1
+
+    del watched[2]
+    assert store.flush(watched) == 1
+    assert store.flush(watched) == 0
+    store.close()
+
+def test_changes_after_flush_are_not_aliased(tmp_path):
+    store = WatchedTradeStore(str(tmp_path / "watched.db"))
+    watched = {1: trade()}
+    store.flush(watched)
+
+    # The store keeps a copy, so mutating the live dict is still seen as a change
+    watched[1]["pts"] = 1.5
+    assert store.flush(watched) == 1
+    store.close()
+
+def test_load_restores_the_last_flush(tmp_path):
+    path = str(tmp_path / "watched.db")
+    store = WatchedTradeStore(path)
+    store.flush({1: trade(), 2: trade(runup=2003.0)})
+    store.discard([1])
+    store.close()
+
+    reopened = WatchedTradeStore(path)
+    loaded = reopened.load()
+
+    assert loaded == {2: trade(runup=2003.0)}
+    # What was loaded counts as persisted
+    assert reopened.flush(loaded) == 0
+    reopened.close()
@@ -0,0 +1,120 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Same values as mt5.ACCOUNT_MARGIN_MODE_RETAIL_NETTING / mt5.ACCOUNT_MARGIN_MODE_EXCHANGE
+NETTING_MARGIN_MODES = (0, 1)
+
+class AccountSnapshot:
+    """Read-only account state as of one account_info() call"""
+    __slots__ = ('login', 'server', 'balance', 'equity', 'margin', 'free_margin', 'leverage',
+                 'currency', 'margin_mode', 'taken_at')
+
+    def __init__(self, account_info, taken_at: float = None):
+        self.login = account_info.login
+        self.server = account_info.server
+        self.balance = account_info.balance
+        self.equity = account_info.equity
+        self.margin = account_info.margin
+        self.free_margin = account_info.margin_free
+        self.leverage = account_info.leverage
+        self.currency = account_info.currency
+        self.margin_mode = account_info.margin_mode
+        self.taken_at = time.time() if taken_at is None else taken_at
+
+    def age(self) -> float:
+        """Seconds elapsed since the snapshot was taken"""
+        return time.time() - self.taken_at
+
+    def is_netting(self) -> bool:
+        """Check if the account nets positions per symbol"""
+        return self.margin_mode in NETTING_MARGIN_MODES
+
+    def values(self) -> tuple:
+        """Everything but the timestamp, to tell whether the account changed"""
+        return (self.login, self.server, self.balance, self.equity, self.margin, self.free_margin,
+                self.leverage, self.currency, self.margin_mode)
+
+    def to_dict(self) -> Dict:
+        """Convert to the dict format of MT5Client.get_account_info"""
+        return {
+            'login': self.login,
+            'server': self.server,
+            'balance': self.balance,
+            'equity': self.equity,
+            'margin': self.margin,
+            'free_margin': self.free_margin,
+            'leverage': self.leverage,
+            'currency': self.currency
+        }
+
+class AccountCache:
+    """
+    The one account snapshot shared by the UI, risk checks and monitoring.
+
+    Only the monitor refreshes it, every 'account_cache.interval' seconds
+    from the config; everyone else reads the last snapshot, so reading the
+    balance or equity never costs an IPC call. Subscribers are called with
+    the new snapshot whenever a refresh changes any of its values.
+    """
+
+    def __init__(self, fetch: Callable, config):
+        self.fetch = fetch
+        self.config = config
+        self._lock = threading.Lock()
+        self._snapshot: Optional[AccountSnapshot] = None
+        self._subscribers: List[Callable] = []
+
+    @property
+    def snapshot(self) -> Optional[AccountSnapshot]:
+        """The last snapshot, or None without an account"""
+        return self._snapshot
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last refresh, or None without a snapshot"""
+        snapshot = self._snapshot
+        return snapshot.age() if snapshot is not None else None
+
+    def current(self, max_age: float) -> Optional[AccountSnapshot]:
+        """The last snapshot if it is at most max_age seconds old"""
+        snapshot = self._snapshot
+        return snapshot if snapshot is not None and snapshot.age() <= max_age else None
+
+    def subscribe(self, callback: Callable[[AccountSnapshot], None]) -> None:
+        """Call callback with each changed snapshot"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable) -> None:
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def refresh(self) -> Optional[AccountSnapshot]:
+        """Fetch the account now and notify subscribers if it changed"""
+        account_info = self.fetch()
+        snapshot = AccountSnapshot(account_info) if account_info is not None else None
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = snapshot
+            subscribers = list(self._subscribers)
+
+        changed = snapshot is not None and (previous is None or previous.values() != snapshot.values())
+        if changed:
+            for callback in subscribers:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    print(f"Error in account subscriber: {str(e)}")
+        return snapshot
+
+    def refresh_if_due(self) -> Optional[AccountSnapshot]:
+        """Refresh when the snapshot is older than the configured interval"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.age() < self.config.get("account_cache", {}).get("interval", 1.0):
+            return snapshot
+        return self.refresh()
+
+    def clear(self) -> None:
+        """Drop the snapshot, e.g. when the connection is lost"""
+        self._snapshot = None
@@ -0,0 +1,303 @@
+import importlib
+import multiprocessing
+import multiprocessing.connection
+import threading
+import time
+from typing import Dict, List, Optional
+from utils.order_templates import OrderTemplates
+from utils.symbol_resolver import SymbolResolver
+from utils.volume_sizer import VolumeSizer
+
+class _WorkerConfig:
+    """The main config's alert rules, as received with each alert, for a worker's resolver"""
+
+    def __init__(self):
+        self._rules = []
+        self.version = 0
+
+    def update(self, rules: List[Dict]) -> None:
+        """Take the rules sent with an alert, invalidating the caches if they changed"""
+        if rules != self._rules:
+            self._rules = rules
+            self.version += 1
+
+    def get(self, key: str, default=None):
+        return self._rules if key == "alert_rules" else default
+
+class _WorkerSession:
+    """
+    One worker's view of its own terminal.
+
+    Workers don't load the config; each alert carries the ticker it was
+    sent for and the rules. The ticker is resolved against this terminal's
+    symbol list, so broker suffixes may differ between accounts, and orders
+    come from OrderTemplates and VolumeSizer like the main account's.
+    """
+
+    def __init__(self, mt5):
+        self.mt5 = mt5
+        self.config = _WorkerConfig()
+        self.resolver = SymbolResolver(mt5.symbols_get, self.config)
+        self.templates = OrderTemplates(mt5, self.resolver)
+        self.sizer = VolumeSizer(mt5.symbol_info, self.resolver)
+
+    def load_symbols(self) -> None:
+        """Load the terminal's symbol list, after (re)connecting"""
+        self.resolver.load_symbols()
+
+    def _close_positions(self, symbol: str) -> List[str]:
+        """Close the positions on a symbol, returning an error for each one that stayed open"""
+        mt5 = self.mt5
+        errors = []
+        for position in mt5.positions_get(symbol=symbol) or ():
+            tick = mt5.symbol_info_tick(symbol)
+            if tick is None:
+                errors.append(f"#{position.ticket}: no tick for {symbol}")
+                continue
+            position_is_buy = position.type == mt5.POSITION_TYPE_BUY
+            result = mt5.order_send(self.templates.close_request(position, tick.bid if position_is_buy else tick.ask))
+            if result is None or result.retcode != mt5.TRADE_RETCODE_DONE:
+                errors.append(f"#{position.ticket}: Error Code: {result.retcode if result is not None else None}")
+        return errors
+
+    def execute(self, alert: Dict, volume_multiplier: float) -> Dict:
+        """Execute one alert in the worker's own MT5 session"""
+        mt5 = self.mt5
+        self.config.update(alert.get("rules") or [])
+        symbol, rule = self.resolver.resolve(alert["ticker"])
+        if rule is None:
+            return {"success": False, "error": f"No rule found for symbol {alert['ticker']}"}
+        is_buy = alert["action"].upper() == "BUY"
+
+        if not mt5.symbol_select(symbol, True):
+            return {"success": False, "error": f"Failed to select symbol {symbol}"}
+
+        # Size from this terminal's limits; a volume that rounds below the minimum isn't raised
+        self.sizer.symbol_info(symbol)
+        volume, sizing = self.sizer.normalize(symbol, alert["volume"] * volume_multiplier, round_down=True)
+        if volume is None:
+            return {"success": False, "error": f"Volume for {symbol} rejected: {sizing}"}
+
+        # Close existing positions on the symbol if the rule asks for it, and don't open next to any left
+        if rule.get("close_positions_on_entry"):
+            errors = self._close_positions(symbol)
+            if errors:
+                return {"success": False, "error": f"Could not close {', '.join(errors)}"}
+
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is None:
+            return {"success": False, "error": f"Failed to get symbol info for {symbol}"}
+
+        price = tick.ask if is_buy else tick.bid
+        request = self.templates.open_request(symbol, is_buy, volume, price)
+
+        # SL and TP are sent with the deal, relative to the requested price
+        if alert.get("sl"):
+            request["sl"] = price - alert["sl"] if is_buy else price + alert["sl"]
+        if alert.get("tp"):
+            request["tp"] = price + alert["tp"] if is_buy else price - alert["tp"]
+
+        result = mt5.order_send(request)
+        if result is None:
+            return {"success": False, "error": f"order_send failed: {mt5.last_error()}"}
+        if result.retcode != mt5.TRADE_RETCODE_DONE:
+            return {"success": False, "retcode": result.retcode, "error": f"Error Code: {result.retcode}"}
+        return {"success": True, "retcode": result.retcode, "order": result.order, "symbol": symbol,
+                "price": result.price, "volume": result.volume}
+
+def _account_worker(account: Dict, conn, mt5_module: str) -> None:
+    """Worker process owning one MT5 terminal session"""
+    mt5 = importlib.import_module(mt5_module)
+
+    kwargs = {}
+    if account.get("path"):
+        kwargs["path"] = account["path"]
+    if account.get("login"):
+        kwargs["login"] = int(account["login"])
+        kwargs["password"] = account.get("password", "")
+        kwargs["server"] = account.get("server", "")
+
+    session = _WorkerSession(mt5)
+    connected = bool(mt5.initialize(**kwargs))
+    if connected:
+        session.load_symbols()
+    conn.send({"type": "ready", "success": connected,
+               "error": None if connected else str(mt5.last_error())})
+
+    volume_multiplier = float(account.get("volume_multiplier", 1.0))
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+
+            start_time = time.perf_counter()
+            try:
+                if not connected:
+                    connected = bool(mt5.initialize(**kwargs))
+                    if connected:
+                        session.load_symbols()
+                if connected:
+                    result = session.execute(message["alert"], volume_multiplier)
+                else:
+                    result = {"success": False, "error": f"Not connected to MT5: {mt5.last_error()}"}
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+
+            result["id"] = message["id"]
+            result["latency_ms"] = (time.perf_counter() - start_time) * 1000
+            conn.send(result)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        try:
+            mt5.shutdown()
+        except Exception:
+            pass
+
+class AccountPool:
+    """
+    Fans accepted alerts out to additional MT5 terminals.
+
+    Each configured account is owned by a worker process holding its own
+    MetaTrader5 session, so one alert executes on every account in parallel.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AccountPool, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self._lock = threading.Lock()
+        self._workers = []  # [(account, process, connection)]
+        self._accounts = None
+        self._mt5_module = None
+        self._next_id = 0
+
+    @staticmethod
+    def _account_name(account: Dict) -> str:
+        """Get a display name for an account"""
+        return account.get("name") or f"#{account.get('login', '?')}"
+
+    def configure(self, accounts: List[Dict], mt5_module: str = "MetaTrader5", timeout: float = 30.0) -> List[Dict]:
+        """
+        Start workers for the given accounts, restarting them if the accounts changed.
+
+        Returns:
+            list: 'account' and 'error' of each worker that couldn't log in,
+                empty if the workers were already running
+        """
+        with self._lock:
+            if accounts == self._accounts and mt5_module == self._mt5_module and self._workers:
+                return []
+            self._stop_workers()
+
+            context = multiprocessing.get_context("spawn")
+            for account in accounts:
+                if not account.get("enabled", True):
+                    continue
+                parent_conn, child_conn = context.Pipe()
+                process = context.Process(
+                    target=_account_worker,
+                    args=(account, child_conn, mt5_module),
+                    daemon=True
+                )
+                process.start()
+                child_conn.close()
+                self._workers.append((account, process, parent_conn))
+
+            self._accounts = [dict(account) for account in accounts]
+            self._mt5_module = mt5_module
+
+            # Wait for the workers to log in in parallel, within one shared timeout
+            waiting = {conn: account for account, process, conn in self._workers}
+            failures = []
+            deadline = time.perf_counter() + timeout
+            while waiting:
+                ready = multiprocessing.connection.wait(list(waiting), max(0.0, deadline - time.perf_counter()))
+                if not ready:
+                    break
+                for conn in ready:
+                    account = waiting.pop(conn)
+                    try:
+                        message = conn.recv()
+                    except EOFError:
+                        message = {"success": False, "error": "Worker exited"}
+                    if not message.get("success"):
+                        failures.append({"account": self._account_name(account), "error": message.get("error")})
+            for account in waiting.values():
+                failures.append({"account": self._account_name(account), "error": f"No login within {timeout:g}s"})
+            return failures
+
+    def broadcast(self, alert: Dict, timeout: float = 10.0) -> List[Dict]:
+        """
+        Send an alert to every account worker and collect their results.
+
+        Args:
+            alert (dict): ticker, action, volume, the alert rules and
+                optional sl and tp
+            timeout (float): Seconds to wait for the slowest account
+
+        Returns:
+            list: One result per account with 'account', 'success' and 'latency_ms'
+        """
+        with self._lock:
+            self._next_id += 1
+            message = {"id": self._next_id, "alert": alert}
+            start_time = time.perf_counter()
+
+            pending = []
+            results = []
+            for account, process, conn in self._workers:
+                try:
+                    conn.send(message)
+                    pending.append((account, conn))
+                except (OSError, EOFError) as e:
+                    results.append({"account": self._account_name(account), "success": False,
+                                    "error": str(e), "latency_ms": 0.0})
+
+            deadline = start_time + timeout
+            for account, conn in pending:
+                result = None
+                try:
+                    while result is None and conn.poll(max(0.0, deadline - time.perf_counter())):
+                        response = conn.recv()
+                        # Drop late responses to earlier broadcasts
+                        if response.get("id") == message["id"]:
+                            result = response
+                except (OSError, EOFError) as e:
+                    result = {"success": False, "error": str(e)}
+                if result is None:
+                    result = {"success": False, "error": "Timed out",
+                              "latency_ms": (time.perf_counter() - start_time) * 1000}
+                result["account"] = self._account_name(account)
+                results.append(result)
+
+            return results
+
+    def _stop_workers(self) -> None:
+        """Ask every worker to shut down and wait briefly for them"""
+        for account, process, conn in self._workers:
+            try:
+                conn.send(None)
+            except Exception:
+                pass
+        for account, process, conn in self._workers:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+        self._workers = []
+        self._accounts = None
+
+    def stop(self) -> None:
+        """Stop all account workers"""
+        with self._lock:
+            self._stop_workers()
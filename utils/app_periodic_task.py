@@ -3,6 +3,7 @@ from datetime import datetime
 import asyncio
 import threading
 from utils.websocket_client import WebSocketClient
+from utils.stall_watchdog import StallWatchdog
 import tkinter.messagebox as messagebox
 from utils.api_client import APIClient
 from utils.version import TRADEVLINK_VERSION
@@ -169,6 +170,7 @@ class AppPeriodicTask(PeriodicTask):
                     pass  # Ignore any errors during cleanup
                 self.loop = None
                 self.websocket = None  # Clear websocket when connection ends
+                StallWatchdog().forget("websocket")
         
         self.websocket_thread = threading.Thread(target=run_websocket, daemon=True)
         self.websocket_thread.start()
@@ -288,10 +290,13 @@ class AppPeriodicTask(PeriodicTask):
         """Get the connection status text and color for display"""
         # Check MT5 connection
         mt5_connected = False
+        mt5_account = False
         if hasattr(self.app, 'main_frame') and self.app.main_frame:
             mt5_client = self.app.main_frame.trade_status_task.mt5_client
             if mt5_client:
-                mt5_connected = mt5_client.is_connected()
+                # Read the monitor's connection state and account snapshot instead of asking the terminal
+                mt5_connected = mt5_client.connected
+                mt5_account = mt5_connected and mt5_client.account.current(max_age=10) is not None
 
         # Check WebSocket connection
         ws_connected = self.websocket and self.websocket.running
@@ -305,15 +310,17 @@ class AppPeriodicTask(PeriodicTask):
             local_server_running = True
 
         # Determine dot color
-        if mt5_connected:
+        if mt5_account:
             dot_color = "#28a745"  # Green
         else:
             dot_color = "#6c757d"  # Gray
 
         # Build status text
         status_parts = []
-        if mt5_connected:
+        if mt5_account:
             status_parts.append("MT5 Connected")
+        elif mt5_connected:
+            status_parts.append("MT5 Connected, No Account")
         else:
             status_parts.append("MT5 Not Connected")
 
@@ -352,6 +359,13 @@ class AppPeriodicTask(PeriodicTask):
                     self.last_license_validation = current_time
                     self._validate_license()
                 
+                # Let the watchdog see that the websocket event loop still runs
+                if self.loop and self.loop.is_running():
+                    try:
+                        self.loop.call_soon_threadsafe(StallWatchdog().beat, "websocket")
+                    except RuntimeError:
+                        pass  # Loop closed in the meantime
+                
                 # Check if we need to send a ping
                 if (self.websocket and self.websocket.running and self.loop and 
                     self.last_ping_time and 
@@ -20,6 +20,7 @@ class ConfigManager:
         self.config_file = "config.json"
         self.example_config_file = "config.example.json"
         self._config = {}
+        self.version = 0  # Bumped on every change so caches can tell when to rebuild
         self.load_config()
     
     def load_config(self) -> None:
@@ -41,6 +42,7 @@ class ConfigManager:
         except Exception as e:
             print(f"Error loading config: {e}")
             self._config = {}
+        self.version += 1
     
     def _create_config_from_example(self) -> None:
         """Create config.json from config.example.json."""
@@ -71,11 +73,13 @@ class ConfigManager:
     def set(self, key: str, value: Any) -> None:
         """Set a configuration value and save to file."""
         self._config[key] = value
+        self.version += 1
         self.save_config()
     
     def update(self, config_dict: Dict[str, Any]) -> None:
         """Update multiple configuration values at once."""
         self._config.update(config_dict)
+        self.version += 1
         self.save_config()
     
     def get_all(self) -> Dict[str, Any]:
@@ -86,4 +90,5 @@ class ConfigManager:
         """Delete a configuration key if it exists."""
         if key in self._config:
             del self._config[key]
+            self.version += 1
             self.save_config()
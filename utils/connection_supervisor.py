@@ -0,0 +1,156 @@
+import os
+import random
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from utils.config_manager import ConfigManager
+
+class ConnectionSupervisor:
+    """
+    Owns the MT5 session lifecycle for MT5Client.
+
+    Reconnect attempts follow a jittered exponential backoff, the terminal
+    can be launched from a configured path, and alerts arriving during an
+    outage are either rejected straight away or queued for replay,
+    depending on the configured policy.
+    """
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0, launch_cooldown: float = 60.0):
+        self.config = ConfigManager()
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.launch_cooldown = launch_cooldown
+        self._lock = threading.Lock()
+        self._attempts = 0
+        self._next_attempt_at = 0.0
+        self._outage_started = None
+        self._last_launch = 0.0
+        self._reconnects = 0
+        self._last_recovery_ms = None
+        self._total_recovery_ms = 0.0
+        self._queued_alerts = []  # [(queued_at, (symbol, volume, action))]
+
+    def _backoff_delay(self) -> float:
+        """Delay before the next attempt: exponential, capped, with equal jitter"""
+        delay = min(self.max_delay, self.base_delay * (2 ** min(self._attempts, 16)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def should_attempt(self) -> bool:
+        """Check if the backoff allows another connection attempt now"""
+        return time.time() >= self._next_attempt_at
+
+    def initialize_kwargs(self) -> Dict:
+        """Arguments for mt5.initialize built from the config"""
+        kwargs = {}
+        path = self.config.get("mt5_path", "")
+        if path and self.config.get("start_mt5", True):
+            kwargs["path"] = path
+        return kwargs
+
+    def maybe_launch_terminal(self) -> bool:
+        """
+        Launch the terminal at the configured path if start_mt5 is enabled.
+
+        Only done after a failed attempt and at most once per launch cooldown.
+
+        Returns:
+            bool: True if the terminal was launched
+        """
+        if self._attempts == 0 or not self.config.get("start_mt5", True):
+            return False
+        path = self.config.get("mt5_path", "")
+        if not path or not os.path.exists(path):
+            return False
+        now = time.time()
+        if now - self._last_launch < self.launch_cooldown:
+            return False
+        self._last_launch = now
+        try:
+            subprocess.Popen([path], cwd=os.path.dirname(path))
+            return True
+        except Exception as e:
+            print(f"Error launching MetaTrader5: {str(e)}")
+            return False
+
+    def on_attempt_failed(self) -> int:
+        """
+        Record a failed connection attempt and schedule the next one.
+
+        Returns:
+            int: Number of failed attempts in the current outage
+        """
+        with self._lock:
+            now = time.time()
+            if self._outage_started is None:
+                self._outage_started = now
+            self._attempts += 1
+            self._next_attempt_at = now + self._backoff_delay()
+            return self._attempts
+
+    def on_connected(self) -> Optional[float]:
+        """
+        Record a successful connection.
+
+        Returns:
+            float: Milliseconds the outage lasted, or None if there was none
+        """
+        with self._lock:
+            recovery_ms = None
+            if self._outage_started is not None:
+                recovery_ms = (time.time() - self._outage_started) * 1000
+                self._reconnects += 1
+                self._last_recovery_ms = recovery_ms
+                self._total_recovery_ms += recovery_ms
+            self._attempts = 0
+            self._next_attempt_at = 0.0
+            self._outage_started = None
+            return recovery_ms
+
+    def on_disconnected(self) -> None:
+        """Record that an established connection was lost"""
+        with self._lock:
+            if self._outage_started is None:
+                self._outage_started = time.time()
+            self._next_attempt_at = 0.0  # Try to reconnect straight away
+
+    def in_outage(self) -> bool:
+        """Check if the connection is currently known to be down"""
+        return self._outage_started is not None
+
+    def outage_policy(self) -> str:
+        """Policy for alerts during an outage: 'fail_fast' or 'queue'"""
+        return self.config.get("mt5_outage_policy", "fail_fast")
+
+    def queue_alert(self, symbol: str, volume: Optional[float], action: str) -> None:
+        """Keep an alert to replay once the connection is back"""
+        with self._lock:
+            self._queued_alerts.append((time.time(), (symbol, volume, action)))
+
+    def drain_alerts(self) -> Tuple[List[Tuple], int]:
+        """
+        Take the queued alerts that are still fresh enough to replay.
+
+        Returns:
+            tuple: (list of (symbol, volume, action), number of expired alerts)
+        """
+        max_age = self.config.get("mt5_outage_queue_seconds", 30)
+        now = time.time()
+        with self._lock:
+            queued = self._queued_alerts
+            self._queued_alerts = []
+        fresh = [alert for queued_at, alert in queued if now - queued_at <= max_age]
+        return fresh, len(queued) - len(fresh)
+
+    def stats(self) -> Dict:
+        """Reconnect timing and backoff state"""
+        with self._lock:
+            return {
+                'connected': self._outage_started is None,
+                'attempts': self._attempts,
+                'next_attempt_in': max(0.0, self._next_attempt_at - time.time()),
+                'reconnects': self._reconnects,
+                'last_recovery_ms': self._last_recovery_ms,
+                'avg_recovery_ms': self._total_recovery_ms / self._reconnects if self._reconnects else None,
+                'queued_alerts': len(self._queued_alerts),
+            }
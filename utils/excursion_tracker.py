@@ -0,0 +1,274 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set
+
+EXCURSION_COLUMNS = (
+    "ticket", "rule", "symbol", "side", "volume", "open_price", "close_price", "opened_at",
+    "closed_at", "mfe", "mae", "time_to_mfe", "time_to_mae", "profit", "exit_reason",
+)
+
+class Excursion:
+    """Price excursion of one open position, in price units from the open price"""
+    __slots__ = ('ticket', 'rule', 'symbol', 'is_buy', 'volume', 'open_price', 'opened_at', 'tracked_at',
+                 'mfe', 'mae', 'mfe_at', 'mae_at', 'last_price', 'sl', 'tp', 'profit', 'exit_reason')
+
+    def __init__(self, ticket: int, rule: str, symbol: str, is_buy: bool, volume: float,
+                 open_price: float, opened_at: float):
+        self.ticket = ticket
+        self.rule = rule
+        self.symbol = symbol
+        self.is_buy = is_buy
+        self.volume = volume
+        self.open_price = open_price
+        self.opened_at = opened_at
+        self.tracked_at = time.time()
+        self.mfe = 0.0
+        self.mae = 0.0
+        self.mfe_at = opened_at
+        self.mae_at = opened_at
+        self.last_price = open_price
+        self.sl = 0.0
+        self.tp = 0.0
+        self.profit = 0.0
+        self.exit_reason = None
+
+    def update(self, price: float, now: float) -> None:
+        """Move the excursions with a new price"""
+        move = price - self.open_price if self.is_buy else self.open_price - price
+        if move > self.mfe:
+            self.mfe = move
+            self.mfe_at = now
+        elif -move > self.mae:
+            self.mae = -move
+            self.mae_at = now
+        self.last_price = price
+
+    def inferred_exit_reason(self) -> str:
+        """Exit reason for a close the connector didn't make: the nearer of SL and TP, if set"""
+        levels = [(abs(self.last_price - level), reason) for level, reason in ((self.sl, "sl"), (self.tp, "tp")) if level]
+        return min(levels)[1] if levels else "external"
+
+    def to_row(self, closed_at: float) -> tuple:
+        return (
+            self.ticket, self.rule, self.symbol, "buy" if self.is_buy else "sell", self.volume,
+            self.open_price, self.last_price, self.opened_at, closed_at, self.mfe, self.mae,
+            self.mfe_at - self.opened_at, self.mae_at - self.opened_at, self.profit,
+            self.exit_reason or self.inferred_exit_reason(),
+        )
+
+class RuleAggregate:
+    """Running excursion statistics of one rule"""
+    __slots__ = ('count', 'wins', 'profit', 'mfe_sum', 'mfe_max', 'mae_sum', 'mae_max',
+                 'time_to_mfe_sum', 'exits')
+
+    def __init__(self):
+        self.count = 0
+        self.wins = 0
+        self.profit = 0.0
+        self.mfe_sum = 0.0
+        self.mfe_max = 0.0
+        self.mae_sum = 0.0
+        self.mae_max = 0.0
+        self.time_to_mfe_sum = 0.0
+        self.exits = {}
+
+    def add(self, count: int, wins: int, profit: float, mfe_sum: float, mfe_max: float, mae_sum: float,
+            mae_max: float, time_to_mfe_sum: float, exits: Dict[str, int]) -> None:
+        self.count += count
+        self.wins += wins
+        self.profit += profit
+        self.mfe_sum += mfe_sum
+        self.mfe_max = max(self.mfe_max, mfe_max)
+        self.mae_sum += mae_sum
+        self.mae_max = max(self.mae_max, mae_max)
+        self.time_to_mfe_sum += time_to_mfe_sum
+        for reason, exits in exits.items():
+            self.exits[reason] = self.exits.get(reason, 0) + exits
+
+    def to_dict(self) -> Dict:
+        count = max(self.count, 1)
+        return {
+            "trades": self.count,
+            "win_rate": self.wins / count,
+            "profit": self.profit,
+            "avg_mfe": self.mfe_sum / count,
+            "max_mfe": self.mfe_max,
+            "avg_mae": self.mae_sum / count,
+            "max_mae": self.mae_max,
+            "avg_time_to_mfe": self.time_to_mfe_sum / count,
+            "exits": dict(self.exits),
+        }
+
+class ExcursionTracker:
+    """
+    Maximum favourable and adverse excursion of every connector position.
+
+    Positions are tracked from the fill, or adopted from a snapshot when
+    they carry a connector magic number, and moved along with each
+    monitoring snapshot. At close, the excursions, time to peak and exit
+    reason go to the trade history database. Per-rule aggregates are loaded
+    from the database once and then updated with each close.
+    """
+
+    def __init__(self, history, server_offset: Callable[[], Optional[float]] = None):
+        self.history = history
+        self.server_offset = server_offset
+        self._lock = threading.Lock()
+        self._open = {}  # ticket -> Excursion
+        self._aggregates = None  # rule -> RuleAggregate, loaded on first query
+
+    def track(self, ticket: int, rule: str, symbol: str, is_buy: bool, volume: float, price: float) -> None:
+        """Start tracking a position the connector opened, or follow a netting position it added to"""
+        with self._lock:
+            excursion = self._open.get(ticket)
+            if excursion is not None and excursion.is_buy == is_buy:
+                # Excursions keep counting from the averaged open price
+                excursion.volume = volume
+                excursion.open_price = price
+                return
+            self._open[ticket] = Excursion(ticket, rule, symbol, is_buy, volume, price, time.time())
+
+    def _opened_at(self, position, now: float) -> float:
+        """Local time a found position opened, from its server time, or now while the offset is unknown"""
+        offset = self.server_offset() if self.server_offset else None
+        if offset is None or not getattr(position, 'time', 0):
+            return now
+        return min(now, position.time - offset)
+
+    def adopt(self, position, rule: str, is_buy: bool) -> None:
+        """Start tracking a connector position found in a snapshot, if it isn't tracked yet"""
+        now = time.time()
+        with self._lock:
+            if position.ticket not in self._open:
+                self._open[position.ticket] = Excursion(
+                    position.ticket, rule, position.symbol, is_buy, position.volume, position.price_open,
+                    self._opened_at(position, now)
+                )
+
+    def tickets(self) -> Set[int]:
+        """Tickets of the tracked positions"""
+        return set(self._open)
+
+    def symbols(self) -> Set[str]:
+        """Symbols of the tracked positions"""
+        return {excursion.symbol for excursion in list(self._open.values())}
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def mark_exit(self, tickets: Iterable[int], reason: str) -> None:
+        """Record why the connector is closing positions, before it closes them"""
+        for ticket in tickets:
+            excursion = self._open.get(ticket)
+            if excursion is not None:
+                excursion.exit_reason = reason
+
+    def update(self, snapshot, symbols: Optional[Iterable[str]], magic_numbers: Set[int],
+               rule_for=None) -> int:
+        """
+        Move tracked positions with a snapshot and record the ones that closed.
+
+        Args:
+            snapshot (PositionSnapshot): Positions on the given symbols
+            symbols: Symbols the snapshot covers, or None for the whole account
+            magic_numbers (set): Connector magic numbers, to adopt untracked positions
+            rule_for (callable): Maps a symbol to its rule, for adopted positions
+
+        Returns:
+            int: Number of closed positions recorded
+        """
+        now = time.time()
+        covered = set(symbols) if symbols is not None else None
+        closed = []
+        with self._lock:
+            for position in snapshot:
+                excursion = self._open.get(position.ticket)
+                if excursion is None:
+                    if position.magic not in magic_numbers:
+                        continue
+                    rule = rule_for(position.symbol) if rule_for else None
+                    excursion = Excursion(
+                        position.ticket, rule.get("symbol") if rule else position.symbol, position.symbol,
+                        snapshot.is_buy(position), position.volume, position.price_open,
+                        self._opened_at(position, now)
+                    )
+                    self._open[position.ticket] = excursion
+                excursion.update(position.price_current, now)
+                excursion.volume = position.volume
+                excursion.sl = position.sl
+                excursion.tp = position.tp
+                excursion.profit = position.profit
+
+            for ticket, excursion in list(self._open.items()):
+                if ticket in snapshot or (covered is not None and excursion.symbol not in covered):
+                    continue
+                # Tracked after the snapshot was taken, e.g. filled while it was fetched
+                if excursion.tracked_at > snapshot.taken_at:
+                    continue
+                closed.append(self._open.pop(ticket))
+
+        for excursion in closed:
+            self._record(excursion, now)
+        return len(closed)
+
+    def finish(self, ticket: int, reason: str) -> None:
+        """Record a position as closed right away, e.g. a netting position that was reversed"""
+        with self._lock:
+            excursion = self._open.pop(ticket, None)
+        if excursion is not None:
+            self.record(excursion, reason)
+
+    def detach(self, tickets: Iterable[int]) -> Dict[int, Excursion]:
+        """Stop tracking positions without recording them, until their close is known"""
+        with self._lock:
+            return {ticket: self._open.pop(ticket) for ticket in tickets if ticket in self._open}
+
+    def record(self, excursion: Excursion, reason: str, close_price: float = None,
+               profit: float = None, closed_at: float = None) -> None:
+        """Record a detached position as closed, at its closing deal when known"""
+        excursion.exit_reason = reason
+        if close_price is not None:
+            excursion.update(close_price, closed_at or time.time())
+        if profit is not None:
+            excursion.profit = profit
+        self._record(excursion, closed_at or time.time())
+
+    def _record(self, excursion: Excursion, closed_at: float) -> None:
+        """Store a closed position and add it to its rule's aggregate"""
+        row = excursion.to_row(closed_at)
+        # Under the lock, so a first stats() load can't count the row and then have it added again
+        with self._lock:
+            self.history.record_excursion(row)
+            if self._aggregates is not None:
+                self._aggregates.setdefault(excursion.rule, RuleAggregate()).add(
+                    1, 1 if excursion.profit > 0 else 0, excursion.profit, excursion.mfe, excursion.mfe,
+                    excursion.mae, excursion.mae, row[11], {row[14]: 1}
+                )
+
+    def stats(self, rule: str = None) -> Dict:
+        """
+        Excursion statistics per rule.
+
+        Args:
+            rule (str): Only this rule's statistics
+
+        Returns:
+            dict: rule -> trades, win_rate, profit, avg/max MFE and MAE,
+            avg_time_to_mfe (seconds) and exit reason counts
+        """
+        with self._lock:
+            if self._aggregates is None:
+                # Closes still queued for the database must be in the aggregates too
+                self.history.write_pending()
+                aggregates = {}
+                for row in self.history.excursion_aggregates():
+                    (rule_name, reason, count, wins, profit, mfe_sum, mfe_max, mae_sum, mae_max,
+                     time_to_mfe_sum) = row
+                    aggregates.setdefault(rule_name, RuleAggregate()).add(
+                        count, wins, profit, mfe_sum, mfe_max, mae_sum, mae_max, time_to_mfe_sum, {reason: count}
+                    )
+                self._aggregates = aggregates
+            if rule is not None:
+                aggregate = self._aggregates.get(rule)
+                return {rule: aggregate.to_dict()} if aggregate else {}
+            return {name: aggregate.to_dict() for name, aggregate in self._aggregates.items()}
@@ -0,0 +1,132 @@
+from typing import Dict, Optional
+
+class ExecutionRouter:
+    """
+    Routes MetaTrader5 calls to the live terminal or the paper backend.
+
+    With 'execution_backend': 'paper' in the config, or without the
+    MetaTrader5 package (e.g. on Linux), every call goes to the paper
+    backend and no terminal is needed. Otherwise rules with 'paper': true
+    send their symbols' orders and positions to the paper backend, which
+    fills them from the live quotes, and everything else trades live.
+    """
+
+    def __init__(self, live, paper, resolver, config):
+        self.live = live
+        self.paper = paper
+        self.resolver = resolver
+        self.config = config
+        self._version = None
+        self._paper_only = live is None
+
+    def __getattr__(self, name):
+        # Module constants, cached on first use
+        value = getattr(self.live if self.live is not None else self.paper, name)
+        if name.isupper():
+            setattr(self, name, value)
+        return value
+
+    def paper_only(self) -> bool:
+        """Check if every call goes to the paper backend"""
+        if self.live is None:
+            return True
+        if self._version != self.config.version:
+            self._paper_only = self.config.get("execution_backend", "mt5") == "paper"
+            self._version = self.config.version
+        return self._paper_only
+
+    def _is_paper_symbol(self, symbol: Optional[str]) -> bool:
+        """Check if a symbol's rule trades on the paper backend"""
+        if not symbol:
+            return False
+        rule = self.resolver.rule_for(symbol)
+        return bool(rule and rule.get("paper", False))
+
+    def _backend(self, symbol: str = None, ticket: int = None):
+        """Backend owning a symbol or ticket"""
+        if self.paper_only():
+            return self.paper
+        if ticket and self.paper.owns(ticket):
+            return self.paper
+        if self._is_paper_symbol(symbol):
+            return self.paper
+        return self.live
+
+    def backend_for(self, symbol: str = None):
+        """Backend that trades a symbol, or the account's backend without one"""
+        return self._backend(symbol)
+
+    # Connection and account
+
+    def initialize(self, **kwargs) -> bool:
+        if self.paper_only():
+            return self.paper.initialize(**kwargs)
+        if not self.live.initialize(**kwargs):
+            return False
+        # Paper rules fill from the live quotes of the terminal just connected
+        return self.paper.initialize()
+
+    def shutdown(self) -> None:
+        self.paper.shutdown()
+        if self.live is not None:
+            self.live.shutdown()
+
+    def last_error(self):
+        return self._backend().last_error()
+
+    def terminal_info(self):
+        return self._backend().terminal_info()
+
+    def account_info(self):
+        return self._backend().account_info()
+
+    # Symbols and quotes
+
+    def symbols_get(self, *args, **kwargs):
+        return self._backend().symbols_get(*args, **kwargs)
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        return self._backend().symbol_select(symbol, enable)
+
+    def symbol_info(self, symbol: str):
+        return self._backend().symbol_info(symbol)
+
+    def symbol_info_tick(self, symbol: str):
+        return self._backend().symbol_info_tick(symbol)
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start: int, count: int):
+        return self._backend().copy_rates_from_pos(symbol, timeframe, start, count)
+
+    # Orders and positions
+
+    def order_send(self, request: Dict):
+        return self._backend(request.get("symbol"), request.get("position")).order_send(request)
+
+    def positions_get(self, symbol: str = None, group: str = None, ticket: int = None):
+        if ticket is not None:
+            return self._backend(ticket=ticket).positions_get(ticket=ticket)
+        if symbol is not None:
+            return self._backend(symbol).positions_get(symbol=symbol)
+        if self.paper_only():
+            return self.paper.positions_get(group=group)
+
+        live = self.live.positions_get(group=group) if group else self.live.positions_get()
+        if live is None:
+            return None
+        return tuple(live) + (self.paper.positions_get(group=group) or ())
+
+    def history_deals_get(self, date_from, date_to):
+        return self._merged_history("history_deals_get", date_from, date_to)
+
+    def history_orders_get(self, date_from, date_to):
+        return self._merged_history("history_orders_get", date_from, date_to)
+
+    def _merged_history(self, method: str, date_from, date_to):
+        """History from the live account plus the paper fills"""
+        paper = getattr(self.paper, method)(date_from, date_to)
+        if self.paper_only():
+            return paper
+        live = getattr(self.live, method)(date_from, date_to)
+        if live is None:
+            return None
+        return tuple(live) + (paper or ())
@@ -0,0 +1,126 @@
+import threading
+import time
+from datetime import date
+from typing import Dict, Optional
+
+class ExposureLedger:
+    """
+    In-memory account exposure used by the pre-trade risk gate.
+
+    The ledger is moved forward by the connector's own fills and closes and
+    reconciled from the positions snapshot the monitor already fetches and
+    the shared account snapshot, so checking an alert against it needs no
+    broker calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lots = {}  # symbol -> [buy lots, sell lots, open positions]
+        self._open_positions = 0
+        self._equity = None
+        self._margin = None
+        self._day = None
+        self._day_start_balance = None
+        self.reconciled_at = None
+
+    def on_fill(self, symbol: str, is_buy: bool, volume: float) -> None:
+        """Record a new position opened by the connector"""
+        with self._lock:
+            lots = self._lots.setdefault(symbol, [0.0, 0.0, 0])
+            lots[0 if is_buy else 1] += volume
+            lots[2] += 1
+            self._open_positions += 1
+
+    def on_close(self, symbol: str, is_buy: bool, volume: float) -> None:
+        """Record a position closed by the connector, given the closed position's side"""
+        with self._lock:
+            lots = self._lots.get(symbol)
+            if lots is not None:
+                side = 0 if is_buy else 1
+                lots[side] = max(0.0, lots[side] - volume)
+                lots[2] = max(0, lots[2] - 1)
+            self._open_positions = max(0, self._open_positions - 1)
+
+    def reconcile(self, snapshot) -> None:
+        """Rebuild lots and position count from a positions snapshot"""
+        lots = {}
+        for position in snapshot:
+            entry = lots.setdefault(position.symbol, [0.0, 0.0, 0])
+            entry[0 if snapshot.is_buy(position) else 1] += position.volume
+            entry[2] += 1
+        with self._lock:
+            self._lots = lots
+            self._open_positions = len(snapshot)
+            self.reconciled_at = time.time()
+
+    def update_account(self, account) -> None:
+        """Update equity, margin and the start-of-day balance from an account snapshot"""
+        with self._lock:
+            self._equity = account.equity
+            self._margin = account.margin
+            today = date.today()
+            if self._day != today:
+                self._day = today
+                self._day_start_balance = account.balance
+
+    def symbol_lots(self, symbol: str) -> float:
+        """Gross lots open on a symbol"""
+        lots = self._lots.get(symbol)
+        return lots[0] + lots[1] if lots else 0.0
+
+    def daily_loss(self) -> float:
+        """Loss since the start of the day, measured on equity"""
+        with self._lock:
+            return self._daily_loss()
+
+    def _daily_loss(self) -> float:
+        """Daily loss without taking the lock"""
+        if self._day_start_balance is None or self._equity is None:
+            return 0.0
+        return max(0.0, self._day_start_balance - self._equity)
+
+    def check(self, symbol: str, volume: float, rule: Dict, limits: Dict,
+              closes_symbol: bool = False) -> Optional[str]:
+        """
+        Check an order against the rule and account limits.
+
+        Args:
+            symbol (str): Symbol of the order
+            volume (float): Volume of the order
+            rule (dict): The rule; 'max_lots' limits gross lots on the symbol
+            limits (dict): 'max_open_positions', 'max_margin_usage' (percent of
+                equity) and 'daily_loss_cap' (account currency); 0 disables a limit
+            closes_symbol (bool): True if the symbol's positions are closed first
+
+        Returns:
+            str: Reason the order is rejected, or None if it passes
+        """
+        with self._lock:
+            lots = self._lots.get(symbol)
+            symbol_lots = lots[0] + lots[1] if lots else 0.0
+            symbol_positions_closed = 0
+            if closes_symbol:
+                symbol_lots = 0.0
+                symbol_positions_closed = lots[2] if lots else 0
+
+            max_lots = rule.get("max_lots", 0)
+            if max_lots and symbol_lots + volume > max_lots + 1e-9:
+                return f"{symbol} exposure would be {symbol_lots + volume:g} lots (max {max_lots:g})"
+
+            max_positions = limits.get("max_open_positions", 0)
+            if max_positions and self._open_positions - symbol_positions_closed + 1 > max_positions:
+                return f"{self._open_positions} positions already open (max {max_positions})"
+
+            max_margin_usage = limits.get("max_margin_usage", 0)
+            if max_margin_usage and self._equity and self._margin is not None:
+                usage = self._margin / self._equity * 100
+                if usage >= max_margin_usage:
+                    return f"Margin usage is {usage:.1f}% (max {max_margin_usage:g}%)"
+
+            daily_loss_cap = limits.get("daily_loss_cap", 0)
+            if daily_loss_cap:
+                loss = self._daily_loss()
+                if loss >= daily_loss_cap:
+                    return f"Daily loss of {loss:.2f} reached the cap of {daily_loss_cap:g}"
+
+            return None
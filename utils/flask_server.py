@@ -4,6 +4,8 @@ import os
 import re
 from werkzeug.serving import make_server
 import queue
+from utils.metrics import Metrics
+from utils.stall_watchdog import StallWatchdog
 
 class FlaskServer:
     def __init__(self, host='127.0.0.1', port=5000, use_ssl=False, certfile=None, keyfile=None):
@@ -25,6 +27,13 @@ class FlaskServer:
         def home():
             return jsonify({"status": "running TradevLink server"})
             
+        @self.app.route('/metrics/<license_key>', methods=['GET'])
+        def metrics(license_key):
+            # Same license key as alerts, the metrics show account activity
+            if not self.config or license_key != self.config.get("license_key", ""):
+                return jsonify({"error": "Invalid license key"}), 401
+            return jsonify(Metrics().snapshot())
+            
         @self.app.route('/alert/<license_key>', methods=['POST'])
         def alert(license_key):
             # Validate license key
@@ -106,6 +115,8 @@ class FlaskServer:
         def run_server():
             try:
                 self.server = make_server(self.host, self.port, self.app, ssl_context=ssl_context)
+                # Requests run on this thread between the serve loop's heartbeats, so a hung request stalls it
+                self.server.service_actions = lambda: StallWatchdog().beat("server")
                 self._is_running = True
                 self.server.serve_forever()
             except Exception as e:
@@ -129,6 +140,7 @@ class FlaskServer:
     def stop(self):
         if self.server:
             self.server.shutdown()
+            StallWatchdog().forget("server")
             self.server = None
             self.server_thread = None
             self._is_running = False
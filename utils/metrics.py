@@ -0,0 +1,65 @@
+import threading
+import time
+from typing import Dict
+
+class Metrics:
+    """
+    Process-wide counters, gauges and timings.
+
+    Counters only go up, gauges hold the last value set, and observations
+    keep count, sum, min, max and last value. A snapshot is a plain dict
+    that can be logged or served as is.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(Metrics, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._observations = {}  # name -> [count, sum, min, max, last]
+        self.started_at = time.time()
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        """Increase a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set(self, name: str, value: float) -> None:
+        """Set a gauge"""
+        self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one observation, e.g. a latency in ms"""
+        with self._lock:
+            stats = self._observations.get(name)
+            if stats is None:
+                self._observations[name] = [1, value, value, value, value]
+                return
+            stats[0] += 1
+            stats[1] += value
+            stats[2] = min(stats[2], value)
+            stats[3] = max(stats[3], value)
+            stats[4] = value
+
+    def snapshot(self) -> Dict:
+        """Get all metrics"""
+        with self._lock:
+            observations = {
+                name: {"count": count, "avg": total / count, "min": low, "max": high, "last": last}
+                for name, (count, total, low, high, last) in self._observations.items()
+            }
+            return {
+                "uptime": time.time() - self.started_at,
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "observations": observations,
+            }
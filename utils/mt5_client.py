@@ -1,8 +1,29 @@
-import MetaTrader5 as mt5
+try:
+    import MetaTrader5 as mt5
+except ImportError:
+    # Not available outside Windows; the paper backend runs without it
+    mt5 = None
 from typing import Dict, List, Optional, Union, Tuple
-import pandas as pd
 from datetime import datetime
 import time
+from utils.position_snapshot import PositionSnapshot
+from utils.watched_trade_store import WatchedTradeStore
+from utils.trade_history import TradeHistoryDB, TradeHistorySync
+from utils.excursion_tracker import ExcursionTracker
+from utils.account_cache import AccountCache
+from utils.connection_supervisor import ConnectionSupervisor
+from utils.exposure_ledger import ExposureLedger
+from utils.order_templates import OrderTemplates, DEFAULT_MAGIC
+from utils.config_manager import ConfigManager
+from utils.quote_cache import QuoteCache
+from utils.volume_sizer import VolumeSizer
+from utils.session_calendar import SessionCalendar
+from utils.symbol_resolver import SymbolResolver
+from utils.paper_backend import PaperBackend
+from utils.execution_router import ExecutionRouter
+
+# Magic number identifying orders and positions opened by the connector
+MAGIC_NUMBER = DEFAULT_MAGIC
 
 class MT5Client:
     _instance = None
@@ -26,7 +47,22 @@ class MT5Client:
         self._initialized = True
         self._connected = False
         self._connecting = False
-        self._last_connect_attempt = 0
+        self.supervisor = ConnectionSupervisor()
+        self.watched_store = WatchedTradeStore()
+        self.trade_history = TradeHistoryDB()
+        self.excursions = ExcursionTracker(self.trade_history, lambda: self.sessions.server_offset)
+        self.history_sync = None
+        self.exposure = ExposureLedger()
+        self.config = ConfigManager()
+        self.account = AccountCache(self._fetch_account_info, self.config)
+        self.account.subscribe(self.exposure.update_account)
+        self.symbols = SymbolResolver(self._fetch_symbols, self.config)
+        self.paper = PaperBackend(self.config, mt5)
+        self.mt5 = ExecutionRouter(mt5, self.paper, self.symbols, self.config)
+        self.templates = OrderTemplates(self.mt5, self.symbols)
+        self.quotes = None
+        self.sizer = VolumeSizer(self._fetch_symbol_info, self.symbols)
+        self.sessions = SessionCalendar(self._fetch_m1_rates, self._fetch_symbol_info, self._fetch_tick, self.symbols)
 
     def _log_message(self, message: str, webhook_type: str = None):
         """Safely log a message to UI and optionally send webhook"""
@@ -42,6 +78,9 @@ class MT5Client:
         """
         Initialize connection to MetaTrader 5 terminal
         
+        Attempts are paced by the connection supervisor's backoff, and the
+        terminal is launched from the configured path when start_mt5 is set.
+        
         Returns:
             bool: True if connection successful, False otherwise
         """
@@ -54,23 +93,31 @@ class MT5Client:
             return False
             
         try:
-            # Check if we've attempted to connect recently (within 5 seconds)
-            current_time = time.time()
-            if current_time - self._last_connect_attempt < 5:
+            # Wait for the backoff before trying again
+            if not self.supervisor.should_attempt():
                 return False
                 
-            self._last_connect_attempt = current_time
             self._connecting = True
             
+            if not self.mt5.paper_only() and self.supervisor.maybe_launch_terminal():
+                self._log_message("Starting MetaTrader5...")
+            
             # Initialize MT5 connection
-            if not mt5.initialize():
-                self._log_message(f"Failed to initialize MT5: {mt5.last_error()}", 'error')
+            if not self.mt5.initialize(**self.supervisor.initialize_kwargs()):
+                error = self.mt5.last_error()
+                # Only notify about the first failure of an outage
+                attempts = self.supervisor.on_attempt_failed()
+                self._log_message(f"Failed to initialize MT5: {error}", 'error' if attempts == 1 else None)
                 return False
             
             self._connected = True
+            recovery_ms = self.supervisor.on_connected()
+            if recovery_ms is not None:
+                self._log_message(f"Reconnected with MetaTrader5 after {recovery_ms / 1000:.1f}s")
             return True
             
         except Exception as e:
+            self.supervisor.on_attempt_failed()
             self._log_message(f"Error connecting to MT5: {str(e)}", 'error')
             self._connected = False
             return False
@@ -80,125 +127,377 @@ class MT5Client:
     def disconnect(self) -> None:
         """Shutdown connection to MetaTrader 5 terminal"""
         if self._connected:
-            mt5.shutdown()
+            self.mt5.shutdown()
             self._connected = False
     
+    def _on_connection_lost(self) -> None:
+        """Reset state once when an established connection is lost"""
+        self._connected = False
+        self._connecting = False
+        self.account.clear()
+        self.supervisor.on_disconnected()
+        try:
+            self.mt5.shutdown()  # Clean shutdown when connection is lost
+        except Exception:
+            pass
+    
+    @property
+    def connected(self) -> bool:
+        """Last known connection state, without an IPC call to the terminal"""
+        return self._connected
+
     def is_connected(self) -> bool:
         """Check if connected to MetaTrader 5"""
+        if not self._connected:
+            return False
         try:
             # If we think we're connected but MT5 isn't responding, reset state
-            if self._connected and mt5.terminal_info() is None:
-                self._connected = False
-                self._connecting = False
-                self._last_connect_attempt = 0
-                mt5.shutdown()  # Clean shutdown when connection is lost
+            if self.mt5.terminal_info() is None:
+                self._on_connection_lost()
                 return False
-            return self._connected and mt5.terminal_info() is not None
-        except:
-            # If any error occurs, reset connection state
-            self._connected = False
-            self._connecting = False
-            self._last_connect_attempt = 0
-            try:
-                mt5.shutdown()
-            except:
-                pass
+            return True
+        except Exception:
+            self._on_connection_lost()
             return False
     
     def get_account_info(self) -> Optional[Dict]:
         """
-        Get account information
+        Get account information from the shared account snapshot
         
         Returns:
-            dict: Account information or None if failed
+            dict: Account information or None if there is no account
         """
-        if not self.is_connected():
-            return None
-            
+        snapshot = self.account.snapshot
+        return snapshot.to_dict() if snapshot is not None else None
+    
+    def _fetch_account_info(self):
+        """Fetch the raw account info for the account cache"""
         try:
-            account_info = mt5.account_info()
-            if account_info is None:
-                return None
-                
-            return {
-                'login': account_info.login,
-                'server': account_info.server,
-                'balance': account_info.balance,
-                'equity': account_info.equity,
-                'margin': account_info.margin,
-                'free_margin': account_info.margin_free,
-                'leverage': account_info.leverage,
-                'currency': account_info.currency
-            }
+            return self.mt5.account_info()
         except Exception as e:
             self._log_message(f"Error getting account info: {str(e)}", 'error')
             return None
     
-    def place_market_order(self, symbol: str, order_type: str, volume: float, sl: float = None, tp: float = None, comment: str = "", pts: float = None) -> bool:
-        """Place a market order"""
+    def _fetch_tick(self, symbol: str):
+        """Fetch the latest tick for the quote cache"""
+        if not self._connected:
+            return None
         try:
+            return self.mt5.symbol_info_tick(symbol)
+        except Exception:
+            return None
+
+    def _fetch_symbol_info(self, symbol: str):
+        """Fetch symbol metadata for the volume sizer"""
+        if not self._connected:
+            return None
+        try:
+            return self.mt5.symbol_info(symbol)
+        except Exception:
+            return None
+
+    def _fetch_symbols(self):
+        """Fetch the broker's symbol list for the symbol resolver"""
+        if not self._connected:
+            return None
+        try:
+            return self.mt5.symbols_get()
+        except Exception:
+            return None
+
+    def _fetch_m1_rates(self, symbol: str, count: int):
+        """Fetch the latest M1 bars for the session calendar"""
+        if not self._connected:
+            return None
+        try:
+            return self.mt5.copy_rates_from_pos(symbol, self.mt5.TIMEFRAME_M1, 0, count)
+        except Exception:
+            return None
+
+    def _cached_tick(self, symbol: str):
+        """Get the cached tick if it is recent enough to send an order with"""
+        if self.quotes is None:
+            return None
+        max_age = self.config.get("quote_cache", {}).get("max_send_age", 0.2)
+        return self.quotes.fresh_tick(symbol, max_age)
+
+    def _current_tick(self, symbol: str):
+        """Get a recent cached tick, or fetch a fresh one when the cached one is too old"""
+        tick = self._cached_tick(symbol)
+        if tick is None:
+            tick = self.mt5.symbol_info_tick(symbol)
+        return tick
+
+    def start_quote_cache(self) -> None:
+        """Start refreshing quotes for the rule symbols in the background"""
+        quote_config = self.config.get("quote_cache", {})
+        if self.quotes is None and quote_config.get("enabled", True):
+            self.quotes = QuoteCache(
+                self._fetch_tick,
+                lambda symbol: self.mt5.symbol_select(symbol, True),
+                self.symbols,
+                quote_config.get("interval", 0.25)
+            )
+            self.quotes.start()
+
+    def stop_quote_cache(self) -> None:
+        """Stop the background quote refresh"""
+        if self.quotes is not None:
+            self.quotes.stop()
+            self.quotes = None
+
+    def _send_market_order(self, symbol: str, order_type: str, volume: float, comment: str = None, alert_id: str = None):
+        """
+        Send a market deal for a symbol at the current tick
+        
+        Returns:
+            The successful order_send result, or None if the order failed
+        """
+        # A recent cached tick means the symbol is already selected
+        symbol_info = self._cached_tick(symbol)
+        if symbol_info is None:
             # Check if symbol exists and select it in Market Watch
-            if not mt5.symbol_select(symbol, True):
+            if not self.mt5.symbol_select(symbol, True):
                 self._log_message(f"Failed to select symbol {symbol} in Market Watch", 'error')
-                return False
+                return None
 
             # Get symbol info
-            symbol_info = mt5.symbol_info_tick(symbol)
-            if symbol_info is None:
-                self._log_message(f"Failed to get symbol info for {symbol}", 'error')
-                return False
+            symbol_info = self.mt5.symbol_info_tick(symbol)
+        if symbol_info is None:
+            self._log_message(f"Failed to get symbol info for {symbol}", 'error')
+            return None
 
-            # Prepare the request
-            request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "symbol": symbol,
-                "volume": volume,
-                "type": mt5.ORDER_TYPE_BUY if order_type.upper() == "BUY" else mt5.ORDER_TYPE_SELL,
-                "price": symbol_info.ask if order_type.upper() == "BUY" else symbol_info.bid,
-                "deviation": 20,
-                "magic": 8723385465,
-                "comment": comment,
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,
-            }
+        is_buy = order_type.upper() == "BUY"
+
+        # Prepare the request from the symbol's precompiled template
+        request = self.templates.open_request(
+            symbol, is_buy, volume, symbol_info.ask if is_buy else symbol_info.bid, comment
+        )
+        
+        # Send the order
+        result = self.mt5.order_send(request)
+        
+        if result is None:
+            self._log_message("Trade failed to be placed", 'error')
+            return None
             
-            # Send the order
-            result = mt5.order_send(request)
+        if result.retcode != self.mt5.TRADE_RETCODE_DONE:
+            if result.retcode == 10027:
+                self._log_message("Algo Trading is not enabled at MetaTrader 5", 'error')
+            else:
+                self._log_message(f"Trade failed to be executed. Error Code: {result.retcode}", 'error')
+            return None
             
+        # Log successful trade
+        self._log_message(f"Trade #{result.order} executed. {symbol}, {order_type.lower()}@{result.price}, {result.volume}")
+        self.trade_history.link_order(result.order, alert_id)
+        return result
+
+    def _on_position_opened(self, ticket: int, symbol: str, is_buy: bool, volume: float, price: float, sl: float = None, tp: float = None, pts: float = None) -> None:
+        """Start watching a newly opened position and apply its SL/TP"""
+        self.excursions.track(ticket, self.symbols.rule_symbol(symbol) or symbol, symbol, is_buy, volume, price)
+        
+        # Add to watched_trades if pts is set, keeping the run-up of a netting position added to
+        if pts is not None:
+            if ticket in self.watched_trades:
+                self.watched_trades[ticket]["pts"] = pts
+            else:
+                self.watched_trades[ticket] = {"runup": 0, "drawdown": 0, "pts": pts, "symbol": symbol}
+        
+        # If sl or tp is set, modify the position
+        if (sl is not None or tp is not None) and ticket > 0:
+            self.modify_position(ticket, sl, tp)
+
+    def place_market_order(self, symbol: str, order_type: str, volume: float, sl: float = None, tp: float = None, comment: str = None, pts: float = None, alert_id: str = None) -> bool:
+        """Place a market order"""
+        try:
+            result = self._send_market_order(symbol, order_type, volume, comment, alert_id)
             if result is None:
-                self._log_message("Trade failed to be placed", 'error')
                 return False
+            
+            is_buy = order_type.upper() == "BUY"
+            self.exposure.on_fill(symbol, is_buy, result.volume)
+            ticket, volume, price = result.order, result.volume, result.price
+            if self._is_netting_account(symbol):
+                # The deal joins the symbol's net position, which keeps its own ticket
+                positions = self.mt5.positions_get(symbol=symbol)
+                if not positions or PositionSnapshot.is_buy(positions[0]) != is_buy:
+                    return True  # The deal only reduced or flattened the opposite position
+                ticket, volume, price = positions[0].ticket, positions[0].volume, positions[0].price_open
+            self._on_position_opened(ticket, symbol, is_buy, volume, price, sl, tp, pts)
+            return True
+            
+        except Exception as e:
+            self._log_message(f"Error placing market order: {str(e)}", 'error')
+            return False
+
+    def reverse_position(self, symbol: str, order_type: str, volume: float, sl: float = None, tp: float = None, comment: str = None, pts: float = None, alert_id: str = None) -> Optional[bool]:
+        """
+        Flatten the opposite exposure on a symbol and open the new side in one order.
+        
+        On netting accounts a single deal sized to the opposite exposure plus the
+        new volume reverses the position. On hedging accounts one deal opens the
+        new side including the opposite volume, and each opposite position is
+        then closed against it with TRADE_ACTION_CLOSE_BY.
+        
+        Args:
+            symbol (str): The trading symbol
+            order_type (str): 'buy' or 'sell'
+            volume (float): Volume to hold on the new side after the reversal
+            
+        Returns:
+            bool: True if the reversal succeeded, False if it failed, or None if
+            the account or symbol does not allow it and the caller should close
+            and open the usual way
+        """
+        if not self.is_connected():
+            return False
+            
+        try:
+            is_buy = order_type.upper() == "BUY"
+            new_type = self.mt5.POSITION_TYPE_BUY if is_buy else self.mt5.POSITION_TYPE_SELL
+            
+            positions = self.mt5.positions_get(symbol=symbol) or ()
+            opposite = [p for p in positions if p.type != new_type]
+            same_side = [p for p in positions if p.type == new_type]
+            opposite_volume = round(sum(p.volume for p in opposite), 8)
+            
+            if self._is_netting_account(symbol):
+                # A same side net position can't be reversed, use the regular path
+                if same_side:
+                    return None
+                result = self._send_market_order(symbol, order_type, round(opposite_volume + volume, 8), comment, alert_id)
+                if result is None:
+                    return False
+                for position in opposite:
+                    self.exposure.on_close(symbol, not is_buy, position.volume)
+                self.exposure.on_fill(symbol, is_buy, volume)
                 
-            if result.retcode != mt5.TRADE_RETCODE_DONE:
-                if result.retcode == 10027:
-                    self._log_message("Algo Trading is not enabled at MetaTrader 5", 'error')
-                else:
-                    self._log_message(f"Trade failed to be executed. Error Code: {result.retcode}", 'error')
+                # The net position keeps its ticket when it is reversed
+                ticket = opposite[0].ticket if opposite else result.order
+                self.watched_trades.pop(ticket, None)
+                self.excursions.finish(ticket, "reverse")
+                self._on_position_opened(ticket, symbol, is_buy, volume, result.price, sl, tp, pts)
+                return True
+            
+            # Hedging account: close-by must be allowed for the symbol
+            symbol_info = self.mt5.symbol_info(symbol)
+            if symbol_info is None or not (symbol_info.order_mode & self.mt5.SYMBOL_ORDER_CLOSEBY):
+                return None
+            
+            # Close same side positions first, as close_positions_on_entry would
+            if same_side and not self.close_positions_bulk(positions=same_side, reason="entry")['success']:
                 return False
-                
-            # Log successful trade
-            self._log_message(f"Trade #{result.order} executed. {symbol}, {order_type.lower()}@{result.price}, {result.volume}")
             
-            # Add to watched_trades if pts is set
-            if pts is not None:
-                self.watched_trades[result.order] = {"runup": 0, "drawdown": 0, "pts": pts}
+            result = self._send_market_order(symbol, order_type, round(opposite_volume + volume, 8), comment, alert_id)
+            if result is None:
+                return False
+            new_ticket = result.order
             
-            # If sl or tp is set, modify the position
-            if (sl is not None or tp is not None) and result.order > 0:
-                self.modify_position(result.order, sl, tp)
+            success = True
+            untrimmed = 0.0
+            for position in opposite:
+                closed, leftover = self._close_by(new_ticket, position)
+                untrimmed += leftover
+                if closed:
+                    # Done with it now, so no later snapshot or reconciliation reports it as closed elsewhere
+                    self.watched_trades.pop(position.ticket, None)
+                    self.excursions.finish(position.ticket, "reverse")
+                    self.exposure.on_close(symbol, not is_buy, position.volume)
+                else:
+                    success = False
             
-            return True
+            # The new position keeps any opposite volume that couldn't be taken off it
+            new_volume = round(volume + untrimmed, 8)
+            if untrimmed:
+                success = False
+                self._log_message(
+                    f"Trade #{new_ticket} holds {new_volume} instead of {volume} after the reversal, "
+                    f"{round(untrimmed, 8)} could not be trimmed.", 'error'
+                )
+            self.exposure.on_fill(symbol, is_buy, new_volume)
+            
+            self._on_position_opened(new_ticket, symbol, is_buy, new_volume, result.price, sl, tp, pts)
+            return success
             
         except Exception as e:
-            self._log_message(f"Error placing market order: {str(e)}", 'error')
+            self._log_message(f"Error reversing position: {str(e)}", 'error')
+            return False
+
+    def _close_by(self, ticket: int, opposite) -> Tuple[bool, float]:
+        """
+        Close an opposite position against a position, falling back to two regular closes
+        
+        Returns:
+            tuple: (True if the opposite position is closed, volume left on the
+            position that should have been taken off it)
+        """
+        result = self.mt5.order_send(self.templates.close_by_request(ticket, opposite))
+        if result is not None and result.retcode == self.mt5.TRADE_RETCODE_DONE:
+            self._log_message(f"Trade #{opposite.ticket} closed by #{ticket}.")
+            return True, 0.0
+        
+        retcode = result.retcode if result is not None else None
+        self._log_message(f"Trade #{opposite.ticket} could not be closed by #{ticket}. Error Code: {retcode}", 'error')
+        
+        # Close the opposite leg and trim the new position by the same volume
+        tick = self.mt5.symbol_info_tick(opposite.symbol)
+        if tick is None:
+            return False, opposite.volume
+        closed = self._send_close_request(self._build_close_request(opposite, tick), opposite.ticket)
+        position = self.mt5.positions_get(ticket=ticket)
+        if not position:
+            return closed, opposite.volume
+        trim = self._build_close_request(position[0], tick)
+        trim["volume"] = opposite.volume
+        trimmed = self._send_close_request(trim, ticket)
+        return closed, 0.0 if trimmed else opposite.volume
+
+    def _build_close_request(self, position, tick) -> Dict:
+        """Build the opposite deal request that closes a position at the given tick"""
+        is_buy = position.type == self.mt5.POSITION_TYPE_BUY
+        return self.templates.close_request(position, tick.bid if is_buy else tick.ask)
+
+    def _send_close_request(self, request: Dict, ticket: int, log=None) -> bool:
+        """Send a close request and log its outcome, through log if given"""
+        log = log or self._log_message
+        result = self.mt5.order_send(request)
+
+        if result is None:
+            log(f"Trade #{ticket} could not be closed.", 'error')
+            return False
+
+        if result.retcode != self.mt5.TRADE_RETCODE_DONE:
+            log(f"Trade #{ticket} could not be closed. Error Code: {result.retcode}", 'error')
             return False
 
-    def close_position(self, ticket: int) -> bool:
+        log(f"Trade #{ticket} closed.")
+        # The closed position is on the opposite side of the closing deal
+        self.exposure.on_close(request["symbol"], request["type"] == self.mt5.ORDER_TYPE_SELL, request["volume"])
+        return True
+
+    def _is_netting_account(self, symbol: str = None) -> bool:
+        """Check if the account trading a symbol nets positions per symbol"""
+        # Paper symbols of a live account trade on the paper backend's own account
+        backend = self.mt5.backend_for(symbol)
+        snapshot = self.account.snapshot
+        if snapshot is not None and backend is self.mt5.backend_for():
+            return snapshot.is_netting()
+        account_info = backend.account_info()
+        if account_info is None:
+            return False
+        return account_info.margin_mode in (
+            self.mt5.ACCOUNT_MARGIN_MODE_RETAIL_NETTING,
+            self.mt5.ACCOUNT_MARGIN_MODE_EXCHANGE,
+        )
+
+    def close_position(self, ticket: int, reason: str = None) -> bool:
         """
         Close a specific position by its ticket number
         
         Args:
             ticket (int): Position ticket number
+            reason (str): Exit reason recorded with the position's excursions
             
         Returns:
             bool: True if position closed successfully, False otherwise
@@ -208,90 +507,214 @@ class MT5Client:
             
         try:
             # Get position info
-            position = mt5.positions_get(ticket=ticket)
+            position = self.mt5.positions_get(ticket=ticket)
             if position is None or len(position) == 0:
                 self._log_message(f"Position {ticket} not found", 'error')
                 return False
                 
             position = position[0]
+            if reason:
+                self.excursions.mark_exit([ticket], reason)
             
-            # Prepare close request
-            request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "position": ticket,
-                "symbol": position.symbol,
-                "volume": position.volume,
-                "type": mt5.ORDER_TYPE_SELL if position.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY,
-                "price": mt5.symbol_info_tick(position.symbol).bid if position.type == mt5.POSITION_TYPE_BUY else mt5.symbol_info_tick(position.symbol).ask,
-                "deviation": 20,
-                "magic": 8723385465,
-                "comment": "Closed by TradevLink",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,
-            }
+            tick = self._current_tick(position.symbol)
+            if tick is None:
+                self._log_message(f"Failed to get symbol info for {position.symbol}", 'error')
+                return False
             
-            # Send close request
-            result = mt5.order_send(request)
+            return self._send_close_request(self._build_close_request(position, tick), ticket)
             
-            if result is None:
-                self._log_message(f"Trade #{ticket} could not be closed.", 'error')
-                return False
+        except Exception as e:
+            self._log_message(f"Error closing position: {str(e)}", 'error')
+            return False
+
+    def close_positions_bulk(self, positions: Optional[List] = None, symbol: str = None, reason: str = None,
+                             messages: Optional[List] = None) -> Dict:
+        """
+        Close several positions from a single positions snapshot.
+        
+        One tick is fetched per symbol and the close requests are sent back to
+        back in the given order, with logging held back until all are sent.
+        On netting accounts each symbol is closed with a single aggregated
+        opposite deal.
+        
+        Args:
+            positions (list): Raw MT5 positions to close. Fetched once when None.
+            symbol (str): Only fetch positions for this symbol when positions is None
+            reason (str): Exit reason recorded with the positions' excursions
+            messages (list): Collects the (message, webhook type) log entries for
+                the caller to log, instead of logging them after the closes
+            
+        Returns:
+            dict: 'success' (bool), 'results' ({ticket: bool}), 'elapsed_ms' (float),
+            'order' (tickets in the order they were sent) and 'latency_ms'
+            ({ticket: ms from the start until its close returned})
+        """
+        start_time = time.perf_counter()
+        report = {'success': True, 'results': {}, 'elapsed_ms': 0.0, 'order': [], 'latency_ms': {}}
+        deferred = messages if messages is not None else []
+        log = lambda message, webhook_type=None: deferred.append((message, webhook_type))
+        
+        def record(tickets, closed):
+            latency = (time.perf_counter() - start_time) * 1000
+            for ticket in tickets:
+                report['results'][ticket] = closed
+                report['order'].append(ticket)
+                report['latency_ms'][ticket] = latency
+            report['success'] = report['success'] and closed
+        
+        try:
+            if not self.is_connected():
+                report['success'] = False
+                return report
+            
+            # Take one snapshot of the positions to close
+            if positions is None:
+                positions = self.mt5.positions_get(symbol=symbol) if symbol else self.mt5.positions_get()
+            if not positions:
+                return report  # No positions to close
+            if reason:
+                self.excursions.mark_exit([position.ticket for position in positions], reason)
+            
+            # Group positions by symbol and fetch one tick per symbol
+            by_symbol = {}
+            for position in positions:
+                by_symbol.setdefault(position.symbol, []).append(position)
+            ticks = {sym: self._current_tick(sym) for sym in by_symbol}
+            
+            for sym, group in by_symbol.items():
+                tick = ticks[sym]
+                if tick is None:
+                    log(f"Failed to get symbol info for {sym}", 'error')
+                    for position in group:
+                        report['results'][position.ticket] = False
+                    report['success'] = False
+                    continue
                 
-            if result.retcode != mt5.TRADE_RETCODE_DONE:
-                self._log_message(f"Trade #{ticket} could not be closed. Error Code: {result.retcode}", 'error')
-                return False
+                if self._is_netting_account(sym):
+                    # Close the whole net exposure with one opposite deal
+                    net_volume = sum(p.volume if p.type == self.mt5.POSITION_TYPE_BUY else -p.volume for p in group)
+                    if abs(net_volume) < 1e-9:
+                        continue
+                    request = self._build_close_request(group[0], tick)
+                    request["volume"] = round(abs(net_volume), 8)
+                    if net_volume < 0:
+                        request["type"] = self.mt5.ORDER_TYPE_BUY
+                        request["price"] = tick.ask
+                    else:
+                        request["type"] = self.mt5.ORDER_TYPE_SELL
+                        request["price"] = tick.bid
+                    if len(group) > 1:
+                        request.pop("position")
+                    closed = self._send_close_request(request, group[0].ticket, log)
+                    record([position.ticket for position in group], closed)
+                    continue
                 
-            self._log_message(f"Trade #{ticket} closed.")
-            return True
+                # Hedging account: one close request per position, back to back
+                for position in group:
+                    closed = self._send_close_request(self._build_close_request(position, tick), position.ticket, log)
+                    record([position.ticket], closed)
+            
+            return report
             
         except Exception as e:
-            self._log_message(f"Error closing position: {str(e)}", 'error')
-            return False
+            self._log_message(f"Error closing positions: {str(e)}", 'error')
+            report['success'] = False
+            return report
+        finally:
+            report['elapsed_ms'] = (time.perf_counter() - start_time) * 1000
+            if messages is None:
+                for message, webhook_type in deferred:
+                    self._log_message(message, webhook_type)
     
-    def get_positions(self) -> Optional[List[Dict]]:
+    def get_positions_snapshot(self, symbols: Optional[List[str]] = None) -> Optional[PositionSnapshot]:
         """
-        Get all open positions
+        Get open positions as a snapshot indexed by ticket
         
+        Args:
+            symbols (list): Only fetch positions on these symbols, in one call
+            
         Returns:
-            list: List of open positions or None if failed
+            PositionSnapshot: Snapshot of open positions or None if failed
         """
         if not self.is_connected():
             return None
             
         try:
-            positions = mt5.positions_get()
+            if symbols:
+                positions = self.mt5.positions_get(group=",".join(symbols))
+            else:
+                positions = self.mt5.positions_get()
             if positions is None:
                 return None
                 
-            return [{
-                'ticket': pos.ticket,
-                'symbol': pos.symbol,
-                'type': 'BUY' if pos.type == mt5.ORDER_TYPE_BUY else 'SELL',
-                'volume': pos.volume,
-                'open_price': pos.price_open,
-                'current_price': pos.price_current,
-                'sl': pos.sl,
-                'tp': pos.tp,
-                'profit': pos.profit,
-                'comment': pos.comment,
-                'time': datetime.fromtimestamp(pos.time).strftime('%Y-%m-%d %H:%M:%S')
-            } for pos in positions]
+            return PositionSnapshot(positions)
             
         except Exception as e:
             self._log_message(f"Error getting positions: {str(e)}", 'error')
             return None
     
+    def get_positions(self) -> Optional[List[Dict]]:
+        """
+        Get all open positions
+        
+        Returns:
+            list: List of open positions or None if failed
+        """
+        snapshot = self.get_positions_snapshot()
+        if snapshot is None:
+            return None
+        return snapshot.to_dicts()
+    
+    def get_history_deals(self, date_from, date_to) -> Optional[tuple]:
+        """Get history deals in a time range"""
+        if not self.is_connected():
+            return None
+        try:
+            return self.mt5.history_deals_get(date_from, date_to)
+        except Exception as e:
+            self._log_message(f"Error getting history deals: {str(e)}", 'error')
+            return None
+    
+    def get_history_orders(self, date_from, date_to) -> Optional[tuple]:
+        """Get history orders in a time range"""
+        if not self.is_connected():
+            return None
+        try:
+            return self.mt5.history_orders_get(date_from, date_to)
+        except Exception as e:
+            self._log_message(f"Error getting history orders: {str(e)}", 'error')
+            return None
+    
+    def start_history_sync(self, interval_seconds: float = 30) -> None:
+        """Start syncing deal and order history into the local trade database"""
+        if self.history_sync is None:
+            self.history_sync = TradeHistorySync(self, self.trade_history, interval_seconds)
+            self.history_sync.start()
+    
+    def stop_history_sync(self) -> None:
+        """Stop the background history sync"""
+        if self.history_sync is not None:
+            self.history_sync.stop()
+            self.history_sync = None
+    
+    def save_watched_trades(self) -> None:
+        """Persist watched trade changes in one batch"""
+        try:
+            self.watched_store.flush(self.watched_trades)
+        except Exception as e:
+            self._log_message(f"Error saving watched trades: {str(e)}", 'error')
+    
     def modify_position(self, ticket: int, sl: float = None, tp: float = None) -> bool:
         """Modify an existing position"""
         try:
             # Get position details
-            position = mt5.positions_get(ticket=ticket)
+            position = self.mt5.positions_get(ticket=ticket)
             if not position:
                 return False
             position = position[0]
 
             # Calculate sl and tp based on position type
-            is_buy = position.type == mt5.POSITION_TYPE_BUY
+            is_buy = position.type == self.mt5.POSITION_TYPE_BUY
             if is_buy:
                 sl_price = round(position.price_open - sl, 2) if sl is not None else None
                 tp_price = round(position.price_open + tp, 2) if tp is not None else None
@@ -301,7 +724,7 @@ class MT5Client:
 
             # Prepare the request
             request = {
-                "action": mt5.TRADE_ACTION_SLTP,
+                "action": self.mt5.TRADE_ACTION_SLTP,
                 "position": ticket,
                 "symbol": position.symbol,
             }
@@ -313,9 +736,9 @@ class MT5Client:
                 request["tp"] = tp_price
 
             # Send the modification request
-            result = mt5.order_send(request)
+            result = self.mt5.order_send(request)
             if result is not None:
-                if result.retcode == mt5.TRADE_RETCODE_DONE:
+                if result.retcode == self.mt5.TRADE_RETCODE_DONE:
                     # Build modification log message
                     mod_msg = f"Trade #{ticket} modified."
                     if sl_price is not None:
@@ -334,21 +757,43 @@ class MT5Client:
             self._log_message(f"Error modifying position: {str(e)}", 'error')
             return False
 
-    def close_positions_by_symbol(self, symbol: str) -> bool:
-        """Close all positions for a given symbol"""
+    def move_stop_loss(self, position, sl_price: float) -> bool:
+        """
+        Move a position's SL to a price, keeping its TP.
+        
+        Args:
+            position: Raw MT5 position from the current snapshot
+            sl_price (float): New stop loss price
+            
+        Returns:
+            bool: True if the broker accepted the new SL
+        """
         try:
-            # Get all positions for the symbol
-            positions = mt5.positions_get(symbol=symbol)
-            if positions is None:
-                return True  # No positions to close
+            symbol_info = self.sizer.symbol_info(position.symbol)
+            digits = symbol_info.digits if symbol_info is not None else 2
+            sl_price = round(sl_price, digits)
             
-            success = True
-            for position in positions:
-                if not self.close_position(position.ticket):
-                    success = False
-                    
-            return success
+            # An SLTP request replaces both levels, so send the current TP along
+            request = {
+                "action": self.mt5.TRADE_ACTION_SLTP,
+                "position": position.ticket,
+                "symbol": position.symbol,
+                "sl": sl_price,
+                "tp": position.tp,
+            }
+            result = self.mt5.order_send(request)
+            if result is not None and result.retcode == self.mt5.TRADE_RETCODE_DONE:
+                self._log_message(f"Trade #{position.ticket} trailing stop moved. SL@{sl_price}")
+                return True
+            
+            retcode = result.retcode if result is not None else None
+            self._log_message(f"Error moving trailing stop of #{position.ticket}. Error Code: {retcode}")
+            return False
             
         except Exception as e:
-            self._log_message(f"Error closing positions for {symbol}: {str(e)}", 'error')
+            self._log_message(f"Error moving trailing stop: {str(e)}", 'error')
             return False
+
+    def close_positions_by_symbol(self, symbol: str, reason: str = "entry") -> bool:
+        """Close all positions for a given symbol"""
+        return self.close_positions_bulk(symbol=symbol, reason=reason)['success']
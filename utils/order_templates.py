@@ -0,0 +1,153 @@
+import threading
+from typing import Dict, Optional
+
+DEFAULT_MAGIC = 8723385465
+DEFAULT_DEVIATION = 20
+DEFAULT_COMMENT = "TradevLink Alert"
+DEFAULT_CLOSE_COMMENT = "Closed by TradevLink"
+
+# Bits of symbol_info().filling_mode
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+class OrderTemplates:
+    """
+    Precompiled order request templates per (symbol, side).
+
+    Everything in a request that doesn't change between orders (action,
+    type, magic, deviation, comment, time and filling mode) is compiled
+    once from the rule and the symbol metadata. The hot path only copies a
+    template and sets price and volume. Templates are rebuilt when the
+    rules or the symbol metadata change.
+
+    Rules can set 'deviation', 'magic', 'comment' and 'close_comment'.
+    """
+
+    def __init__(self, mt5, resolver):
+        self.mt5 = mt5
+        self.resolver = resolver
+        self._lock = threading.Lock()
+        self._templates = {}  # (symbol, is_buy, is_close) -> request template
+        self._version = None
+
+    def _find_rule(self, symbol: str) -> Dict:
+        """Find the rule for a broker symbol, or an empty rule"""
+        return self.resolver.rule_for(symbol) or {}
+
+    def _filling_mode(self, symbol_info) -> int:
+        """Pick the filling mode the symbol allows, preferring IOC"""
+        mt5 = self.mt5
+        if symbol_info is None or not symbol_info.filling_mode:
+            return mt5.ORDER_FILLING_IOC
+        if symbol_info.filling_mode & SYMBOL_FILLING_IOC:
+            return mt5.ORDER_FILLING_IOC
+        if symbol_info.filling_mode & SYMBOL_FILLING_FOK:
+            return mt5.ORDER_FILLING_FOK
+        return mt5.ORDER_FILLING_RETURN
+
+    def _compile_symbol(self, symbol: str, symbol_info=None) -> Dict:
+        """Build the four templates (open/close, buy/sell) for a symbol"""
+        mt5 = self.mt5
+        rule = self._find_rule(symbol)
+        base = {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": symbol,
+            "deviation": rule.get("deviation", DEFAULT_DEVIATION),
+            "magic": rule.get("magic", DEFAULT_MAGIC),
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": self._filling_mode(symbol_info),
+        }
+        templates = {}
+        for is_buy in (True, False):
+            opening = dict(base)
+            opening["type"] = mt5.ORDER_TYPE_BUY if is_buy else mt5.ORDER_TYPE_SELL
+            opening["comment"] = rule.get("comment", DEFAULT_COMMENT)
+            templates[(symbol, is_buy, False)] = opening
+
+            # Closing a buy position is a sell deal and vice versa
+            closing = dict(base)
+            closing["type"] = mt5.ORDER_TYPE_SELL if is_buy else mt5.ORDER_TYPE_BUY
+            closing["comment"] = rule.get("close_comment", DEFAULT_CLOSE_COMMENT)
+            templates[(symbol, is_buy, True)] = closing
+        return templates
+
+    def compile(self, symbol: str, symbol_info=None) -> None:
+        """(Re)compile the templates for a symbol, e.g. after its metadata changed"""
+        templates = self._compile_symbol(symbol, symbol_info)
+        with self._lock:
+            if self._version != self.resolver.version:
+                self._templates = {}
+                self._version = self.resolver.version
+            self._templates.update(templates)
+
+    def compile_all(self) -> int:
+        """
+        Compile templates for every rule symbol if the rules changed.
+
+        Returns:
+            int: Number of symbols compiled
+        """
+        if self._version == self.resolver.version:
+            return 0
+        symbols = self.resolver.symbols()
+        compiled = {}
+        for symbol in symbols:
+            compiled.update(self._compile_symbol(symbol, self.mt5.symbol_info(symbol)))
+        with self._lock:
+            self._templates = compiled
+            self._version = self.resolver.version
+        return len(symbols)
+
+    def _template(self, symbol: str, is_buy: bool, is_close: bool) -> Dict:
+        """Get a template, compiling it if missing or outdated"""
+        key = (symbol, is_buy, is_close)
+        template = self._templates.get(key) if self._version == self.resolver.version else None
+        if template is None:
+            self.compile(symbol, self.mt5.symbol_info(symbol))
+            template = self._templates[key]
+        return template
+
+    def open_request(self, symbol: str, is_buy: bool, volume: float, price: float,
+                     comment: Optional[str] = None) -> Dict:
+        """Build a market order request from the symbol's template"""
+        request = self._template(symbol, is_buy, False).copy()
+        request["volume"] = volume
+        request["price"] = price
+        if comment:
+            request["comment"] = comment
+        return request
+
+    def close_request(self, position, price: float) -> Dict:
+        """Build the deal request closing a position from the symbol's template"""
+        request = self._template(position.symbol, position.type == self.mt5.POSITION_TYPE_BUY, True).copy()
+        request["position"] = position.ticket
+        request["volume"] = position.volume
+        request["price"] = price
+        return request
+
+    def close_by_request(self, ticket: int, opposite) -> Dict:
+        """Build the request closing an opposite position against a position of the same symbol"""
+        template = self._template(opposite.symbol, opposite.type == self.mt5.POSITION_TYPE_BUY, True)
+        return {
+            "action": self.mt5.TRADE_ACTION_CLOSE_BY,
+            "position": ticket,
+            "position_by": opposite.ticket,
+            "magic": template["magic"],
+            "comment": template["comment"],
+        }
+
+    def magic_numbers(self) -> set:
+        """All magic numbers the connector may use"""
+        magics = {DEFAULT_MAGIC}
+        for rule in self.resolver.rules():
+            if rule.get("magic"):
+                magics.add(rule["magic"])
+        return magics
+
+    def comments(self) -> set:
+        """All opening order comments the connector may use"""
+        comments = {DEFAULT_COMMENT}
+        for rule in self.resolver.rules():
+            if rule.get("comment"):
+                comments.add(rule["comment"])
+        return comments
@@ -0,0 +1,468 @@
+import math
+import random
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Optional
+
+# Same values as the MetaTrader5 module, so requests built for it work unchanged
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_SLTP = 6
+TRADE_ACTION_CLOSE_BY = 10
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+ORDER_TIME_GTC = 0
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+ORDER_STATE_FILLED = 4
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+DEAL_REASON_EXPERT = 3
+DEAL_REASON_SL = 4
+DEAL_REASON_TP = 5
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_STOPS = 10016
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_POSITION_CLOSED = 10036
+ACCOUNT_MARGIN_MODE_RETAIL_NETTING = 0
+ACCOUNT_MARGIN_MODE_EXCHANGE = 1
+ACCOUNT_MARGIN_MODE_RETAIL_HEDGING = 2
+SYMBOL_TRADE_MODE_FULL = 4
+SYMBOL_ORDER_MARKET = 1
+SYMBOL_ORDER_SL = 16
+SYMBOL_ORDER_TP = 32
+SYMBOL_ORDER_CLOSEBY = 64
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+TIMEFRAME_M1 = 1
+
+Tick = namedtuple("Tick", "time bid ask last volume time_msc flags volume_real")
+SymbolInfo = namedtuple(
+    "SymbolInfo",
+    "name visible trade_mode filling_mode order_mode digits point volume_min volume_max "
+    "volume_step trade_tick_size trade_tick_value trade_contract_size"
+)
+TradePosition = namedtuple(
+    "TradePosition",
+    "ticket time time_msc time_update time_update_msc type magic identifier reason volume "
+    "price_open sl tp price_current swap profit symbol comment external_id"
+)
+TradeDeal = namedtuple(
+    "TradeDeal",
+    "ticket order time time_msc type entry magic position_id reason volume price commission "
+    "swap profit fee symbol comment external_id"
+)
+TradeOrder = namedtuple(
+    "TradeOrder",
+    "ticket time_setup time_setup_msc time_done time_done_msc type type_filling state magic "
+    "position_id reason volume_initial volume_current price_open sl tp price_current symbol "
+    "comment external_id"
+)
+OrderSendResult = namedtuple(
+    "OrderSendResult",
+    "retcode deal order volume price bid ask comment request_id retcode_external request"
+)
+AccountInfo = namedtuple(
+    "AccountInfo",
+    "login server balance equity margin margin_free margin_level leverage currency margin_mode trade_mode"
+)
+TerminalInfo = namedtuple("TerminalInfo", "connected trade_allowed name path")
+
+# Paper tickets start high so they can't collide with the broker's tickets
+FIRST_TICKET = 9_000_000_000_000
+
+DEFAULT_SPEC = {
+    "price": 1.0,
+    "spread": 0.0002,
+    "digits": 5,
+    "contract_size": 100000,
+    "volatility": 0.00005,  # Standard deviation of the synthetic price walk per second
+    "volume_min": 0.01,
+    "volume_max": 100.0,
+    "volume_step": 0.01,
+}
+
+class PaperBackend:
+    """
+    Simulated execution backend with the MetaTrader5 module's interface.
+
+    Market orders fill at the latest quote after a simulated latency, with
+    adverse slippage, and are kept as simulated positions whose P&L is marked
+    from the same quotes. SL/TP levels are checked whenever positions are
+    read, so PTS and pause closes in TradeStatusTask behave as on a live
+    account. Quotes come from the live terminal when one is connected, and
+    otherwise from a random walk per symbol, so the whole pipeline runs on
+    any platform without a terminal.
+
+    Settings are read from the 'paper' config block: 'balance', 'leverage',
+    'currency', 'latency_ms' and 'slippage_points' ({'mean', 'jitter'}),
+    'live_quotes', and per-symbol specs in 'symbols' (see DEFAULT_SPEC).
+    The account is a hedging account.
+    """
+
+    def __init__(self, config, quote_source=None):
+        self.config = config
+        self.quote_source = quote_source
+        self._lock = threading.RLock()
+        self._initialized = False
+        self._live_quotes = False
+        self._next_ticket = FIRST_TICKET
+        self._positions = {}  # ticket -> position dict
+        self._deals = []
+        self._orders = []
+        self._walks = {}  # symbol -> [bid, last update time]
+        self._balance = None
+        self._server_offset = 0  # Live server time minus local time, so paper deals sort with live ones
+        self._last_error = (1, "Success")
+
+    def __getattr__(self, name):
+        # Constants of the MetaTrader5 module this backend doesn't define
+        if name.isupper() and self.quote_source is not None:
+            return getattr(self.quote_source, name)
+        raise AttributeError(name)
+
+    def _settings(self) -> Dict:
+        return self.config.get("paper", {})
+
+    def owns(self, ticket: int) -> bool:
+        """Check if a position or order ticket belongs to the paper account"""
+        return ticket is not None and ticket >= FIRST_TICKET
+
+    # Connection
+
+    def initialize(self, **kwargs) -> bool:
+        with self._lock:
+            settings = self._settings()
+            if self._balance is None:
+                self._balance = float(settings.get("balance", 10000.0))
+            # Use live quotes when the terminal is available
+            self._live_quotes = False
+            if self.quote_source is not None and settings.get("live_quotes", True):
+                try:
+                    self._live_quotes = bool(self.quote_source.terminal_info()) or \
+                        bool(self.quote_source.initialize(**kwargs))
+                except Exception:
+                    self._live_quotes = False
+            self._initialized = True
+            return True
+
+    def shutdown(self) -> None:
+        self._initialized = False
+
+    def last_error(self):
+        return self._last_error
+
+    def terminal_info(self) -> Optional[TerminalInfo]:
+        if not self._initialized:
+            return None
+        return TerminalInfo(True, True, "Paper", "")
+
+    # Symbols and quotes
+
+    def _spec(self, symbol: str) -> Dict:
+        spec = dict(DEFAULT_SPEC)
+        spec.update(self._settings().get("symbols", {}).get(symbol, {}))
+        return spec
+
+    def symbols_get(self, group: str = None):
+        return tuple(self.symbol_info(symbol) for symbol in self._settings().get("symbols", {}))
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        if self._live_quotes:
+            return self.quote_source.symbol_select(symbol, enable)
+        return True
+
+    def symbol_info(self, symbol: str) -> Optional[SymbolInfo]:
+        if self._live_quotes:
+            info = self.quote_source.symbol_info(symbol)
+            if info is not None:
+                return info
+        spec = self._spec(symbol)
+        point = 10 ** -spec["digits"]
+        return SymbolInfo(
+            symbol, True, SYMBOL_TRADE_MODE_FULL, SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC,
+            SYMBOL_ORDER_MARKET | SYMBOL_ORDER_SL | SYMBOL_ORDER_TP | SYMBOL_ORDER_CLOSEBY,
+            spec["digits"], point, spec["volume_min"], spec["volume_max"], spec["volume_step"],
+            point, spec["contract_size"] * point, spec["contract_size"]
+        )
+
+    def _synthetic_tick(self, symbol: str) -> Tick:
+        """Advance the symbol's random walk to now and quote it"""
+        spec = self._spec(symbol)
+        now = time.time()
+        with self._lock:
+            walk = self._walks.get(symbol)
+            if walk is None:
+                walk = self._walks[symbol] = [float(spec["price"]), now]
+            elapsed = now - walk[1]
+            if elapsed > 0:
+                walk[0] = max(spec["spread"], walk[0] + random.gauss(0, spec["volatility"] * math.sqrt(elapsed)))
+                walk[1] = now
+            bid = round(walk[0], spec["digits"])
+        ask = round(bid + spec["spread"], spec["digits"])
+        return Tick(int(now), bid, ask, 0.0, 0, int(now * 1000), 6, 0.0)
+
+    def symbol_info_tick(self, symbol: str):
+        if self._live_quotes:
+            tick = self.quote_source.symbol_info_tick(symbol)
+            if tick is not None:
+                delta = tick.time - time.time()
+                rounded = round(delta / 1800) * 1800
+                if abs(delta - rounded) <= 120:
+                    self._server_offset = rounded
+                return tick
+        return self._synthetic_tick(symbol)
+
+    def _now(self) -> float:
+        """Current time on the live server's clock, or local time without one"""
+        return time.time() + self._server_offset
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start: int, count: int):
+        if self._live_quotes:
+            return self.quote_source.copy_rates_from_pos(symbol, timeframe, start, count)
+        return None  # No history, so the session calendar treats the symbol as always open
+
+    # Account
+
+    def _profit(self, position: Dict, price: float, volume: float = None) -> float:
+        info = self.symbol_info(position["symbol"])
+        direction = 1 if position["type"] == POSITION_TYPE_BUY else -1
+        ticks = (price - position["price_open"]) / info.trade_tick_size
+        return round(direction * ticks * info.trade_tick_value * (volume or position["volume"]), 2)
+
+    def account_info(self) -> Optional[AccountInfo]:
+        if not self._initialized:
+            return None
+        settings = self._settings()
+        leverage = settings.get("leverage", 100)
+        with self._lock:
+            self._mark_positions()
+            profit = sum(position["profit"] for position in self._positions.values())
+            margin = sum(
+                position["volume"] * self.symbol_info(position["symbol"]).trade_contract_size
+                * position["price_open"] / leverage
+                for position in self._positions.values()
+            )
+            equity = self._balance + profit
+        return AccountInfo(
+            0, "Paper", round(self._balance, 2), round(equity, 2), round(margin, 2), round(equity - margin, 2),
+            round(equity / margin * 100, 2) if margin else 0.0, leverage, settings.get("currency", "USD"),
+            ACCOUNT_MARGIN_MODE_RETAIL_HEDGING, 0
+        )
+
+    # Positions
+
+    def _mark_positions(self, symbol: str = None) -> None:
+        """Mark positions to the latest quotes and close the ones that hit SL or TP"""
+        ticks = {}
+        for ticket, position in list(self._positions.items()):
+            if symbol is not None and position["symbol"] != symbol:
+                continue
+            tick = ticks.get(position["symbol"])
+            if tick is None:
+                tick = ticks[position["symbol"]] = self.symbol_info_tick(position["symbol"])
+            is_buy = position["type"] == POSITION_TYPE_BUY
+            price = tick.bid if is_buy else tick.ask
+            position["price_current"] = price
+            position["profit"] = self._profit(position, price)
+
+            sl, tp = position["sl"], position["tp"]
+            if sl and (price <= sl if is_buy else price >= sl):
+                self._close(ticket, position["volume"], sl, DEAL_REASON_SL, "[sl]")
+            elif tp and (price >= tp if is_buy else price <= tp):
+                self._close(ticket, position["volume"], tp, DEAL_REASON_TP, "[tp]")
+
+    def _position_tuple(self, position: Dict) -> TradePosition:
+        return TradePosition(
+            position["ticket"], int(position["time"]), int(position["time"] * 1000),
+            int(position["time_update"]), int(position["time_update"] * 1000), position["type"],
+            position["magic"], position["ticket"], DEAL_REASON_EXPERT, position["volume"],
+            position["price_open"], position["sl"], position["tp"], position["price_current"], 0.0,
+            position["profit"], position["symbol"], position["comment"], ""
+        )
+
+    def positions_get(self, symbol: str = None, group: str = None, ticket: int = None):
+        if not self._initialized:
+            return None
+        with self._lock:
+            self._mark_positions(symbol)
+            positions = self._positions.values()
+            if ticket is not None:
+                positions = [p for p in positions if p["ticket"] == ticket]
+            elif symbol is not None:
+                positions = [p for p in positions if p["symbol"] == symbol]
+            elif group:
+                names = set(group.split(","))
+                positions = [p for p in positions if p["symbol"] in names]
+            return tuple(self._position_tuple(p) for p in positions)
+
+    def positions_total(self) -> int:
+        return len(self._positions)
+
+    # Orders
+
+    def _simulate_latency(self) -> None:
+        latency = self._settings().get("latency_ms", {})
+        delay = random.gauss(latency.get("mean", 0), latency.get("jitter", 0)) if latency else 0
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _slippage(self, symbol: str) -> float:
+        """Adverse slippage in price units"""
+        slippage = self._settings().get("slippage_points", {})
+        if not slippage:
+            return 0.0
+        points = max(0.0, random.gauss(slippage.get("mean", 0), slippage.get("jitter", 0)))
+        return round(points) * self.symbol_info(symbol).point
+
+    def _new_ticket(self) -> int:
+        self._next_ticket += 1
+        return self._next_ticket
+
+    def _record(self, position: Dict, deal_type: int, entry: int, volume: float, price: float,
+                profit: float, reason: int, comment: str) -> int:
+        """Record the order and deal of a fill, returning the deal ticket"""
+        now = self._now()
+        order = self._new_ticket()
+        deal = self._new_ticket()
+        self._orders.append(TradeOrder(
+            order, int(now), int(now * 1000), int(now), int(now * 1000), deal_type, ORDER_FILLING_IOC,
+            ORDER_STATE_FILLED, position["magic"], position["ticket"], reason, volume, 0.0, price,
+            position["sl"], position["tp"], price, position["symbol"], comment, ""
+        ))
+        self._deals.append(TradeDeal(
+            deal, order, int(now), int(now * 1000), deal_type, entry, position["magic"], position["ticket"],
+            reason, volume, price, 0.0, 0.0, profit, 0.0, position["symbol"], comment, ""
+        ))
+        return deal
+
+    def _close(self, ticket: int, volume: float, price: float, reason: int, comment: str) -> Optional[int]:
+        """Close some or all of a position at a price, returning the deal ticket"""
+        position = self._positions.get(ticket)
+        if position is None:
+            return None
+        volume = min(volume, position["volume"])
+        profit = self._profit(position, price, volume)
+        self._balance += profit
+        deal_type = DEAL_TYPE_SELL if position["type"] == POSITION_TYPE_BUY else DEAL_TYPE_BUY
+        deal = self._record(position, deal_type, DEAL_ENTRY_OUT, volume, price, profit, reason, comment)
+        position["volume"] = round(position["volume"] - volume, 8)
+        position["time_update"] = self._now()
+        if position["volume"] <= 1e-9:
+            del self._positions[ticket]
+        return deal
+
+    def _result(self, retcode: int, request: Dict, deal: int = 0, order: int = 0,
+                volume: float = 0.0, price: float = 0.0, tick=None, comment: str = "") -> OrderSendResult:
+        return OrderSendResult(
+            retcode, deal, order, volume, price, tick.bid if tick else 0.0, tick.ask if tick else 0.0,
+            comment, 0, 0, request
+        )
+
+    def order_send(self, request: Dict) -> Optional[OrderSendResult]:
+        if not self._initialized:
+            self._last_error = (-10004, "No IPC connection")
+            return None
+        self._simulate_latency()
+        action = request.get("action")
+        with self._lock:
+            if action == TRADE_ACTION_DEAL:
+                return self._deal(request)
+            if action == TRADE_ACTION_SLTP:
+                return self._modify(request)
+            if action == TRADE_ACTION_CLOSE_BY:
+                return self._close_by(request)
+            return self._result(TRADE_RETCODE_INVALID, request, comment="Unsupported action")
+
+    def _deal(self, request: Dict) -> OrderSendResult:
+        symbol = request["symbol"]
+        volume = request.get("volume", 0.0)
+        if volume <= 0:
+            return self._result(TRADE_RETCODE_INVALID_VOLUME, request, comment="Invalid volume")
+
+        tick = self.symbol_info_tick(symbol)
+        if tick is None:
+            return self._result(TRADE_RETCODE_PRICE_OFF, request, comment="No prices")
+        is_buy = request["type"] == ORDER_TYPE_BUY
+        slippage = self._slippage(symbol)
+        price = tick.ask + slippage if is_buy else tick.bid - slippage
+
+        ticket = request.get("position")
+        if ticket:
+            if ticket not in self._positions:
+                return self._result(TRADE_RETCODE_POSITION_CLOSED, request, tick=tick, comment="Position closed")
+            deal = self._close(ticket, volume, price, DEAL_REASON_EXPERT, request.get("comment", ""))
+            return self._result(TRADE_RETCODE_DONE, request, deal, self._orders[-1].ticket, volume, price, tick)
+
+        now = self._now()
+        ticket = self._new_ticket()
+        position = {
+            "ticket": ticket, "symbol": symbol, "type": POSITION_TYPE_BUY if is_buy else POSITION_TYPE_SELL,
+            "volume": volume, "price_open": price, "price_current": price, "sl": request.get("sl", 0.0),
+            "tp": request.get("tp", 0.0), "profit": 0.0, "magic": request.get("magic", 0),
+            "comment": request.get("comment", ""), "time": now, "time_update": now,
+        }
+        self._positions[ticket] = position
+        deal = self._record(position, DEAL_TYPE_BUY if is_buy else DEAL_TYPE_SELL, DEAL_ENTRY_IN, volume, price,
+                            0.0, DEAL_REASON_EXPERT, position["comment"])
+        # The position ticket doubles as the opening order ticket, as on a hedging account
+        return self._result(TRADE_RETCODE_DONE, request, deal, ticket, volume, price, tick)
+
+    def _modify(self, request: Dict) -> OrderSendResult:
+        position = self._positions.get(request.get("position"))
+        if position is None:
+            return self._result(TRADE_RETCODE_POSITION_CLOSED, request, comment="Position closed")
+        sl = request.get("sl", position["sl"])
+        tp = request.get("tp", position["tp"])
+        tick = self.symbol_info_tick(position["symbol"])
+        is_buy = position["type"] == POSITION_TYPE_BUY
+        price = tick.bid if is_buy else tick.ask
+        if (sl and (sl >= price if is_buy else sl <= price)) or (tp and (tp <= price if is_buy else tp >= price)):
+            return self._result(TRADE_RETCODE_INVALID_STOPS, request, tick=tick, comment="Invalid stops")
+        position["sl"] = sl
+        position["tp"] = tp
+        position["time_update"] = self._now()
+        return self._result(TRADE_RETCODE_DONE, request, tick=tick)
+
+    def _close_by(self, request: Dict) -> OrderSendResult:
+        position = self._positions.get(request.get("position"))
+        opposite = self._positions.get(request.get("position_by"))
+        if position is None or opposite is None:
+            return self._result(TRADE_RETCODE_POSITION_CLOSED, request, comment="Position closed")
+        if position["symbol"] != opposite["symbol"] or position["type"] == opposite["type"]:
+            return self._result(TRADE_RETCODE_INVALID, request, comment="Invalid close by")
+        # Both legs close at the opposite position's open price
+        volume = min(position["volume"], opposite["volume"])
+        price = opposite["price_open"]
+        self._close(opposite["ticket"], volume, price, DEAL_REASON_EXPERT, "[close by]")
+        deal = self._close(position["ticket"], volume, price, DEAL_REASON_EXPERT, "[close by]")
+        return self._result(TRADE_RETCODE_DONE, request, deal, self._orders[-1].ticket, volume, price)
+
+    # History
+
+    def history_deals_get(self, date_from, date_to):
+        start, end = self._time_range(date_from, date_to)
+        with self._lock:
+            return tuple(deal for deal in self._deals if start <= deal.time <= end)
+
+    def history_orders_get(self, date_from, date_to):
+        start, end = self._time_range(date_from, date_to)
+        with self._lock:
+            return tuple(order for order in self._orders if start <= order.time_done <= end)
+
+    @staticmethod
+    def _time_range(date_from, date_to):
+        to_seconds = lambda value: value.timestamp() if hasattr(value, "timestamp") else value
+        return to_seconds(date_from), to_seconds(date_to)
+
+# Expose the constants on the backend, as the MetaTrader5 module does
+for _name, _value in list(globals().items()):
+    if _name.isupper() and isinstance(_value, int) and _name != "FIRST_TICKET":
+        setattr(PaperBackend, _name, _value)
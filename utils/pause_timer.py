@@ -0,0 +1,260 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+from utils.metrics import Metrics
+from utils.periodic_task import Scheduler
+
+class PauseTimer:
+    """
+    Closes connector positions at the start of 'close_positions_on_pause' pauses.
+
+    The next closing pause start of every rule symbol is loaded as a one-shot
+    timer on the shared scheduler, with symbols that pause at the same time
+    sharing a timer. At the boundary every position on those symbols that
+    carries one of the connector's magic numbers is closed through the bulk
+    close path, whether or not it has a trailing stop. Timers are rebuilt
+    when the rules or schedules change, after each boundary and after a
+    reconnect.
+
+    Timers only cover boundaries still ahead, so each rebuild also closes
+    positions on symbols already inside a closing pause, e.g. when starting
+    mid-pause or coming back from an outage. A boundary that couldn't fetch
+    positions is retried while the pause lasts, and the monitoring tick
+    checks its own snapshot as a fallback. All paths share one set of
+    in-flight tickets, so a position is only closed once.
+    """
+
+    # How far ahead to look for the next pause, in days
+    LOOKAHEAD_DAYS = 7
+    # Seconds between close attempts when a boundary couldn't fetch positions
+    RETRY_SECONDS = 2
+    # Seconds before a position whose pause close failed is tried again
+    CLOSE_RETRY_SECONDS = 10
+    # Seconds a close attempt is remembered, so an older snapshot doesn't repeat it
+    ATTEMPT_MEMORY_SECONDS = 60
+
+    def __init__(self, mt5_client, parse_time: Callable[[str], int],
+                 is_closing_pause: Callable[[str, Dict], bool]):
+        """
+        Args:
+            mt5_client: The connector's MT5Client
+            parse_time: Converts a schedule's HH:MM to seconds
+            is_closing_pause: Whether a symbol is inside one of its rule's
+                closing pauses right now
+        """
+        self.mt5_client = mt5_client
+        self.parse_time = parse_time
+        self.is_closing_pause = is_closing_pause
+        self.metrics = Metrics()
+        self._lock = threading.Lock()
+        self._jobs = []
+        self._boundaries = {}  # pause start timestamp -> [symbols]
+        self._starts = {}  # symbol -> next pause start timestamp
+        self._symbols = set()  # symbols the timers were built for
+        self._closing = set()  # tickets with a pause close in flight
+        self._attempts = {}  # ticket -> (time of its last pause close, whether it went through)
+        self._version = None
+
+    def next_pause_start(self, rule: Dict, now: float = None) -> Optional[float]:
+        """Timestamp of the rule's next pause start that closes positions"""
+        if not rule.get("active_schedule", True):
+            return None
+        now = now or time.time()
+        today = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        closing = [s for s in rule.get("schedule", []) if s.get("close_positions_on_pause", False)]
+        if not closing:
+            return None
+
+        for offset in range(self.LOOKAHEAD_DAYS + 1):
+            day = today + timedelta(days=offset)
+            day_name = day.strftime("%A")
+            starts = [
+                day.timestamp() + self.parse_time(schedule.get("pause_start", ""))
+                for schedule in closing if schedule.get("day") == day_name
+            ]
+            upcoming = [start for start in starts if start > now]
+            if upcoming:
+                return min(upcoming)
+        return None
+
+    def _candidate_symbols(self) -> Set[str]:
+        """Rule symbols in Market Watch, plus those of tracked positions, which covers wildcard rules"""
+        client = self.mt5_client
+        return set(client.symbols.symbols()) | client.excursions.symbols()
+
+    def _paused_symbols(self, symbols) -> List[str]:
+        """The symbols that are inside a closing pause right now"""
+        resolver = self.mt5_client.symbols
+        paused = []
+        for symbol in symbols:
+            rule = resolver.rule_for(symbol)
+            if rule and self.is_closing_pause(symbol, rule):
+                paused.append(symbol)
+        return paused
+
+    def rebuild(self) -> int:
+        """
+        Replace the timers with the next pause start of every rule symbol,
+        and close positions on symbols already inside a closing pause.
+
+        Returns:
+            int: Number of timers scheduled
+        """
+        resolver = self.mt5_client.symbols
+        version = resolver.version
+        candidates = self._candidate_symbols()
+        now = time.time()
+        boundaries = {}
+        for symbol in candidates:
+            rule = resolver.rule_for(symbol)
+            start = self.next_pause_start(rule, now) if rule else None
+            if start is not None:
+                boundaries.setdefault(start, []).append(symbol)
+
+        scheduler = Scheduler()
+        with self._lock:
+            for job in self._jobs:
+                job.cancel()
+            self._jobs = [
+                scheduler.schedule_once(lambda start=start, group=group: self._fire(start, group),
+                                        start - time.time(), name=f"PauseTimer {','.join(group)}")
+                for start, group in boundaries.items()
+            ]
+            self._boundaries = boundaries
+            self._starts = {symbol: start for start, group in boundaries.items() for symbol in group}
+            self._symbols = candidates
+            self._version = version
+            self._attempts = {ticket: attempt for ticket, attempt in self._attempts.items()
+                              if now - attempt[0] < self.ATTEMPT_MEMORY_SECONDS}
+
+        # Boundaries that passed before this rebuild have no timer
+        paused = self._paused_symbols(candidates)
+        if paused:
+            self.metrics.incr("pause_timer.catch_ups")
+            self._close_or_retry(paused)
+        return len(boundaries)
+
+    def rebuild_if_changed(self) -> bool:
+        """Rebuild the timers if the rules changed, a boundary passed or a tracked symbol has no timer"""
+        client = self.mt5_client
+        if self._version == client.symbols.version and client.excursions.symbols() <= self._symbols:
+            return False
+        self.rebuild()
+        return True
+
+    def invalidate(self) -> None:
+        """Rebuild and catch up on the next check, e.g. after a reconnect"""
+        self._version = None
+
+    def is_closing(self, ticket: int) -> bool:
+        """Whether a pause close of the position is in flight"""
+        return ticket in self._closing
+
+    def check(self, snapshot) -> None:
+        """
+        Close owned positions in a monitoring snapshot whose symbols are
+        inside a closing pause, as a fallback for the timers.
+
+        Args:
+            snapshot (PositionSnapshot): The monitoring tick's positions
+        """
+        magic_numbers = self.mt5_client.templates.magic_numbers()
+        symbols = {position.symbol for position in snapshot if position.magic in magic_numbers}
+        paused = self._paused_symbols(symbols) if symbols else None
+        if paused and self.close_positions(paused, snapshot):
+            self.metrics.incr("pause_timer.fallback_closes")
+
+    def close_positions(self, symbols: List[str], snapshot) -> bool:
+        """
+        Close the connector's positions on the given symbols.
+
+        Args:
+            symbols (list): Symbols inside a closing pause
+            snapshot (PositionSnapshot): Positions to close from
+
+        Returns:
+            bool: True if any position was sent to close
+        """
+        client = self.mt5_client
+        magic_numbers = client.templates.magic_numbers()
+        wanted = set(symbols)
+        with self._lock:
+            # Skip closes in flight from another path, and positions tried since the snapshot was taken
+            # or whose last close failed just now, e.g. with the market closed for the pause
+            now = time.time()
+            owned = []
+            for position in snapshot:
+                if position.symbol not in wanted or position.magic not in magic_numbers or \
+                        position.ticket in self._closing:
+                    continue
+                attempted_at, closed = self._attempts.get(position.ticket, (0, False))
+                if attempted_at > snapshot.taken_at or (not closed and now - attempted_at < self.CLOSE_RETRY_SECONDS):
+                    continue
+                owned.append(position)
+            self._closing.update(position.ticket for position in owned)
+        if not owned:
+            return False
+
+        results = {}
+        try:
+            client._log_message(f"Closing {len(owned)} position(s) due to trading pause for {', '.join(sorted(wanted))}")
+            report = client.close_positions_bulk(positions=owned, reason="pause")
+            results = report['results']
+            for ticket, closed in results.items():
+                if closed:
+                    client.watched_trades.pop(ticket, None)
+            self.metrics.observe("pause_timer.close_ms", report['elapsed_ms'])
+            self.metrics.incr("pause_timer.positions_closed", sum(results.values()))
+        finally:
+            with self._lock:
+                now = time.time()
+                for position in owned:
+                    self._closing.discard(position.ticket)
+                    self._attempts[position.ticket] = (now, bool(results.get(position.ticket)))
+        return True
+
+    def seconds_until_pause(self, symbol: str) -> Optional[float]:
+        """Seconds until the symbol's next closing pause, or None if no timer is loaded for it"""
+        start = self._starts.get(symbol)
+        if start is None or start < time.time():
+            return None
+        return start - time.time()
+
+    def stop(self) -> None:
+        """Cancel every timer"""
+        with self._lock:
+            for job in self._jobs:
+                job.cancel()
+            self._jobs = []
+            self._starts = {}
+            self._symbols = set()
+            self._version = None
+
+    def _close_or_retry(self, symbols: List[str], retrying: bool = False) -> None:
+        """Close positions on paused symbols, retrying while they stay paused if positions can't be fetched"""
+        client = self.mt5_client
+        snapshot = client.get_positions_snapshot(symbols)
+        if snapshot is not None:
+            self.close_positions(symbols, snapshot)
+            return
+
+        paused = self._paused_symbols(symbols)
+        if not paused:
+            return
+        if not retrying:
+            client._log_message(f"Could not fetch positions for the trading pause on {', '.join(paused)}, retrying", 'error')
+        with self._lock:
+            self._jobs.append(Scheduler().schedule_once(
+                lambda: self._close_or_retry(paused, retrying=True), self.RETRY_SECONDS,
+                name=f"PauseTimer retry {','.join(paused)}"
+            ))
+
+    def _fire(self, start: float, symbols: List[str]) -> None:
+        """Close the connector's positions on the symbols at a pause start"""
+        self.metrics.observe("pause_timer.lateness_ms", (time.time() - start) * 1000)
+        try:
+            self._close_or_retry(symbols)
+        finally:
+            # Load the next boundary of these symbols on the next rebuild
+            self._version = None
@@ -1,36 +1,253 @@
+import heapq
+import itertools
 import threading
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Union
+
+FIXED_RATE = "fixed_rate"
+FIXED_DELAY = "fixed_delay"
+ONCE = "once"
+
+# What a fixed-rate job does when a run overran one or more periods
+SKIP = "skip"  # Drop the missed runs and stay on the original grid
+CATCH_UP = "catch_up"  # Run once right away, then restart the grid from now
+
+class Job:
+    """
+    A scheduled, repeating call with its timing stats.
+
+    Runs of one job never overlap. Cancelling sets an event, so the job is
+    dropped immediately and a waiter wakes up without polling.
+    """
+
+    def __init__(self, fn: Callable, interval: Union[float, Callable], mode: str = FIXED_RATE,
+                 overrun_policy: str = SKIP, name: str = None):
+        self.fn = fn
+        self._interval = interval
+        self.mode = mode
+        self.overrun_policy = overrun_policy
+        self.name = name or getattr(fn, "__qualname__", repr(fn))
+        self.cancelled = threading.Event()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.due = 0.0
+        self.runs = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.errors = 0
+        self._duration = [0.0, 0.0, 0.0]  # last, total, max
+        self._lateness = [0.0, 0.0, 0.0]
+
+    @property
+    def interval(self) -> float:
+        """Current interval in seconds, re-read before every reschedule"""
+        return self._interval() if callable(self._interval) else self._interval
+
+    def cancel(self) -> None:
+        """Stop scheduling the job; a run in progress finishes"""
+        self.cancelled.set()
+        Scheduler().wake()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait for a run in progress to finish"""
+        return self.idle.wait(timeout)
+
+    def _record(self, stats: list, value: float) -> None:
+        stats[0] = value
+        stats[1] += value
+        stats[2] = max(stats[2], value)
+
+    def stats(self) -> Dict:
+        """Run counts and duration/lateness in ms"""
+        runs = max(self.runs, 1)
+        return {
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "overruns": self.overruns,
+            "errors": self.errors,
+            "duration_ms": {"last": self._duration[0] * 1000, "avg": self._duration[1] / runs * 1000,
+                            "max": self._duration[2] * 1000},
+            "lateness_ms": {"last": self._lateness[0] * 1000, "avg": self._lateness[1] / runs * 1000,
+                            "max": self._lateness[2] * 1000},
+        }
+
+    def _next_due(self, started: float, finished: float) -> float:
+        """Due time of the next run, applying the overrun policy"""
+        interval = max(self.interval, 0.001)
+        if self.mode == FIXED_DELAY:
+            return finished + interval
+
+        due = self.due + interval
+        if due >= finished:
+            return due
+        self.overruns += 1
+        if self.overrun_policy == CATCH_UP:
+            return finished
+        missed = int((finished - due) // interval) + 1
+        self.skipped += missed
+        return due + missed * interval
+
+class Scheduler:
+    """
+    Shared timer heap that runs every periodic job.
+
+    One dispatcher thread sleeps on a monotonic-clock heap until the next
+    job is due and hands it to a small worker pool, so the period doesn't
+    drift by the run time and a slow job doesn't hold up the others.
+    """
+    _instance = None
+
+    MAX_WORKERS = 8
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(Scheduler, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._condition = threading.Condition()
+        self._heap = []  # (due, sequence, job)
+        self._sequence = itertools.count()
+        self._jobs = set()
+        self._pool = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="scheduler")
+        self._thread = None
+
+    def schedule(self, fn: Callable, interval: Union[float, Callable], mode: str = FIXED_RATE,
+                 overrun_policy: str = SKIP, delay: float = 0.0, name: str = None) -> Job:
+        """
+        Run fn every interval seconds.
+
+        Args:
+            fn (callable): Function to run, without arguments
+            interval (float or callable): Interval, or a function returning it
+            mode (str): FIXED_RATE (runs on a grid), FIXED_DELAY (interval after each run)
+                or ONCE (a single run after delay)
+            overrun_policy (str): SKIP or CATCH_UP for fixed-rate runs that overran
+            delay (float): Seconds until the first run
+
+        Returns:
+            Job: The scheduled job, with cancel() and stats()
+        """
+        job = Job(fn, interval, mode, overrun_policy, name)
+        job.due = time.monotonic() + delay
+        with self._condition:
+            self._jobs.add(job)
+            heapq.heappush(self._heap, (job.due, next(self._sequence), job))
+            self._ensure_thread()
+            self._condition.notify()
+        return job
+
+    def schedule_once(self, fn: Callable, delay: float, name: str = None) -> Job:
+        """Run fn once after delay seconds"""
+        return self.schedule(fn, 0.0, ONCE, delay=max(0.0, delay), name=name)
+
+    def wake(self) -> None:
+        """Wake the dispatcher, e.g. after a cancellation"""
+        with self._condition:
+            self._condition.notify()
+
+    def jobs(self) -> Dict[str, Dict]:
+        """Stats of every scheduled job by name"""
+        with self._condition:
+            return {job.name: job.stats() for job in self._jobs}
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._dispatch, name="scheduler-dispatch", daemon=True)
+            self._thread.start()
+
+    def _dispatch(self) -> None:
+        """Hand due jobs to the worker pool, sleeping until the next one is due"""
+        with self._condition:
+            while True:
+                # Drop cancelled jobs from the top of the heap
+                while self._heap and self._heap[0][2].cancelled.is_set():
+                    self._jobs.discard(heapq.heappop(self._heap)[2])
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                due, _, job = self._heap[0]
+                now = time.monotonic()
+                if due > now:
+                    self._condition.wait(due - now)
+                    continue
+
+                heapq.heappop(self._heap)
+                job.idle.clear()
+                self._pool.submit(self._execute, job, now)
+
+    def _execute(self, job: Job, dispatched: float) -> None:
+        """Run a job once, record its stats and put it back on the heap"""
+        started = time.monotonic()
+        try:
+            job._record(job._lateness, max(0.0, dispatched - job.due))
+            job.fn()
+        except Exception as e:
+            job.errors += 1
+            print(f"Error in periodic task: {str(e)}")
+            print(traceback.format_exc())
+        finally:
+            finished = time.monotonic()
+            job.runs += 1
+            job._record(job._duration, finished - started)
+            job.idle.set()
+
+        with self._condition:
+            if job.cancelled.is_set() or job.mode == ONCE:
+                self._jobs.discard(job)
+                return
+            job.due = job._next_due(started, finished)
+            heapq.heappush(self._heap, (job.due, next(self._sequence), job))
+            self._condition.notify()
 
 class PeriodicTask:
+    """
+    Base class for tasks that run periodically on the shared scheduler.
+
+    Subclasses override task() and may change self.interval at any time;
+    it's read again before each run is scheduled. Runs are fixed-rate and
+    skip missed periods unless the subclass sets 'mode' or
+    'overrun_policy'.
+    """
+
+    mode = FIXED_RATE
+    overrun_policy = SKIP
+
     def __init__(self, interval_seconds=1):
         self.interval = interval_seconds
         self._running = False
-        self._thread = None
-        
+        self._job: Optional[Job] = None
+
     def start(self):
-        """Start the periodic task in a background thread"""
+        """Start running the task on the scheduler"""
         if not self._running:
             self._running = True
-            self._thread = threading.Thread(target=self._run, daemon=True)
-            self._thread.start()
-    
+            self._job = Scheduler().schedule(
+                self.task, lambda: self.interval, self.mode, self.overrun_policy, name=type(self).__name__
+            )
+
     def stop(self):
-        """Stop the periodic task"""
+        """Stop the task; it won't run again, and a run in progress finishes"""
         self._running = False
-        if self._thread:
-            self._thread = None
-            
-    def _run(self):
-        """Main loop that runs the task periodically"""
-        while self._running:
-            try:
-                self.task()
-            except Exception as e:
-                print(f"Error in periodic task: {str(e)}")
-                print(traceback.format_exc())
-            time.sleep(self.interval)
-    
+        if self._job:
+            self._job.cancel()
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait for a run in progress to finish after stop()"""
+        job = self._job
+        return job.wait(timeout) if job else True
+
+    def stats(self) -> Optional[Dict]:
+        """Run and timing stats of the task's job"""
+        return self._job.stats() if self._job else None
+
     def task(self):
         """Override this method in subclass to define the task"""
         pass
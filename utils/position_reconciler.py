@@ -0,0 +1,189 @@
+import time
+from typing import Dict, Optional
+from utils.config_manager import ConfigManager
+from utils.metrics import Metrics
+from utils.position_snapshot import PositionSnapshot
+
+# Same values as mt5.DEAL_ENTRY_* / mt5.DEAL_REASON_*
+DEAL_ENTRY_OUT = 1
+DEAL_ENTRY_INOUT = 2
+DEAL_ENTRY_OUT_BY = 3
+DEAL_REASONS = {4: "sl", 5: "tp", 6: "stop_out"}
+
+# Length of the order comment field; longer comments are truncated
+MAX_COMMENT_LENGTH = 31
+
+class PositionReconciler:
+    """
+    Rebuilds the connector's view of its positions on startup and reconnect.
+
+    A pass starts from one snapshot of the account. Persisted trailing stop
+    state of positions still open is restored right away. The rest of the
+    positions carrying a connector magic number or opening comment are
+    taken over a chunk per monitoring tick: trades of rules with a trailing
+    stop but no saved state are watched afresh, and excursions are tracked.
+    Known positions missing from the snapshot were closed while the
+    connector was away; they are looked up in the deal history once the
+    open positions are done.
+
+    Config 'reconciliation': 'chunk_size' (positions per tick) and
+    'history_lookback_hours' (deal history searched after a restart).
+    """
+
+    def __init__(self, mt5_client):
+        self.mt5_client = mt5_client
+        self.metrics = Metrics()
+        self._queue = []
+        self._missing = None  # ticket -> detached Excursion or None, until looked up
+        self._counts = {}
+        self._since = None
+        self._last_pass = None
+
+    @property
+    def active(self) -> bool:
+        """Check if a pass is in progress"""
+        return self._missing is not None
+
+    def start(self, snapshot: PositionSnapshot) -> None:
+        """
+        Start a pass from a snapshot of the whole account.
+
+        Tickets the connector knew about but that aren't open anymore are
+        taken out of monitoring right away, so the monitoring tick doesn't
+        record them before their closing deal is known.
+        """
+        client = self.mt5_client
+        self._queue = list(snapshot)
+        self._counts = {"restored": 0, "adopted": 0, "tracked": 0, "closed_offline": 0}
+
+        # Restore persisted state now, so a flush during the pass doesn't drop it
+        stored = client.watched_store.load()
+        magic_numbers = client.templates.magic_numbers()
+        comments = client.templates.comments()
+        stale = []
+        for ticket, trade_data in stored.items():
+            position = snapshot.get(ticket)
+            if position is None or not self._is_owned(position, magic_numbers, comments):
+                stale.append(ticket)
+            elif ticket not in client.watched_trades:
+                trade_data.setdefault("symbol", position.symbol)
+                client.watched_trades[ticket] = trade_data
+                self._counts["restored"] += 1
+
+        known = set(stored) | set(client.watched_trades) | client.excursions.tickets()
+        missing = {ticket for ticket in known if ticket not in snapshot}
+        detached = client.excursions.detach(missing)
+        for ticket in missing:
+            client.watched_trades.pop(ticket, None)
+        # A pass interrupted by another reconnect still reports its offline closes
+        pending = self._missing or {}
+        self._missing = {**pending, **{ticket: detached.get(ticket) for ticket in missing}}
+        client.watched_store.discard(stale)
+
+        # Deals since the last pass in this session, or the lookback window after a restart
+        if not pending:
+            lookback = ConfigManager().get("reconciliation", {}).get("history_lookback_hours", 168)
+            self._since = self._last_pass or time.time() - lookback * 3600
+        self.metrics.incr("reconciliation.passes")
+
+    def step(self) -> bool:
+        """
+        Take over the next chunk of positions, then look up the offline closes.
+
+        Returns:
+            bool: True once the pass is complete
+        """
+        if self._missing is None:
+            return True
+        if self._queue:
+            chunk_size = ConfigManager().get("reconciliation", {}).get("chunk_size", 200)
+            chunk, self._queue = self._queue[:chunk_size], self._queue[chunk_size:]
+            start_time = time.perf_counter()
+            self._take_over(chunk)
+            self.metrics.observe("reconciliation.chunk_ms", (time.perf_counter() - start_time) * 1000)
+            return False
+
+        self._resolve_offline_closes()
+        self._finish()
+        return True
+
+    def _is_owned(self, position, magic_numbers: set, comments: set) -> bool:
+        """Check if a position was opened by the connector"""
+        if position.magic in magic_numbers:
+            return True
+        # Brokers cut comments to the field length, so compare what fits in the field
+        comment = position.comment
+        return bool(comment) and any(
+            comment[:MAX_COMMENT_LENGTH] == known[:MAX_COMMENT_LENGTH] for known in comments
+        )
+
+    def _take_over(self, positions) -> None:
+        """Rebuild monitoring state for the connector's positions among these"""
+        client = self.mt5_client
+        magic_numbers = client.templates.magic_numbers()
+        comments = client.templates.comments()
+        for position in positions:
+            if not self._is_owned(position, magic_numbers, comments):
+                continue
+            rule = client.symbols.rule_for(position.symbol)
+            pts = rule.get("profit_trailing_stop", 0.0) if rule else 0.0
+            if pts and position.ticket not in client.watched_trades:
+                # No saved run-up: trail from the current price on
+                client.watched_trades[position.ticket] = {"runup": 0, "drawdown": 0, "pts": pts, "symbol": position.symbol}
+                self._counts["adopted"] += 1
+
+            client.excursions.adopt(position, rule.get("symbol") if rule else position.symbol,
+                                    PositionSnapshot.is_buy(position))
+            self._counts["tracked"] += 1
+
+    def _closing_deals(self) -> Optional[Dict[int, object]]:
+        """Last closing deal of each missing position, or None if the history is unavailable"""
+        # Deal times are in server time, so pad the window for any offset
+        deals = self.mt5_client.get_history_deals(int(self._since) - 86400, int(time.time()) + 2 * 86400)
+        if deals is None:
+            return None
+        closing = {}
+        for deal in deals:
+            if deal.position_id in self._missing and deal.entry in (DEAL_ENTRY_OUT, DEAL_ENTRY_INOUT, DEAL_ENTRY_OUT_BY):
+                if deal.position_id not in closing or deal.time >= closing[deal.position_id].time:
+                    closing[deal.position_id] = deal
+        return closing
+
+    def _resolve_offline_closes(self) -> None:
+        """Log and record the known positions that closed while the connector was away"""
+        if not self._missing:
+            return
+        client = self.mt5_client
+        closing = self._closing_deals() or {}
+        for ticket, excursion in self._missing.items():
+            deal = closing.get(ticket)
+            if deal is None:
+                reason = "offline"
+                client._log_message(f"Trade #{ticket} was closed while disconnected.")
+            else:
+                reason = DEAL_REASONS.get(deal.reason, "external")
+                client._log_message(
+                    f"Trade #{ticket} was closed while disconnected ({reason}) at {deal.price}, profit {deal.profit}."
+                )
+            if excursion is not None:
+                client.excursions.record(
+                    excursion, reason,
+                    close_price=deal.price if deal is not None else None,
+                    profit=deal.profit if deal is not None else None,
+                )
+        self._counts["closed_offline"] = len(self._missing)
+
+    def _finish(self) -> None:
+        """End the pass and report what it found"""
+        client = self.mt5_client
+        self._missing = None
+        self._last_pass = time.time()
+
+        for name, count in self._counts.items():
+            self.metrics.incr(f"reconciliation.{name}", count)
+        counts = self._counts
+        if counts["restored"] or counts["adopted"] or counts["closed_offline"]:
+            client._log_message(
+                f"Reconciled positions: {counts['restored']} watched trade(s) restored, "
+                f"{counts['adopted']} adopted, {counts['closed_offline']} closed while disconnected"
+            )
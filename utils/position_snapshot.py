@@ -0,0 +1,84 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import time
+
+# Same value as mt5.POSITION_TYPE_BUY / mt5.ORDER_TYPE_BUY
+POSITION_TYPE_BUY = 0
+
+class PositionSnapshot:
+    """
+    Read-only view over the raw tuple returned by mt5.positions_get().
+
+    Positions are kept as the TradePosition named tuples MT5 already returns,
+    so taking a snapshot allocates no per-position objects. Timestamps stay
+    raw and are only formatted on demand for display.
+    """
+    __slots__ = ('positions', 'taken_at', '_index')
+
+    def __init__(self, positions=None, taken_at: float = None):
+        self.positions = positions or ()
+        self.taken_at = time.time() if taken_at is None else taken_at
+        self._index = None
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.positions)
+
+    def __contains__(self, ticket: int) -> bool:
+        return ticket in self._ticket_index()
+
+    def _ticket_index(self) -> Dict[int, int]:
+        """Build the ticket -> position index on first use"""
+        if self._index is None:
+            self._index = {pos.ticket: i for i, pos in enumerate(self.positions)}
+        return self._index
+
+    def get(self, ticket: int):
+        """Get the raw position for a ticket, or None if it isn't open"""
+        i = self._ticket_index().get(ticket)
+        return None if i is None else self.positions[i]
+
+    def tickets(self) -> List[int]:
+        """Get the tickets of all positions in the snapshot"""
+        return [pos.ticket for pos in self.positions]
+
+    def for_symbol(self, symbol: str) -> List:
+        """Get the raw positions for a symbol"""
+        return [pos for pos in self.positions if pos.symbol == symbol]
+
+    def age(self) -> float:
+        """Seconds elapsed since the snapshot was taken"""
+        return time.time() - self.taken_at
+
+    @staticmethod
+    def is_buy(position) -> bool:
+        """Check if a raw position is a buy position"""
+        return position.type == POSITION_TYPE_BUY
+
+    @staticmethod
+    def format_time(position, fmt: str = '%Y-%m-%d %H:%M:%S') -> str:
+        """Format a raw position's open time for display"""
+        return datetime.fromtimestamp(position.time).strftime(fmt)
+
+    @classmethod
+    def to_dict(cls, position) -> Dict:
+        """Convert a raw position to the dict format of MT5Client.get_positions"""
+        return {
+            'ticket': position.ticket,
+            'symbol': position.symbol,
+            'type': 'BUY' if cls.is_buy(position) else 'SELL',
+            'volume': position.volume,
+            'open_price': position.price_open,
+            'current_price': position.price_current,
+            'sl': position.sl,
+            'tp': position.tp,
+            'profit': position.profit,
+            'comment': position.comment,
+            'time': cls.format_time(position)
+        }
+
+    def to_dicts(self) -> List[Dict]:
+        """Convert every position to the dict format of MT5Client.get_positions"""
+        return [self.to_dict(pos) for pos in self.positions]
@@ -0,0 +1,111 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+from utils.periodic_task import PeriodicTask
+
+class Quote:
+    """Latest tick for a symbol with the local times it was fetched and last changed"""
+    __slots__ = ('tick', 'fetched_at', 'changed_at')
+
+    def __init__(self, tick, fetched_at: float, changed_at: float):
+        self.tick = tick
+        self.fetched_at = fetched_at
+        self.changed_at = changed_at
+
+    @property
+    def spread(self) -> float:
+        """Spread in price units"""
+        return self.tick.ask - self.tick.bid
+
+    def age(self, now: float = None) -> float:
+        """Seconds since the quote last changed"""
+        return (now or time.time()) - self.changed_at
+
+    def cache_age(self, now: float = None) -> float:
+        """Seconds since the quote was fetched"""
+        return (now or time.time()) - self.fetched_at
+
+class QuoteCache(PeriodicTask):
+    """
+    Keeps the latest tick for every symbol in alert_rules.
+
+    Ticks are refreshed in the background, so the order path and the spread
+    and staleness filters read them without a broker call. A quote's age is
+    the time since its price last changed, measured on the local clock, so
+    it needs no server time offset.
+    """
+
+    def __init__(self, fetch_tick: Callable, select_symbol: Callable, resolver, interval_seconds: float = 0.25):
+        super().__init__(interval_seconds=interval_seconds)
+        self.fetch_tick = fetch_tick
+        self.select_symbol = select_symbol
+        self.resolver = resolver
+        self._lock = threading.Lock()
+        self._quotes = {}  # symbol -> Quote
+        self._symbols = []
+        self._version = None
+
+    def _rule_symbols(self):
+        """Symbols to refresh, re-read and selected in Market Watch when the rules change"""
+        version = self.resolver.version
+        if self._version != version:
+            symbols = self.resolver.symbols()
+            for symbol in symbols:
+                self.select_symbol(symbol)
+            self._symbols = symbols
+            self._version = version
+        return self._symbols
+
+    def refresh(self, symbol: str) -> Optional[Quote]:
+        """Fetch a fresh tick for one symbol and store it"""
+        tick = self.fetch_tick(symbol)
+        if tick is None:
+            return None
+        now = time.time()
+        with self._lock:
+            previous = self._quotes.get(symbol)
+            changed = previous is None or (tick.bid, tick.ask, tick.time_msc) != \
+                (previous.tick.bid, previous.tick.ask, previous.tick.time_msc)
+            quote = Quote(tick, now, now if changed else previous.changed_at)
+            self._quotes[symbol] = quote
+        return quote
+
+    def task(self):
+        for symbol in self._rule_symbols():
+            self.refresh(symbol)
+
+    def get(self, symbol: str) -> Optional[Quote]:
+        """Get the cached quote for a symbol"""
+        return self._quotes.get(symbol)
+
+    def fresh_tick(self, symbol: str, max_age: float):
+        """Get the cached tick if it was fetched within max_age seconds, else None"""
+        quote = self._quotes.get(symbol)
+        if quote is None or quote.cache_age() > max_age:
+            return None
+        return quote.tick
+
+    def check(self, symbol: str, rule: Dict) -> Optional[str]:
+        """
+        Check a symbol's quote against the rule's 'max_spread' (price units)
+        and 'max_tick_age' (seconds) filters.
+
+        Returns:
+            str: Reason to reject, or None if the quote passes or can't be judged
+        """
+        max_spread = rule.get("max_spread", 0)
+        max_tick_age = rule.get("max_tick_age", 0)
+        if not max_spread and not max_tick_age:
+            return None
+
+        quote = self._quotes.get(symbol)
+        now = time.time()
+        # Without a recent refresh the cache can't judge the quote
+        if quote is None or quote.cache_age(now) > max(1.0, self.interval * 4):
+            return None
+
+        if max_spread and quote.spread > max_spread:
+            return f"spread {quote.spread:g} is above {max_spread:g}"
+        if max_tick_age and quote.age(now) > max_tick_age:
+            return f"last tick is {quote.age(now):.1f}s old (max {max_tick_age:g}s)"
+        return None
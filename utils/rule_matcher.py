@@ -0,0 +1,64 @@
+from fnmatch import fnmatchcase
+from typing import Dict, Optional
+
+WILDCARDS = "*?["
+
+def is_pattern(name: str) -> bool:
+    """Check if a rule symbol or alias is a glob pattern"""
+    return any(char in name for char in WILDCARDS)
+
+class RuleMatcher:
+    """
+    Matches symbols against wildcard rules, compiled once per config.
+
+    Rule symbols and aliases like 'US30*' (a single trailing '*') go into a
+    prefix trie, where the longest matching prefix wins. Any other glob
+    ('*JPY', 'EUR???') is tried after that, in config order. Matching is
+    case-insensitive. Exact symbols are matched before the matcher is asked.
+    """
+
+    # Key of the rule stored on a trie node
+    RULE = ""
+
+    def __init__(self):
+        self._trie = {}
+        self._patterns = []  # [(upper-case pattern, rule)]
+
+    def __bool__(self) -> bool:
+        return bool(self._trie) or bool(self._patterns)
+
+    def add(self, pattern: str, rule: Dict) -> None:
+        """Add a pattern; earlier rules win over later ones with the same pattern"""
+        pattern = pattern.upper()
+        prefix = pattern[:-1]
+        if pattern.endswith("*") and not is_pattern(prefix):
+            node = self._trie
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node.setdefault(self.RULE, rule)
+        else:
+            self._patterns.append((pattern, rule))
+
+    def match(self, symbol: str) -> Optional[Dict]:
+        """
+        Find the rule for a symbol.
+
+        Returns:
+            dict: The longest prefix rule, else the first matching glob rule, else None
+        """
+        symbol = symbol.upper()
+        node = self._trie
+        rule = node.get(self.RULE)
+        for char in symbol:
+            node = node.get(char)
+            if node is None:
+                break
+            rule = node.get(self.RULE, rule)
+        if rule is not None:
+            return rule
+
+        for pattern, pattern_rule in self._patterns:
+            if fnmatchcase(symbol, pattern):
+                return pattern_rule
+        return None
+
@@ -0,0 +1,211 @@
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+MINUTES_PER_WEEK = 7 * 24 * 60
+
+# Same values as mt5.SYMBOL_TRADE_MODE_DISABLED / mt5.SYMBOL_TRADE_MODE_CLOSEONLY
+SYMBOL_TRADE_MODE_DISABLED = 0
+SYMBOL_TRADE_MODE_CLOSEONLY = 3
+
+def minute_of_week(server_timestamp: int) -> int:
+    """Minute of the week, Monday 00:00 = 0, for a server time timestamp"""
+    days = server_timestamp // 86400
+    # 1970-01-01 was a Thursday, three days after a Monday
+    return ((days + 3) % 7) * 1440 + (server_timestamp % 86400) // 60
+
+class SymbolSessions:
+    """Weekly trading minutes of one symbol, learned from its M1 bars"""
+    __slots__ = ('minutes', 'trade_mode', 'built_at')
+
+    def __init__(self, minutes: bytearray, trade_mode: int, built_at: float):
+        self.minutes = minutes
+        self.trade_mode = trade_mode
+        self.built_at = built_at
+
+    def minutes_until_open(self, minute: int) -> Optional[int]:
+        """Minutes from a minute of the week until the next trading minute"""
+        index = self.minutes.find(1, minute)
+        if index == -1:
+            index = self.minutes.find(1)
+            if index == -1:
+                return None
+            return MINUTES_PER_WEEK - minute + index
+        return index - minute
+
+class SessionCalendar:
+    """
+    Per-symbol trading session calendar for rejecting closed-market alerts locally.
+
+    The MT5 Python API doesn't expose the session schedule itself, so each
+    symbol's weekly trading minutes are learned from the M1 bars the broker
+    served over the last two weeks, with short gaps filled in. Symbols too
+    illiquid to have a bar in most of their trading minutes don't get their
+    gaps trusted and are only checked for their trade mode. Symbols whose
+    trade mode is disabled or close-only are treated as closed. The calendar
+    is rebuilt daily and when the rules change, and the server time offset
+    hourly to follow DST changes, outside the order path.
+    """
+
+    HISTORY_BARS = 2 * MINUTES_PER_WEEK
+    # Gaps without bars up to this many minutes count as open
+    GAP_MINUTES = 15
+    # Bars per minute of the hours that had any bar, below which longer gaps don't count as closed
+    MIN_BAR_DENSITY = 0.5
+    REBUILD_SECONDS = 86400
+    OFFSET_REFRESH_SECONDS = 3600
+
+    def __init__(self, fetch_m1_rates: Callable, fetch_symbol_info: Callable, fetch_tick: Callable, resolver):
+        self.fetch_m1_rates = fetch_m1_rates
+        self.fetch_symbol_info = fetch_symbol_info
+        self.fetch_tick = fetch_tick
+        self.resolver = resolver
+        self._lock = threading.Lock()
+        self._sessions = {}  # symbol -> SymbolSessions
+        self._server_offset = None  # server time minus local time, in seconds
+        self._offset_at = 0.0
+        self._built_at = 0.0
+        self._version = None
+        self._building = False
+
+    def _learn_minutes(self, rates) -> bytearray:
+        """Mark every minute of the week that had a bar, then fill short gaps"""
+        minutes = bytearray(MINUTES_PER_WEEK)
+        for rate in rates:
+            minutes[minute_of_week(int(rate['time']))] = 1
+
+        # Too few bars to tell a quiet market from a closed one: only the trade mode decides
+        if self._bar_density(rates, minutes) < self.MIN_BAR_DENSITY:
+            return bytearray(b'\x01') * MINUTES_PER_WEEK
+
+        # Fill short gaps between trading minutes, wrapping around the week
+        if any(minutes):
+            doubled = minutes + minutes
+            last_open = None
+            for i in range(len(doubled)):
+                if doubled[i]:
+                    if last_open is not None and 1 < i - last_open <= self.GAP_MINUTES + 1:
+                        for j in range(last_open + 1, i):
+                            minutes[j % MINUTES_PER_WEEK] = 1
+                    last_open = i
+        return minutes
+
+    @property
+    def server_offset(self) -> Optional[float]:
+        """Server time minus local time in seconds, or None until a fresh tick was seen"""
+        return self._server_offset
+
+    @staticmethod
+    def _bar_density(rates, minutes: bytearray) -> float:
+        """Bars per minute of the hours of the week that had a bar, over the weeks the bars span"""
+        hours = len({minute // 60 for minute in range(MINUTES_PER_WEEK) if minutes[minute]})
+        span = int(rates[-1]['time']) - int(rates[0]['time']) + 60
+        weeks = max(1.0, span / (MINUTES_PER_WEEK * 60))
+        return len(rates) / (hours * 60 * weeks) if hours else 0.0
+
+    def _update_server_offset(self, tick) -> bool:
+        """
+        Estimate the server time offset from a fresh tick, to the nearest half hour.
+
+        Returns:
+            bool: True if the tick was fresh enough to set the offset
+        """
+        if tick is None or not tick.time:
+            return False
+        delta = tick.time - time.time()
+        rounded = round(delta / 1800) * 1800
+        # Only ticks from the last couple of minutes pin down the offset
+        if abs(delta - rounded) > 120:
+            return False
+        self._server_offset = rounded
+        self._offset_at = time.time()
+        return True
+
+    def refresh_offset_if_due(self) -> bool:
+        """Re-estimate the server time offset hourly, from the first rule symbol with a fresh tick"""
+        if time.time() - self._offset_at < self.OFFSET_REFRESH_SECONDS:
+            return False
+        for symbol in self.resolver.symbols():
+            if self._update_server_offset(self.fetch_tick(symbol)):
+                return True
+        # Every market is quiet; try again after the next interval
+        self._offset_at = time.time()
+        return False
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the calendar for every rule symbol.
+
+        Returns:
+            int: Number of symbols with a calendar
+        """
+        sessions = {}
+        version = self.resolver.version
+        for symbol in self.resolver.symbols():
+            self._update_server_offset(self.fetch_tick(symbol))
+            info = self.fetch_symbol_info(symbol)
+            rates = self.fetch_m1_rates(symbol, self.HISTORY_BARS)
+            if info is None or rates is None or len(rates) == 0:
+                continue
+            sessions[symbol] = SymbolSessions(self._learn_minutes(rates), info.trade_mode, time.time())
+
+        with self._lock:
+            self._sessions = sessions
+            self._built_at = time.time()
+            self._version = version
+        return len(sessions)
+
+    def rebuild_if_due(self) -> bool:
+        """Rebuild in the background when the rules changed or a day has passed"""
+        if self._building:
+            return False
+        if self._version == self.resolver.version and time.time() - self._built_at < self.REBUILD_SECONDS:
+            return False
+
+        def run():
+            try:
+                self.rebuild()
+            except Exception as e:
+                print(f"Error building session calendar: {str(e)}")
+            finally:
+                self._building = False
+
+        self._building = True
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+    def status(self, symbol: str) -> Tuple[bool, Optional[float]]:
+        """
+        Check if a symbol's market is open.
+
+        Returns:
+            tuple: (is_open, local timestamp of the next session open or None).
+            Symbols without a calendar, or before the server offset is known,
+            are reported as open.
+        """
+        sessions = self._sessions.get(symbol)
+        if sessions is None:
+            return True, None
+
+        if sessions.trade_mode in (SYMBOL_TRADE_MODE_DISABLED, SYMBOL_TRADE_MODE_CLOSEONLY):
+            return False, None
+
+        if self._server_offset is None:
+            return True, None
+
+        now = time.time()
+        server_now = int(now + self._server_offset)
+        minute = minute_of_week(server_now)
+        if sessions.minutes[minute]:
+            return True, None
+
+        minutes_ahead = sessions.minutes_until_open(minute)
+        if minutes_ahead is None:
+            return False, None
+        return False, now + minutes_ahead * 60 - server_now % 60
+
+    @staticmethod
+    def format_time(timestamp: float) -> str:
+        """Format a local timestamp for the log"""
+        return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
@@ -0,0 +1,190 @@
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from utils.config_manager import ConfigManager
+from utils.metrics import Metrics
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
+
+# Seconds without a heartbeat, or inside one watched call, before a thread counts as stalled
+DEFAULT_DEADLINES = {"monitoring": 30, "alert": 60, "websocket": 60, "server": 90}
+
+class _Heartbeat:
+    __slots__ = ('name', 'thread_id', 'last', 'stalled_since')
+
+    def __init__(self, name: str, thread_id: int, last: float):
+        self.name = name
+        self.thread_id = thread_id
+        self.last = last
+        self.stalled_since = None  # Last heartbeat before the stall
+
+class StallWatchdog:
+    """
+    Detects threads stuck in a call, e.g. an MT5 IPC call that never returns.
+
+    Loops report with beat() on every iteration, and calls that only run
+    now and then, like processing an alert, are wrapped in watch(). A
+    dedicated thread, not the shared scheduler whose workers could be the
+    ones stuck, checks them against per-name deadlines from the config
+    'watchdog' block. On a stall every thread's stack is written to the
+    logs directory once, the stall is counted in the metrics and the
+    on_stall handler is called; on_recover follows when the thread moves
+    again.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(StallWatchdog, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._lock = threading.Lock()
+        self._heartbeats = {}  # name or (name, thread id) -> _Heartbeat
+        self._stop = threading.Event()
+        self._thread = None
+        self.metrics = Metrics()
+        self.on_stall: Optional[Callable[[str, float, Optional[str]], None]] = None
+        self.on_recover: Optional[Callable[[str, float], None]] = None
+
+    def beat(self, name: str) -> None:
+        """Report that a loop is alive"""
+        heartbeat = self._heartbeats.get(name)
+        if heartbeat is None:
+            with self._lock:
+                self._heartbeats[name] = _Heartbeat(name, threading.get_ident(), time.monotonic())
+            return
+        heartbeat.thread_id = threading.get_ident()
+        heartbeat.last = time.monotonic()
+
+    def forget(self, name: str) -> None:
+        """Stop checking a loop, e.g. when it is stopped on purpose"""
+        with self._lock:
+            self._heartbeats.pop(name, None)
+
+    @contextmanager
+    def watch(self, name: str):
+        """Check that the wrapped call returns within the name's deadline"""
+        key = (name, threading.get_ident())
+        with self._lock:
+            self._heartbeats[key] = _Heartbeat(name, key[1], time.monotonic())
+        try:
+            yield
+        finally:
+            with self._lock:
+                heartbeat = self._heartbeats.pop(key, None)
+            if heartbeat is not None and heartbeat.stalled_since is not None:
+                self._recovered(heartbeat)
+
+    def start(self, on_stall: Callable = None, on_recover: Callable = None) -> None:
+        """Start checking in the background"""
+        if on_stall is not None:
+            self.on_stall = on_stall
+        if on_recover is not None:
+            self.on_recover = on_recover
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop checking"""
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            config = ConfigManager().get("watchdog", {})
+            if config.get("enabled", True):
+                try:
+                    self.check(config.get("deadlines", {}))
+                except Exception as e:
+                    print(f"Error in stall watchdog: {str(e)}")
+            self._stop.wait(config.get("interval", 1.0))
+
+    def check(self, deadlines: Dict[str, float] = None) -> int:
+        """
+        Check every heartbeat against its deadline.
+
+        Returns:
+            int: Number of threads currently stalled
+        """
+        deadlines = {**DEFAULT_DEADLINES, **(deadlines or {})}
+        now = time.monotonic()
+        with self._lock:
+            heartbeats = list(self._heartbeats.values())
+
+        stalled = 0
+        for heartbeat in heartbeats:
+            age = now - heartbeat.last
+            if age <= deadlines.get(heartbeat.name, 60):
+                if heartbeat.stalled_since is not None:
+                    self._recovered(heartbeat)
+                continue
+            stalled += 1
+            if heartbeat.stalled_since is None:
+                heartbeat.stalled_since = heartbeat.last
+                self._stalled(heartbeat, age)
+        self.metrics.set("watchdog.stalled", stalled)
+        return stalled
+
+    def _stalled(self, heartbeat: _Heartbeat, age: float) -> None:
+        """Dump the stacks and report a stall, once per stall"""
+        self.metrics.incr("watchdog.stalls")
+        self.metrics.incr(f"watchdog.stalls.{heartbeat.name}")
+        path = self.dump_stacks(heartbeat)
+        if self.on_stall:
+            try:
+                self.on_stall(heartbeat.name, age, path)
+            except Exception as e:
+                print(f"Error in stall handler: {str(e)}")
+
+    def _recovered(self, heartbeat: _Heartbeat) -> None:
+        """Report that a stalled thread moved again"""
+        # A loop's stall ends at its next heartbeat, a watched call's when it returns
+        end = heartbeat.last if heartbeat.last != heartbeat.stalled_since else time.monotonic()
+        duration = end - heartbeat.stalled_since
+        heartbeat.stalled_since = None
+        self.metrics.observe("watchdog.stall_seconds", duration)
+        if self.on_recover:
+            try:
+                self.on_recover(heartbeat.name, duration)
+            except Exception as e:
+                print(f"Error in stall handler: {str(e)}")
+
+    def dump_stacks(self, heartbeat: _Heartbeat) -> Optional[str]:
+        """
+        Write the stack of every thread to the logs directory, the stalled one first.
+
+        Returns:
+            str: Path of the dump, or None if it couldn't be written
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        order = sorted(frames, key=lambda ident: ident != heartbeat.thread_id)
+
+        now = datetime.now()
+        lines = [f"Stall of '{heartbeat.name}' detected at {now.strftime('%Y-%m-%d %H:%M:%S')}", ""]
+        for ident in order:
+            marker = " (stalled)" if ident == heartbeat.thread_id else ""
+            lines.append(f"Thread {names.get(ident, '?')} [{ident}]{marker}:")
+            lines.extend(line.rstrip("\n") for line in traceback.format_stack(frames[ident]))
+            lines.append("")
+
+        try:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            path = os.path.join(LOG_DIR, f"stall-{now.strftime('%Y-%m-%d_%H-%M-%S')}-{heartbeat.name}.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines))
+            return path
+        except Exception as e:
+            print(f"Error writing stack dump: {e}")
+            return None
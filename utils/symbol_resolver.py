@@ -0,0 +1,226 @@
+import string
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.rule_matcher import RuleMatcher, is_pattern
+
+class SymbolResolver:
+    """
+    Maps alert tickers and rule symbols to the broker's symbol names.
+
+    TradingView tickers (XAUUSD) often differ from broker symbols (XAUUSD.m,
+    XAUUSDm). The broker's symbol list is loaded once and refreshed in the
+    background, and indexed by exact name and by base name with the suffix
+    stripped. Rules can declare 'aliases' (other tickers that map to the
+    rule) and a 'broker_suffix' appended to the rule symbol. Every ticker is
+    resolved once per config and symbol list, with misses cached too, so an
+    alert costs a dict lookup.
+
+    Rule symbols and aliases can be glob patterns ('*JPY', 'US30*'). A ticker
+    is matched in this order: exact rule symbols and aliases, the broker
+    symbol of an exact rule, the longest prefix pattern, then other patterns
+    in config order.
+    """
+
+    REFRESH_SECONDS = 3600
+    SUFFIX_SEPARATORS = ".-_#+"
+    MAX_CACHED = 4096
+
+    def __init__(self, fetch_symbols: Callable, config):
+        self.fetch_symbols = fetch_symbols
+        self.config = config
+        self._lock = threading.Lock()
+        self._broker = {}  # upper-case broker name -> broker name
+        self._base = {}  # base name without suffix -> broker name
+        self._rules = {}  # upper-case rule symbol or alias -> rule
+        self._symbols = {}  # rule symbol -> broker symbol
+        self._rule_by_broker = {}  # broker symbol -> rule
+        self._matcher = RuleMatcher()
+        self._visible = []  # broker symbols in Market Watch
+        self._cache = {}  # ticker -> (broker symbol, rule) or (None, None)
+        self._config_version = None
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self._version = 0
+
+    @staticmethod
+    def _base_name(name: str) -> str:
+        """Broker name without its suffix, e.g. 'XAUUSD.m' or 'XAUUSDm' -> 'XAUUSD'"""
+        for index, char in enumerate(name):
+            if index > 0 and char in SymbolResolver.SUFFIX_SEPARATORS:
+                name = name[:index]
+                break
+        stripped = name.rstrip(string.ascii_lowercase)
+        if len(stripped) >= 3:
+            name = stripped
+        return name.upper()
+
+    def load_symbols(self) -> int:
+        """
+        Load the broker's symbol list and rebuild the index.
+
+        Returns:
+            int: Number of broker symbols, or 0 if the list couldn't be fetched
+        """
+        symbols = self.fetch_symbols()
+        if not symbols:
+            return 0
+
+        broker = {}
+        visible = []
+        candidates = {}  # base name -> [(rank, name)]
+        for info in symbols:
+            name = info.name
+            broker[name.upper()] = name
+            if getattr(info, 'visible', False):
+                visible.append(name)
+            base = self._base_name(name)
+            # Prefer the unsuffixed name, then symbols in Market Watch, then the shortest
+            rank = (name.upper() != base, not getattr(info, 'visible', False), len(name), name)
+            candidates.setdefault(base, []).append(rank)
+        base_index = {base: min(ranks)[3] for base, ranks in candidates.items()}
+
+        with self._lock:
+            self._broker = broker
+            self._base = base_index
+            self._visible = visible
+            self._loaded_at = time.time()
+            self._rebuild()
+        return len(broker)
+
+    def refresh_if_due(self) -> bool:
+        """Reload the broker's symbol list in the background when it expired"""
+        if self._refreshing or time.time() - self._loaded_at < self.REFRESH_SECONDS:
+            return False
+
+        def run():
+            try:
+                self.load_symbols()
+            except Exception as e:
+                print(f"Error loading broker symbols: {str(e)}")
+            finally:
+                self._refreshing = False
+
+        self._refreshing = True
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+    def _lookup(self, name: str) -> Optional[str]:
+        """Find a broker symbol by exact name, then by base name"""
+        return self._broker.get(name.upper()) or self._base.get(self._base_name(name))
+
+    def _broker_symbol(self, rule: Dict) -> str:
+        """Broker symbol for a rule, falling back to the rule symbol before the list is loaded"""
+        symbol = rule["symbol"]
+        suffix = rule.get("broker_suffix")
+        if suffix and (not self._broker or (symbol + suffix).upper() in self._broker):
+            return symbol + suffix
+        if not self._broker:
+            return symbol
+        return self._lookup(symbol) or symbol
+
+    def _rebuild(self) -> None:
+        """Rebuild the rule maps from the config; call with the lock held"""
+        rules = {}
+        symbols = {}
+        rule_by_broker = {}
+        matcher = RuleMatcher()
+        for rule in self.config.get("alert_rules", []):
+            symbol = rule.get("symbol")
+            if not symbol:
+                continue
+            for name in [symbol] + list(rule.get("aliases", [])):
+                if is_pattern(name):
+                    matcher.add(name, rule)
+                else:
+                    rules.setdefault(name.upper(), rule)
+            if not is_pattern(symbol):
+                broker_symbol = self._broker_symbol(rule)
+                symbols[symbol] = broker_symbol
+                rule_by_broker.setdefault(broker_symbol, rule)
+
+        # Market Watch symbols covered only by a pattern rule
+        if matcher:
+            for name in self._visible:
+                if name not in rule_by_broker:
+                    rule = matcher.match(name) or matcher.match(self._base_name(name))
+                    if rule is not None:
+                        rule_by_broker[name] = rule
+
+        self._rules = rules
+        self._symbols = symbols
+        self._rule_by_broker = rule_by_broker
+        self._matcher = matcher
+        self._cache = {}
+        self._config_version = self.config.version
+        self._version += 1
+
+    def _ensure_current(self) -> None:
+        """Rebuild the rule maps if the config changed"""
+        if self._config_version != self.config.version:
+            with self._lock:
+                if self._config_version != self.config.version:
+                    self._rebuild()
+
+    @property
+    def version(self) -> int:
+        """Changes whenever the rules or the broker symbol list change"""
+        self._ensure_current()
+        return self._version
+
+    def resolve(self, ticker: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Resolve an alert ticker to a broker symbol and its rule.
+
+        Args:
+            ticker (str): Ticker from the alert, e.g. 'XAUUSD'
+
+        Returns:
+            tuple: (broker symbol, rule), or (None, None) if no rule matches
+        """
+        self._ensure_current()
+        cached = self._cache.get(ticker)
+        if cached is not None:
+            return cached
+
+        rule = self._rules.get(ticker.upper())
+        if rule is not None:
+            # Aliases of pattern rules resolve like any other ticker
+            broker_symbol = self._symbols.get(rule["symbol"]) or (self._broker and self._lookup(ticker)) or ticker
+            result = (broker_symbol, rule)
+        else:
+            # The ticker may be a broker name, or share a base name with a rule's symbol
+            broker_symbol = self._lookup(ticker) if self._broker else None
+            rule = self._rule_by_broker.get(broker_symbol) if broker_symbol else None
+            if rule is None and self._matcher:
+                rule = self._matcher.match(ticker) or self._matcher.match(self._base_name(ticker))
+                if rule is not None and broker_symbol is None:
+                    broker_symbol = ticker + rule.get("broker_suffix", "")
+            result = (broker_symbol, rule) if rule is not None else (None, None)
+
+        if len(self._cache) >= self.MAX_CACHED:
+            self._cache = {}
+        self._cache[ticker] = result
+        return result
+
+    def rule_for(self, broker_symbol: str) -> Optional[Dict]:
+        """Get the rule for a broker symbol, e.g. of an open position"""
+        self._ensure_current()
+        rule = self._rule_by_broker.get(broker_symbol)
+        if rule is None:
+            rule = self.resolve(broker_symbol)[1]
+        return rule
+
+    def rule_symbol(self, broker_symbol: str) -> Optional[str]:
+        """Get the rule symbol a broker symbol maps back to"""
+        rule = self.rule_for(broker_symbol)
+        return rule.get("symbol") if rule else None
+
+    def symbols(self) -> List[str]:
+        """Broker symbols of all rules"""
+        self._ensure_current()
+        return list(self._rule_by_broker)
+
+    def rules(self) -> List[Dict]:
+        """All rules"""
+        return self.config.get("alert_rules", [])
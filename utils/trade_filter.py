@@ -2,6 +2,9 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict
 from utils.config_manager import ConfigManager
 from utils.mt5_client import MT5Client
+from utils.account_pool import AccountPool
+from utils.stall_watchdog import StallWatchdog
+import threading
 import time
 
 class TradeFilter:
@@ -45,6 +48,56 @@ class TradeFilter:
                 'error'
             )
 
+    def _broadcast_to_accounts(self, alert: dict) -> None:
+        """Copy an accepted alert to the additional accounts in the background"""
+        multi_account = self.config.get("multi_account", {})
+        accounts = multi_account.get("accounts", [])
+        if not multi_account.get("enabled", False) or not accounts:
+            return
+
+        def run():
+            try:
+                pool = AccountPool()
+                for failure in pool.configure(accounts):
+                    self._log_message(f"Account {failure['account']}: Could not log in to MT5. {failure['error']}", 'error')
+                start_time = time.perf_counter()
+                results = pool.broadcast(alert, timeout=multi_account.get("timeout", 10))
+                elapsed_ms = int((time.perf_counter() - start_time) * 1000)
+
+                for result in results:
+                    latency_ms = int(result.get("latency_ms", 0))
+                    if result.get("success"):
+                        self._log_message(
+                            f"Account {result['account']}: Trade #{result['order']} executed. "
+                            f"{result['symbol']}, {alert['action']}@{result['price']}, {result['volume']} ({latency_ms}ms)"
+                        )
+                    else:
+                        self._log_message(
+                            f"Account {result['account']}: Trade could not be executed. {result.get('error', '')} ({latency_ms}ms)",
+                            'error'
+                        )
+                succeeded = sum(1 for result in results if result.get("success"))
+                self._log_message(f"Alert copied to {succeeded}/{len(results)} accounts in {elapsed_ms}ms")
+            except Exception as e:
+                self._log_message(f"Error copying alert to accounts: {str(e)}", 'error')
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _queue_until_session_open(self, next_open: float, symbol: str, volume: float, action: str) -> bool:
+        """Process an alert again once the symbol's next session opens"""
+        delay = next_open - time.time()
+        max_hours = self.config.get("session_queue_max_hours", 72)
+        if delay > max_hours * 3600:
+            return False
+
+        timer = threading.Timer(max(0.0, delay) + 1, self.process_trade, args=(symbol, volume, action))
+        timer.daemon = True
+        timer.start()
+        self._log_message(
+            f"Market for {symbol} is closed. Alert queued until {self.mt5_client.sessions.format_time(next_open)}"
+        )
+        return True
+
     def is_trading_paused(self, symbol: str, rule: dict, check_close_on_pause: bool = False) -> bool:
         """
         Check if trading is currently paused based on the schedule in the rule.
@@ -135,26 +188,35 @@ class TradeFilter:
         Returns:
             bool: True if trade was processed successfully, False otherwise
         """
+        with StallWatchdog().watch("alert"):
+            return self._process_trade(symbol, volume, action)
+
+    def _process_trade(self, symbol: str, volume: float, action: str) -> bool:
+        """Run an alert through the checks and place its order"""
         # Check if alerts are enabled in config
         if not self.config.get("listen_to_alerts", False):
             self._log_message("Cannot process trade: Alerts are disabled in settings")
             return False
 
+        # During a known outage, skip the full path and apply the outage policy
+        supervisor = self.mt5_client.supervisor
+        if supervisor.in_outage() and supervisor.outage_policy() == "queue":
+            supervisor.queue_alert(symbol, volume, action)
+            self._log_message(f"Not connected to MT5. Alert for {symbol} queued until the connection is back")
+            return False
+        
         # Check MT5 connection first
         if not self.mt5_client.is_connected():
             self._log_message("Cannot process trade: Not connected to MT5", 'error')
             return False
 
-        # Find rule for this symbol
-        rule = None
-        for r in self.config.get("alert_rules", []):
-            if r.get("symbol") == symbol:
-                rule = r
-                break
-                
+        # Resolve the alert ticker to the broker's symbol and its rule
+        ticker = symbol
+        broker_symbol, rule = self.mt5_client.symbols.resolve(ticker)
         if not rule:
             self._log_message(f"No rule found for symbol {symbol}. Trade could not be executed.", 'error')
             return False
+        symbol = broker_symbol
 
         # Determine which volume to use
         trade_volume = rule.get("volume", 0.0)  # Default from rule
@@ -167,16 +229,51 @@ class TradeFilter:
                 self._log_message(f"Trading for {symbol} is paused due to schedule. Trade could not be executed.")
                 return False
         
+        # Reject alerts outside the symbol's trading session before any order call
+        is_open, next_open = self.mt5_client.sessions.status(symbol)
+        if not is_open:
+            if next_open and rule.get("queue_until_session_open", False) and \
+                    self._queue_until_session_open(next_open, symbol, volume, action):
+                return False
+            message = f"Market for {symbol} is closed."
+            if next_open:
+                message += f" Next session opens {self.mt5_client.sessions.format_time(next_open)}."
+            self._log_message(f"{message} Trade could not be executed.")
+            return False
+        
+        # Reject on spread or stale quotes from the quote cache, before any order call
+        if self.mt5_client.quotes is not None:
+            rejection = self.mt5_client.quotes.check(symbol, rule)
+            if rejection:
+                self._log_message(f"Trade for {symbol} rejected: {rejection}")
+                return False
+        
+        # Snap the volume to the symbol's limits, or size it from equity, without a broker call
+        account = self.mt5_client.account.snapshot
+        sized_volume, sizing = self.mt5_client.sizer.size(symbol, rule, trade_volume, account.equity if account else None)
+        if sized_volume is None:
+            self._log_message(f"Trade for {symbol} rejected: {sizing}", 'error')
+            return False
+        if sizing:
+            self._log_message(f"Volume for {symbol} sized to {sized_volume} ({sizing})")
+        trade_volume = sized_volume
+        
+        # Check the order against the exposure limits, without any broker calls
+        rejection = self.mt5_client.exposure.check(
+            symbol,
+            trade_volume,
+            rule,
+            self.config.get("risk", {}),
+            closes_symbol=rule.get("close_positions_on_entry", False)
+        )
+        if rejection:
+            self._log_message(f"Trade for {symbol} rejected by risk limits: {rejection}", 'error')
+            return False
+        
         # If we get here, all checks passed
         # Place the order using MT5Client
         try:
             if self.mt5_client.is_connected():
-                # Close existing positions if configured
-                if rule.get("close_positions_on_entry", False):
-                    start_time = time.time()
-                    close_result = self.mt5_client.close_positions_by_symbol(symbol)
-                    self._measure_execution_time("Closing positions", start_time)
-                
                 # Get the values from the rule
                 take_profit = rule.get("take_profit", 0.0)
                 stop_loss = rule.get("stop_loss", 0.0)
@@ -187,6 +284,41 @@ class TradeFilter:
                 sl = stop_loss if stop_loss > 0 else None
                 pts_value = pts if pts != 0.0 else None
                 
+                # Copy the alert to the additional accounts while the local order runs
+                self._broadcast_to_accounts({
+                    "ticker": ticker,
+                    "action": action.lower(),
+                    "volume": trade_volume,
+                    "sl": sl,
+                    "tp": tp,
+                    "rules": self.config.get("alert_rules", [])
+                })
+                
+                # Record the alert so the resulting orders can be linked to it
+                alert_id = self.mt5_client.trade_history.record_alert(symbol, action.lower(), volume)
+                
+                # Close existing positions if configured
+                if rule.get("close_positions_on_entry", False):
+                    # Flatten and reverse in one order when the rule allows it
+                    if rule.get("reverse_in_one_order", False):
+                        start_time = time.time()
+                        result = self.mt5_client.reverse_position(
+                            symbol=symbol,
+                            order_type=action.lower(),
+                            volume=trade_volume,
+                            sl=sl,
+                            tp=tp,
+                            pts=pts_value,
+                            alert_id=alert_id
+                        )
+                        self._measure_execution_time("Trade reversal", start_time)
+                        if result is not None:
+                            return result
+                    
+                    start_time = time.time()
+                    close_result = self.mt5_client.close_positions_by_symbol(symbol)
+                    self._measure_execution_time("Closing positions", start_time)
+                
                 # Place the market order
                 start_time = time.time()
                 result = self.mt5_client.place_market_order(
@@ -195,8 +327,8 @@ class TradeFilter:
                     volume=trade_volume,
                     sl=sl,
                     tp=tp,
-                    comment="TradevLink Alert",
-                    pts=pts_value
+                    pts=pts_value,
+                    alert_id=alert_id
                 )
                 self._measure_execution_time("Trade execution", start_time)
                 return result
@@ -0,0 +1,278 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+from utils.periodic_task import PeriodicTask
+from utils.watched_trade_store import DATA_DIR
+from utils.excursion_tracker import EXCURSION_COLUMNS
+
+DEAL_COLUMNS = (
+    "ticket", "order", "position_id", "time", "time_msc", "type", "entry", "magic",
+    "reason", "volume", "price", "commission", "swap", "profit", "fee", "symbol",
+    "comment", "external_id",
+)
+
+ORDER_COLUMNS = (
+    "ticket", "time_setup", "time_setup_msc", "time_done", "time_done_msc", "type",
+    "type_filling", "state", "magic", "position_id", "reason", "volume_initial",
+    "volume_current", "price_open", "sl", "tp", "price_current", "symbol", "comment",
+    "external_id",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deals (
+    ticket INTEGER PRIMARY KEY, "order" INTEGER, position_id INTEGER, time INTEGER,
+    time_msc INTEGER, type INTEGER, entry INTEGER, magic INTEGER, reason INTEGER,
+    volume REAL, price REAL, commission REAL, swap REAL, profit REAL, fee REAL,
+    symbol TEXT, comment TEXT, external_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_deals_symbol ON deals (symbol);
+CREATE INDEX IF NOT EXISTS idx_deals_time ON deals (time);
+CREATE INDEX IF NOT EXISTS idx_deals_position_id ON deals (position_id);
+CREATE INDEX IF NOT EXISTS idx_deals_magic ON deals (magic);
+CREATE TABLE IF NOT EXISTS orders (
+    ticket INTEGER PRIMARY KEY, time_setup INTEGER, time_setup_msc INTEGER,
+    time_done INTEGER, time_done_msc INTEGER, type INTEGER, type_filling INTEGER,
+    state INTEGER, magic INTEGER, position_id INTEGER, reason INTEGER,
+    volume_initial REAL, volume_current REAL, price_open REAL, sl REAL, tp REAL,
+    price_current REAL, symbol TEXT, comment TEXT, external_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_symbol ON orders (symbol);
+CREATE INDEX IF NOT EXISTS idx_orders_time_done ON orders (time_done);
+CREATE INDEX IF NOT EXISTS idx_orders_position_id ON orders (position_id);
+CREATE INDEX IF NOT EXISTS idx_orders_magic ON orders (magic);
+CREATE TABLE IF NOT EXISTS alerts (
+    id TEXT PRIMARY KEY, time REAL, symbol TEXT, action TEXT, volume REAL
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_time ON alerts (time);
+CREATE TABLE IF NOT EXISTS order_alerts (
+    order_ticket INTEGER PRIMARY KEY, alert_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_order_alerts_alert_id ON order_alerts (alert_id);
+CREATE TABLE IF NOT EXISTS excursions (
+    ticket INTEGER PRIMARY KEY, rule TEXT, symbol TEXT, side TEXT, volume REAL,
+    open_price REAL, close_price REAL, opened_at REAL, closed_at REAL, mfe REAL,
+    mae REAL, time_to_mfe REAL, time_to_mae REAL, profit REAL, exit_reason TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_excursions_rule ON excursions (rule);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY, value INTEGER
+);
+"""
+
+class TradeHistoryDB:
+    """
+    Local SQLite database of deals, orders and the alerts that caused them.
+
+    Alert and order links and closed-position excursions are queued by the
+    order path and only written by the sync thread, so recording them never
+    waits on disk.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.path.join(DATA_DIR, "trade_history.db")
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pending = queue.Queue()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def record_alert(self, symbol: str, action: str, volume: Optional[float]) -> str:
+        """Queue an incoming alert and return its id"""
+        alert_id = uuid.uuid4().hex
+        self._pending.put(("alert", (alert_id, time.time(), symbol, action, volume)))
+        return alert_id
+
+    def link_order(self, order_ticket: int, alert_id: Optional[str]) -> None:
+        """Queue the link between an order and the alert that caused it"""
+        if alert_id:
+            self._pending.put(("order_alert", (order_ticket, alert_id)))
+
+    def record_excursion(self, row: tuple) -> None:
+        """Queue the excursion record of a closed position, in EXCURSION_COLUMNS order"""
+        self._pending.put(("excursion", row))
+
+    def write_pending(self) -> int:
+        """Write all queued alerts, order links and excursions"""
+        rows = {"alert": [], "order_alert": [], "excursion": []}
+        while True:
+            try:
+                kind, row = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            rows[kind].append(row)
+
+        if not any(rows.values()):
+            return 0
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO alerts VALUES (?, ?, ?, ?, ?)", rows["alert"])
+                conn.executemany("INSERT OR REPLACE INTO order_alerts VALUES (?, ?)", rows["order_alert"])
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO excursions VALUES ({', '.join('?' for _ in EXCURSION_COLUMNS)})",
+                    rows["excursion"]
+                )
+        return sum(len(kind_rows) for kind_rows in rows.values())
+
+    def get_high_water_mark(self, key: str) -> int:
+        """Get the stored sync position for a history table"""
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else 0
+
+    def insert_history(self, table: str, columns: tuple, records, mark_key: str, mark_column: str) -> int:
+        """
+        Insert MT5 history records and advance the table's high-water mark.
+
+        Returns:
+            int: Number of new rows
+        """
+        if not records:
+            return 0
+
+        rows = [tuple(getattr(record, column, None) for column in columns) for record in records]
+        mark = max(getattr(record, mark_column, 0) or 0 for record in records)
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        placeholders = ", ".join("?" for _ in columns)
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                before = conn.total_changes
+                conn.executemany(f"INSERT OR IGNORE INTO {table} ({quoted}) VALUES ({placeholders})", rows)
+                inserted = conn.total_changes - before
+                conn.execute(
+                    "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                    (mark_key, mark)
+                )
+            return inserted
+
+    def get_deals(self, symbol: str = None, since: int = None, position_id: int = None,
+                  magic: int = None) -> List[Dict]:
+        """Query stored deals, each with the id of the alert that caused it"""
+        query = ("SELECT d.*, oa.alert_id FROM deals d "
+                 "LEFT JOIN order_alerts oa ON oa.order_ticket = d.\"order\" WHERE 1 = 1")
+        params = []
+        if symbol is not None:
+            query += " AND d.symbol = ?"
+            params.append(symbol)
+        if since is not None:
+            query += " AND d.time >= ?"
+            params.append(since)
+        if position_id is not None:
+            query += " AND d.position_id = ?"
+            params.append(position_id)
+        if magic is not None:
+            query += " AND d.magic = ?"
+            params.append(magic)
+        query += " ORDER BY d.time_msc"
+
+        with self._lock:
+            cursor = self._connect().execute(query, params)
+            names = [description[0] for description in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def excursion_aggregates(self) -> List[tuple]:
+        """
+        Sum up stored excursions per rule and exit reason.
+
+        Returns:
+            list: (rule, exit_reason, count, wins, profit, mfe_sum, mfe_max,
+            mae_sum, mae_max, time_to_mfe_sum) rows
+        """
+        with self._lock:
+            return self._connect().execute(
+                "SELECT rule, exit_reason, COUNT(*), SUM(profit > 0), SUM(profit), SUM(mfe), MAX(mfe), "
+                "SUM(mae), MAX(mae), SUM(time_to_mfe) FROM excursions GROUP BY rule, exit_reason"
+            ).fetchall()
+
+    def get_excursions(self, rule: str = None, since: float = None) -> List[Dict]:
+        """Query stored excursions of closed positions"""
+        query = "SELECT * FROM excursions WHERE 1 = 1"
+        params = []
+        if rule is not None:
+            query += " AND rule = ?"
+            params.append(rule)
+        if since is not None:
+            query += " AND closed_at >= ?"
+            params.append(since)
+        query += " ORDER BY closed_at"
+
+        with self._lock:
+            cursor = self._connect().execute(query, params)
+            names = [description[0] for description in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class TradeHistorySync(PeriodicTask):
+    """
+    Pulls new deals and orders from MT5 into the trade history database.
+
+    Each run only asks MT5 for history after the stored high-water mark, so
+    the cost follows the number of new deals rather than the full history.
+    """
+
+    # Re-read a little before the high-water mark to catch deals sharing its second
+    OVERLAP_SECONDS = 60
+
+    def __init__(self, mt5_client, history: TradeHistoryDB, interval_seconds: float = 30):
+        super().__init__(interval_seconds=interval_seconds)
+        self.mt5_client = mt5_client
+        self.history = history
+
+    def _date_range(self, mark_key: str):
+        """Get the request window, in server time seconds, from the stored high-water mark"""
+        mark = self.history.get_high_water_mark(mark_key)
+        date_from = max(0, mark - self.OVERLAP_SECONDS) if mark else 0
+        # History times are in server time, so look ahead to cover any offset
+        date_to = int(time.time()) + 2 * 86400
+        return date_from, date_to
+
+    def sync(self) -> int:
+        """Write queued alert links and pull new history. Returns the number of new deals."""
+        self.history.write_pending()
+
+        if not self.mt5_client.is_connected():
+            return 0
+
+        date_from, date_to = self._date_range("deals")
+        deals = self.mt5_client.get_history_deals(date_from, date_to)
+        new_deals = self.history.insert_history("deals", DEAL_COLUMNS, deals, "deals", "time")
+
+        date_from, date_to = self._date_range("orders")
+        orders = self.mt5_client.get_history_orders(date_from, date_to)
+        self.history.insert_history("orders", ORDER_COLUMNS, orders, "orders", "time_done")
+
+        return new_deals
+
+    def task(self):
+        self.sync()
+
+    def stop(self):
+        """Stop syncing and write anything still queued"""
+        super().stop()
+        try:
+            self.history.write_pending()
+        except Exception as e:
+            print(f"Error writing trade history: {str(e)}")
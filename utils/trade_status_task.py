@@ -1,7 +1,14 @@
 from datetime import datetime
 from utils.periodic_task import PeriodicTask
 from utils.mt5_client import MT5Client
+from utils.position_snapshot import PositionSnapshot
 from utils.trade_filter import TradeFilter
+from utils.config_manager import ConfigManager
+from utils.metrics import Metrics
+from utils.pause_timer import PauseTimer
+from utils.position_reconciler import PositionReconciler
+from utils.stall_watchdog import StallWatchdog
+import threading
 import time
 
 class TradeStatusTask(PeriodicTask):
@@ -10,14 +17,30 @@ class TradeStatusTask(PeriodicTask):
         self.main_frame = main_frame
         self.mt5_client = None
         self.trade_filter = None
+        self.pause_timer = None
+        self.reconciler = None
         self._first_mt5_attempt = True
         self._account_found = False
         self._connection_start_time = None
+        self._near_trades = 0
+        self._last_sweep = 0.0
+        self._reconcile_pending = False
+        self.metrics = Metrics()
+        self.watchdog = StallWatchdog()
         
     def stop(self):
         """Stop the task and cleanup resources"""
         super().stop()
+        self.watchdog.forget("monitoring")
+        self.watchdog.stop()
         if self.mt5_client:
+            try:
+                if self.pause_timer:
+                    self.pause_timer.stop()
+                self.mt5_client.stop_history_sync()
+                self.mt5_client.stop_quote_cache()
+            except Exception:
+                pass
             try:
                 self.mt5_client.shutdown()
             except Exception:
@@ -26,8 +49,223 @@ class TradeStatusTask(PeriodicTask):
         self.trade_filter = None
         self.main_frame = None  # Clear reference to prevent memory leaks
         
+    def _on_stall(self, name: str, seconds: float, dump_path: str):
+        """Report a stalled thread and optionally reset the MT5 connection under it"""
+        client = self.mt5_client
+        if client is None:
+            return
+        message = f"The {name} thread has been stuck for {seconds:.0f} seconds"
+        if dump_path:
+            message += f". Thread stacks written to {dump_path}"
+        client._log_message(message, 'error')
+        
+        # A hung MT5 call only returns once the connection under it is shut down
+        if name in ("monitoring", "alert") and ConfigManager().get("watchdog", {}).get("reconnect_mt5", False):
+            client._log_message("Reconnecting to MetaTrader5 after the stall")
+            threading.Thread(target=client._on_connection_lost, daemon=True).start()
+        
+    def _on_stall_recovered(self, name: str, seconds: float):
+        """Report a stalled thread that moves again"""
+        if self.mt5_client:
+            self.mt5_client._log_message(f"The {name} thread recovered after {seconds:.0f} seconds")
+        
+    def _replay_queued_alerts(self):
+        """Process alerts queued while MT5 was not connected, in arrival order"""
+        alerts, expired = self.mt5_client.supervisor.drain_alerts()
+        if expired and self.main_frame:
+            self.main_frame.add_log(f"Dropped {expired} queued alert(s) older than the outage queue limit")
+        if not alerts:
+            return
+        
+        def replay():
+            for symbol, volume, action in alerts:
+                if self.trade_filter:
+                    self.trade_filter.process_trade(symbol, volume, action)
+        
+        threading.Thread(target=replay, daemon=True).start()
+        
+    def _reconcile_exposure(self):
+        """
+        Reconcile the exposure ledger at the full sweep cadence.
+        
+        While trades are watched their full sweep already reconciled it, so
+        this only takes its own snapshot when nothing is being watched.
+        """
+        risk = self.trade_filter.config.get("risk", {})
+        if not any(risk.get(key) for key in ("max_open_positions", "max_margin_usage", "daily_loss_cap")) and \
+                not any(rule.get("max_lots") for rule in self.trade_filter.config.get("alert_rules", [])):
+            return
+        
+        reconciled_at = self.mt5_client.exposure.reconciled_at
+        full_sweep_interval = ConfigManager().get("status_polling", {}).get("full_sweep_interval", 10)
+        if reconciled_at is not None and time.time() - reconciled_at < full_sweep_interval:
+            return
+        
+        snapshot = self.mt5_client.get_positions_snapshot()
+        if snapshot is not None:
+            self.mt5_client.exposure.reconcile(snapshot)
+        
+    def _ratchet_stop(self, position, trade_data, rule):
+        """
+        Move a watched trade's broker-side SL up behind its run-up.
+        
+        Only for rules with 'pts_mode': 'broker'. The SL trails the run-up by
+        pts once that locks in profit, and is only modified when it improves
+        by at least 'pts_step' and no more often than 'pts_modify_interval'
+        seconds, so the broker holds the stop between polls and outages.
+        """
+        if not rule or rule.get("pts_mode", "client") != "broker":
+            return
+        
+        is_buy = PositionSnapshot.is_buy(position)
+        pts = trade_data['pts']
+        target = trade_data['runup'] - pts if is_buy else trade_data['runup'] + pts
+        
+        # Like the client-side PTS, only close in profit
+        if (target <= position.price_open) if is_buy else (target >= position.price_open):
+            return
+        
+        if position.sl:
+            improvement = target - position.sl if is_buy else position.sl - target
+            if improvement < max(rule.get("pts_step", 0), 1e-9):
+                return
+        
+        now = time.time()
+        if now - trade_data.get('sl_at', 0) < rule.get("pts_modify_interval", 1.0):
+            return
+        trade_data['sl_at'] = now
+        if self.mt5_client.move_stop_loss(position, target):
+            trade_data['sl'] = target
+        else:
+            # Back off after a rejected modify, e.g. an SL inside the stops level
+            trade_data['sl_at'] = now + 4 * rule.get("pts_modify_interval", 1.0)
+        
+    def _watched_snapshot(self):
+        """
+        Snapshot the positions the watched and excursion-tracked trades need.
+        
+        Only their symbols are fetched, so the payload scales with the
+        tracked trades. The whole account is swept every
+        'full_sweep_interval' seconds, or when a watched trade's symbol is
+        unknown, and that sweep also reconciles the exposure ledger.
+        
+        Returns:
+            tuple: The snapshot, or None if it failed, and the symbols it
+            covers, or None for the whole account
+        """
+        polling = ConfigManager().get("status_polling", {})
+        symbols = {trade_data.get('symbol') for trade_data in self.mt5_client.watched_trades.values()}
+        symbols |= self.mt5_client.excursions.symbols()
+        full_sweep = None in symbols or \
+            time.time() - self._last_sweep >= polling.get("full_sweep_interval", 10)
+        
+        start_time = time.perf_counter()
+        snapshot = self.mt5_client.get_positions_snapshot(None if full_sweep else sorted(symbols))
+        if snapshot is None:
+            return None, None
+        self.metrics.observe("trade_status.snapshot_ms", (time.perf_counter() - start_time) * 1000)
+        self.metrics.observe("trade_status.positions_fetched", len(snapshot))
+        
+        if full_sweep:
+            self._last_sweep = time.time()
+            self.metrics.incr("trade_status.full_sweeps")
+            self.mt5_client.exposure.reconcile(snapshot)
+        return snapshot, None if full_sweep else symbols
+        
+    def _close_triggered(self, closes):
+        """
+        Close the watched trades that hit PTS this tick in one bulk call.
+        
+        All close decisions are collected first, so the closes go out back to
+        back from the tick's snapshot and one tick per symbol, the trades
+        furthest past their PTS trigger first. Logging waits until every
+        close is sent, then reports each trade's latency and close order.
+        
+        Args:
+            closes (list): (overshoot past the trigger, position, exit reason, log message)
+            
+        Returns:
+            list: Tickets that were closed
+        """
+        client = self.mt5_client
+        closes.sort(key=lambda close: close[0], reverse=True)
+        for _, position, reason, _ in closes:
+            client.excursions.mark_exit([position.ticket], reason)
+        messages = []
+        report = client.close_positions_bulk(positions=[position for _, position, _, _ in closes], messages=messages)
+        
+        for _, _, _, message in closes:
+            client._log_message(message)
+        for message, webhook_type in messages:
+            client._log_message(message, webhook_type)
+        latencies = report['latency_ms']
+        if report['order']:
+            client._log_message(
+                f"Sent {len(report['order'])} close(s) in {report['elapsed_ms']:.0f} ms: " +
+                ", ".join(f"#{ticket} +{latencies[ticket]:.0f} ms" for ticket in report['order'])
+            )
+        
+        self.metrics.observe("trade_status.bulk_close_ms", report['elapsed_ms'])
+        self.metrics.incr("trade_status.triggered_closes", len(closes))
+        for ticket in report['order']:
+            self.metrics.observe("trade_status.close_latency_ms", latencies[ticket])
+        return [ticket for ticket, closed in report['results'].items() if closed]
+        
+    def _is_near_trigger(self, position, trade_data) -> bool:
+        """
+        Check if a watched trade is close to its PTS trigger or a closing pause.
+        
+        A trade is near its PTS trigger once the run-up is in profit and the
+        pullback from it has used up all but 'near_fraction' of pts.
+        """
+        polling = ConfigManager().get("status_polling", {})
+        pts = trade_data['pts']
+        runup = trade_data['runup']
+        if PositionSnapshot.is_buy(position):
+            armed = runup > position.price_open
+            pullback = runup - position.price_current
+        else:
+            armed = 0 < runup < position.price_open
+            pullback = position.price_current - runup
+        if pts and armed and pts - pullback <= polling.get("near_fraction", 0.25) * pts:
+            return True
+        
+        until_pause = self.pause_timer.seconds_until_pause(position.symbol)
+        if until_pause is not None and until_pause <= polling.get("pause_lead_seconds", 5):
+            return True
+        return False
+        
+    def _adapt_interval(self):
+        """
+        Pick the next polling interval.
+        
+        Polls fast while any watched trade is near a trigger, at the normal
+        cadence while trades are watched or the connection is being
+        established, and slowly when there is nothing to watch. Coming out of
+        fast polling the interval at most doubles per tick.
+        """
+        polling = ConfigManager().get("status_polling", {})
+        watching = self.mt5_client is not None and \
+            bool(self.mt5_client.watched_trades or len(self.mt5_client.excursions))
+        if self._near_trades:
+            mode, interval = "fast", polling.get("fast", 0.2)
+        elif watching or not self._account_found:
+            mode, interval = "normal", polling.get("normal", 1.0)
+        else:
+            mode, interval = "idle", polling.get("idle", 2.0)
+        
+        if interval > self.interval:
+            interval = min(interval, self.interval * 2)
+        self.interval = interval
+        
+        self.metrics.incr(f"trade_status.ticks.{mode}")
+        self.metrics.set("trade_status.interval_ms", interval * 1000)
+        self.metrics.set("trade_status.near_trades", self._near_trades)
+        
     def task(self):
         """Check and maintain MT5 connection and account status"""
+        self._near_trades = 0
+        self.watchdog.beat("monitoring")
         try:
             # Check if main_frame is still valid
             if not self.main_frame or not hasattr(self.main_frame, 'winfo_exists') or not self.main_frame.winfo_exists():
@@ -37,6 +275,12 @@ class TradeStatusTask(PeriodicTask):
             if self.mt5_client is None:
                 self.mt5_client = MT5Client()
                 self.trade_filter = TradeFilter(self.main_frame)
+                self.pause_timer = PauseTimer(
+                    self.mt5_client, self.trade_filter._convert_time_to_seconds,
+                    lambda symbol, rule: self.trade_filter.is_trading_paused(symbol, rule, check_close_on_pause=True)
+                )
+                self.reconciler = PositionReconciler(self.mt5_client)
+                self.watchdog.start(self._on_stall, self._on_stall_recovered)
                 return
                 
             # Try to connect if not connected
@@ -60,18 +304,19 @@ class TradeStatusTask(PeriodicTask):
                     except Exception:
                         pass
                 
-                # Try to connect
-                self.mt5_client.connect()
+                # Try to connect, then replay alerts queued during the outage
+                if self.mt5_client.connect():
+                    self._replay_queued_alerts()
                 return
             
             # Reset connection timing when connected
             self._connection_start_time = None
             
-            # Check account info if connected
-            account_info = self.mt5_client.get_account_info()
+            # Refresh the shared account snapshot when due; subscribers like the exposure ledger follow
+            account = self.mt5_client.account.refresh_if_due()
             
             # If we're connected but no account info
-            if account_info is None:
+            if account is None:
                 if not self._account_found:  # Only show once when transitioning to this state
                     try:
                         if self.main_frame and self.main_frame.winfo_exists():
@@ -85,25 +330,58 @@ class TradeStatusTask(PeriodicTask):
             if not self._account_found:
                 try:
                     if self.main_frame and self.main_frame.winfo_exists():
-                        self.main_frame.add_log(f"Connected with MetaTrader5. Current Account: #{account_info['login']}")
+                        self.main_frame.add_log(f"Connected with MetaTrader5. Current Account: #{account.login}")
                         self._account_found = True
                 except Exception:
                     pass
+                
+                # Keep the local trade database in sync in the background
+                self.mt5_client.start_history_sync(self.trade_filter.config.get("history_sync_interval", 30))
+                self.mt5_client.symbols.load_symbols()
+                self.mt5_client.start_quote_cache()
+                
+                # Take over the connector's positions opened before this session or the outage
+                self._reconcile_pending = True
+                # Close positions on symbols whose pause started during the outage
+                self.pause_timer.invalidate()
 
             # Only monitor trades when we have a confirmed connection and account
             if self._account_found and self.mt5_client.is_connected():
-                # Monitor watched trades
-                if hasattr(self.mt5_client, 'watched_trades') and self.mt5_client.watched_trades:
-                    # Get all current positions
-                    positions = self.mt5_client.get_positions()
-                    if positions is None:
+                # Recompile order templates and symbol metadata off the order path when the rules changed
+                self.mt5_client.symbols.refresh_if_due()
+                self.mt5_client.templates.compile_all()
+                self.mt5_client.sizer.refresh()
+                self.mt5_client.sessions.rebuild_if_due()
+                self.mt5_client.sessions.refresh_offset_if_due()
+                self.pause_timer.rebuild_if_changed()
+                if self._reconcile_pending:
+                    # Retried every tick until a snapshot of the whole account comes through
+                    snapshot = self.mt5_client.get_positions_snapshot()
+                    if snapshot is not None:
+                        self.mt5_client.exposure.reconcile(snapshot)
+                        self.reconciler.start(snapshot)
+                        self._reconcile_pending = False
+                self.reconciler.step()
+                
+                # Monitor watched trades and the excursions of open connector positions
+                if self.mt5_client.watched_trades or len(self.mt5_client.excursions):
+                    # Get a snapshot of the tracked symbols' positions, indexed by ticket
+                    active_positions, covered = self._watched_snapshot()
+                    if active_positions is None:
                         return
-
-                    # Convert positions to a dict for faster lookup
-                    active_positions = {pos['ticket']: pos for pos in positions}
+                    
+                    # Move the excursions and record the positions that closed
+                    self.mt5_client.excursions.update(
+                        active_positions, covered, self.mt5_client.templates.magic_numbers(),
+                        self.mt5_client.symbols.rule_for
+                    )
+                    # Fallback for pause closes the timers missed
+                    self.pause_timer.check(active_positions)
                     
                     # Create a list of orders to remove to avoid dictionary size change during iteration
                     orders_to_remove = []
+                    # Positions to close this tick, closed together after the loop
+                    closes = []
                     
                     # Check each watched trade
                     for order_id, trade_data in self.mt5_client.watched_trades.items():
@@ -112,73 +390,68 @@ class TradeStatusTask(PeriodicTask):
                             orders_to_remove.append(order_id)
                             continue
 
-                        position = active_positions[order_id]
+                        # Being closed for a trading pause
+                        if self.pause_timer.is_closing(order_id):
+                            continue
+
+                        position = active_positions.get(order_id)
                         
-                        # Find rule for this symbol
-                        symbol = position['symbol']
-                        rule = None
-                        for r in self.trade_filter.config.get("alert_rules", []):
-                            if r.get("symbol") == symbol:
-                                rule = r
-                                break
+                        # Find rule for this symbol; closing at pause starts is left to the pause timer
+                        symbol = position.symbol
+                        rule = self.mt5_client.symbols.rule_for(symbol)
                         
-                        # If we found a rule and trading is paused, close the position
-                        if rule and rule.get("active_schedule", True):
-                            if self.trade_filter.is_trading_paused(symbol, rule, check_close_on_pause=True):
-                                try:
-                                    if self.main_frame and self.main_frame.winfo_exists():
-                                        self.main_frame.add_log(f"Closing trade #{order_id} due to trading pause for {symbol}")
-                                        self.mt5_client.close_position(order_id)
-                                        orders_to_remove.append(order_id)
-                                except Exception:
-                                    continue
-                                continue
-
-                        current_price = position['current_price']
-                        open_price = position['open_price']
+                        current_price = position.price_current
+                        open_price = position.price_open
                         pts = trade_data['pts']
                         
                         # Update runup and drawdown based on position type
-                        if position['type'] == 'BUY':
+                        if PositionSnapshot.is_buy(position):
                             # For buy positions, track highest price for runup and lowest for drawdown
                             trade_data['runup'] = max(trade_data['runup'], current_price)
                             trade_data['drawdown'] = min(trade_data['drawdown'], current_price) if trade_data['drawdown'] > 0 else current_price
+                            self._ratchet_stop(position, trade_data, rule)
+                            if self._is_near_trigger(position, trade_data):
+                                self._near_trades += 1
                             
                             # Check if runup shows profit and current price has dropped more than pts
                             # Also ensure we still have profit
+                            pullback = trade_data['runup'] - current_price
                             if (trade_data['runup'] > open_price and 
-                                (trade_data['runup'] - current_price) >= pts and 
-                                position['profit'] > 0):
-                                try:
-                                    if self.main_frame and self.main_frame.winfo_exists():
-                                        self.main_frame.add_log(f"Trade #{order_id} reached PTS@{current_price}, RUN-UP@{trade_data['runup']}")
-                                        self.mt5_client.close_position(order_id)
-                                        orders_to_remove.append(order_id)
-                                except Exception:
-                                    continue
+                                pullback >= pts and 
+                                position.profit > 0):
+                                closes.append((pullback - pts, position, "pts",
+                                               f"Trade #{order_id} reached PTS@{current_price}, RUN-UP@{trade_data['runup']}"))
                                 
                         else:  # SELL position
                             # For sell positions, track lowest price for runup and highest for drawdown
                             trade_data['runup'] = min(trade_data['runup'], current_price) if trade_data['runup'] > 0 else current_price
                             trade_data['drawdown'] = max(trade_data['drawdown'], current_price)
+                            self._ratchet_stop(position, trade_data, rule)
+                            if self._is_near_trigger(position, trade_data):
+                                self._near_trades += 1
                             
                             # Check if runup shows profit and current price has risen more than pts
                             # Also ensure we still have profit
+                            pullback = current_price - trade_data['runup']
                             if (trade_data['runup'] < open_price and 
-                                (current_price - trade_data['runup']) >= pts and 
-                                position['profit'] > 0):
-                                try:
-                                    if self.main_frame and self.main_frame.winfo_exists():
-                                        self.main_frame.add_log(f"Trade #{order_id} reached PTS@{current_price}, RUN-UP@{trade_data['runup']}")
-                                        self.mt5_client.close_position(order_id)
-                                        orders_to_remove.append(order_id)
-                                except Exception:
-                                    continue
+                                pullback >= pts and 
+                                position.profit > 0):
+                                closes.append((pullback - pts, position, "pts",
+                                               f"Trade #{order_id} reached PTS@{current_price}, RUN-UP@{trade_data['runup']}"))
+                    
+                    if closes:
+                        orders_to_remove.extend(self._close_triggered(closes))
                     
                     # Safely remove closed positions from watched_trades
                     for order_id in orders_to_remove:
                         self.mt5_client.watched_trades.pop(order_id, None)
                 
+                # Reconcile the exposure ledger when no watched trade snapshot did it
+                self._reconcile_exposure()
+                
+                # Persist this tick's watched trade changes in one batch
+                self.mt5_client.save_watched_trades()
+                
         except Exception as e:
             # Only try to log errors if main_frame is still valid
             if self.main_frame and hasattr(self.main_frame, 'winfo_exists') and self.main_frame.winfo_exists():
@@ -186,3 +459,5 @@ class TradeStatusTask(PeriodicTask):
                     print(f"Error in trade status task: {str(e)}")
                 except Exception:
                     pass
+        finally:
+            self._adapt_interval()
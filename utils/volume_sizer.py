@@ -0,0 +1,167 @@
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+class VolumeSizer:
+    """
+    Turns a rule or alert volume into one the broker will accept.
+
+    Volumes are snapped to the symbol's volume_step and clamped to its
+    volume_min/volume_max from cached symbol metadata, so an invalid size
+    never costs a round trip. Rules with 'risk_percent' and a stop loss are
+    sized from the cached account equity instead: the volume that loses
+    risk_percent of equity if the stop loss is hit, rejected rather than
+    raised when that is below the symbol's minimum. The metadata is loaded
+    for every rule symbol when the rules change; a symbol still missing on
+    the order path is fetched in the background, not inline.
+    """
+
+    # Symbol metadata is refreshed at least this often, in seconds
+    METADATA_TTL = 3600
+
+    def __init__(self, fetch_symbol_info: Callable, resolver):
+        self.fetch_symbol_info = fetch_symbol_info
+        self.resolver = resolver
+        self._lock = threading.Lock()
+        self._symbols = {}  # symbol -> symbol_info
+        self._fetching = set()  # symbols being fetched in the background
+        self._refreshed_at = 0.0
+        self._version = None
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Refresh metadata for every rule symbol when the rules changed or it expired.
+
+        Returns:
+            int: Number of symbols refreshed
+        """
+        if not force and self._version == self.resolver.version and \
+                time.time() - self._refreshed_at < self.METADATA_TTL:
+            return 0
+        symbols = {}
+        # Symbols matched by wildcard rules aren't listed by the resolver, keep them warm too
+        for symbol in set(self.resolver.symbols()) | set(self._symbols):
+            info = self.fetch_symbol_info(symbol)
+            if info is not None:
+                symbols[symbol] = info
+        with self._lock:
+            self._symbols = symbols
+            self._version = self.resolver.version
+            self._refreshed_at = time.time()
+        return len(symbols)
+
+    def cached(self, symbol: str):
+        """
+        Get cached symbol metadata without a broker call, for the order path.
+
+        A miss starts a background fetch, so the next order has it.
+        """
+        info = self._symbols.get(symbol)
+        if info is None:
+            with self._lock:
+                if symbol in self._fetching:
+                    return None
+                self._fetching.add(symbol)
+            threading.Thread(target=self._fetch, args=(symbol,), daemon=True).start()
+        return info
+
+    def _fetch(self, symbol: str) -> None:
+        """Fetch one symbol's metadata into the cache"""
+        try:
+            self.symbol_info(symbol)
+        except Exception as e:
+            print(f"Error fetching symbol info for {symbol}: {str(e)}")
+        finally:
+            with self._lock:
+                self._fetching.discard(symbol)
+
+    def symbol_info(self, symbol: str):
+        """Get cached symbol metadata, fetching it if missing"""
+        info = self._symbols.get(symbol)
+        if info is None:
+            info = self.fetch_symbol_info(symbol)
+            if info is not None:
+                with self._lock:
+                    self._symbols[symbol] = info
+        return info
+
+    @staticmethod
+    def _step_digits(step: float) -> int:
+        """Number of decimals in a volume step"""
+        return max(0, -int(math.floor(math.log10(step)))) if step < 1 else 0
+
+    def normalize(self, symbol: str, volume: float, round_down: bool = False) -> Tuple[Optional[float], str]:
+        """
+        Snap a volume to the symbol's step and clamp it to its limits.
+
+        With round_down the volume is never raised: one below volume_min
+        after rounding is rejected instead of clamped up.
+
+        Returns:
+            tuple: (volume or None if it can't be traded, description of adjustments)
+        """
+        if volume is None or volume <= 0:
+            return None, f"volume {volume} is not positive"
+
+        info = self.cached(symbol)
+        if info is None:
+            return volume, "symbol limits not loaded yet"
+        if not info.volume_step:
+            return volume, ""
+
+        step = info.volume_step
+        steps = volume / step
+        steps = math.floor(steps + 1e-9) if round_down else round(steps)
+        sized = round(steps * step, self._step_digits(step) + 2)
+
+        notes = []
+        if abs(sized - volume) > 1e-9:
+            notes.append(f"step {step:g}")
+        if sized < info.volume_min:
+            # A risk-sized volume below the minimum would risk more than allowed
+            if round_down:
+                return None, f"volume {volume:g} is below the minimum {info.volume_min:g}"
+            sized = info.volume_min
+            notes.append(f"min {info.volume_min:g}")
+        if info.volume_max and sized > info.volume_max:
+            sized = info.volume_max
+            notes.append(f"max {info.volume_max:g}")
+        return sized, ", ".join(notes)
+
+    def risk_volume(self, symbol: str, equity: float, risk_percent: float, sl_distance: float) -> Optional[float]:
+        """Volume that loses risk_percent of equity over sl_distance price units"""
+        info = self.cached(symbol)
+        if info is None or not equity or not sl_distance or not info.trade_tick_size or not info.trade_tick_value:
+            return None
+        loss_per_lot = sl_distance / info.trade_tick_size * info.trade_tick_value
+        if loss_per_lot <= 0:
+            return None
+        return equity * risk_percent / 100 / loss_per_lot
+
+    def size(self, symbol: str, rule: Dict, volume: float, equity: Optional[float]) -> Tuple[Optional[float], str]:
+        """
+        Size an order for a rule.
+
+        Args:
+            symbol (str): The trading symbol
+            rule (dict): The rule, optionally with 'risk_percent' and 'stop_loss'
+            volume (float): Volume from the rule or the alert
+            equity (float): Cached account equity for risk-based sizing
+
+        Returns:
+            tuple: (volume or None if it can't be traded, description for the log)
+        """
+        risk_percent = rule.get("risk_percent", 0)
+        stop_loss = rule.get("stop_loss", 0)
+        fallback = ""
+        if risk_percent and stop_loss > 0:
+            risk_sized = self.risk_volume(symbol, equity, risk_percent, stop_loss)
+            if risk_sized is not None:
+                sized, notes = self.normalize(symbol, risk_sized, round_down=True)
+                description = f"{risk_percent:g}% of equity {equity:.2f} over SL {stop_loss:g} = {risk_sized:.4f}"
+                return sized, f"{description}, {notes}" if notes else description
+            fallback = "equity or symbol data unavailable for risk sizing"
+
+        sized, notes = self.normalize(symbol, volume)
+        return sized, ", ".join(note for note in (fallback, notes) if note)
@@ -0,0 +1,101 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+class WatchedTradeStore:
+    """
+    Restart-safe store for MT5Client.watched_trades.
+
+    State lives in a small SQLite database in WAL mode. Changes are written
+    in one batch per flush by diffing against what was last persisted, so
+    an unchanged trade costs no write.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.path.join(DATA_DIR, "watched_trades.db")
+        self._lock = threading.Lock()
+        self._conn = None
+        self._persisted = {}  # ticket -> trade data as last written
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS watched_trades ("
+                "ticket INTEGER PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def load(self) -> Dict[int, Dict]:
+        """Load all persisted watched trades"""
+        with self._lock:
+            rows = self._connect().execute("SELECT ticket, data FROM watched_trades").fetchall()
+            trades = {ticket: json.loads(data) for ticket, data in rows}
+            self._persisted = {ticket: dict(data) for ticket, data in trades.items()}
+            return trades
+
+    def flush(self, watched_trades: Dict[int, Dict]) -> int:
+        """
+        Persist the changes since the last flush in one transaction.
+
+        Returns:
+            int: Number of rows written or deleted
+        """
+        with self._lock:
+            current = list(watched_trades.items())
+            now = time.time()
+
+            changed = [(ticket, dict(data)) for ticket, data in current
+                       if self._persisted.get(ticket) != data]
+            live = {ticket for ticket, _ in current}
+            removed = [ticket for ticket in self._persisted if ticket not in live]
+
+            if not changed and not removed:
+                return 0
+
+            conn = self._connect()
+            with conn:
+                if changed:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO watched_trades (ticket, data, updated_at) VALUES (?, ?, ?)",
+                        [(ticket, json.dumps(data), now) for ticket, data in changed]
+                    )
+                if removed:
+                    conn.executemany("DELETE FROM watched_trades WHERE ticket = ?",
+                                     [(ticket,) for ticket in removed])
+
+            for ticket, data in changed:
+                self._persisted[ticket] = data
+            for ticket in removed:
+                self._persisted.pop(ticket, None)
+            return len(changed) + len(removed)
+
+    def discard(self, tickets: Iterable[int]) -> None:
+        """Delete persisted trades that are no longer open"""
+        tickets = list(tickets)
+        if not tickets:
+            return
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("DELETE FROM watched_trades WHERE ticket = ?",
+                                 [(ticket,) for ticket in tickets])
+            for ticket in tickets:
+                self._persisted.pop(ticket, None)
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None